@@ -1,161 +1,353 @@
 import os
+import secrets
+import threading
+import time
+
+STARTUP_T0 = time.perf_counter()
+
 import dash
-from dash import dcc, html, dash_table, Input, Output, callback
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
+from dash import dcc, html, dash_table, Input, Output, State, MATCH, ClientsideFunction, no_update
 import dash_bootstrap_components as dbc
-import requests
-from datetime import datetime
-from io import StringIO
+import squeeze
+from squeeze.payload import columnar, enable_compression, encode_figure
+from squeeze.ranks import RANK_FILTER_OPTIONS
+
+# Time from process start to binding the port; pandas, plotly.express and the
+# API pull are kept out of this path (background loader / first callback)
+STARTUP_BUDGET_MS = 1500
 
 # Production app configuration
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
 app.title = "SqueezeMetrics Financial Dashboard"
 server = app.server  # This is required for Render
+enable_compression(server)
+
+# Large tables ship as a columnar payload and are rebuilt into records in the browser (assets/payload.js)
+app.clientside_callback(
+    ClientsideFunction(namespace="payload", function_name="decode_table"),
+    Output({'type': 'columnar-table', 'index': MATCH}, 'data'),
+    Input({'type': 'columnar-data', 'index': MATCH}, 'data')
+)
+
+def columnar_table(name, frame, **kwargs):
+    """DataTable fed from a columnar dcc.Store; only the displayed columns are sent"""
+    return html.Div([
+        dcc.Store(id={'type': 'columnar-data', 'index': name}, data=columnar(frame, [col['id'] for col in kwargs['columns']])),
+        dash_table.DataTable(id={'type': 'columnar-table', 'index': name}, data=[], **kwargs)
+    ])
+
+# Per-session server-side tables, keyed by the session-id store; created on first use
+# so pandas stays off the startup path
+table_sessions = None
+
+# Windowed tables whose rows are the filtered snapshot, so any worker can rebuild them
+SNAPSHOT_TABLES = {'overview'}
+
+def get_table_sessions():
+    global table_sessions
+    if table_sessions is None:
+        table_sessions = squeeze.SessionStore()
+    return table_sessions
+
+def records_table(name, frame, session_id, page_size, **kwargs):
+    """
+    Sortable, filterable DataTable: shipped whole below WINDOWED_MIN_ROWS rows,
+    otherwise kept in the session's TableView and sent one window at a time
+    """
+    from squeeze.tableview import WINDOW_ROWS, WINDOWED_MIN_ROWS, TableView  # deferred: imports pandas
+    if len(frame) < WINDOWED_MIN_ROWS or session_id is None:
+        return columnar_table(name, frame, sort_action="native", filter_action="native",
+                              page_action="native", page_size=page_size, **kwargs)
+    view = TableView(frame, [col['id'] for col in kwargs['columns']])
+    get_table_sessions().put(session_id, f"table-{name}", view)
+    data, page_count = view.window()
+    return dash_table.DataTable(
+        id={'type': 'windowed-table', 'index': name}, data=data,
+        page_action="custom", page_current=0, page_size=WINDOW_ROWS, page_count=page_count,
+        sort_action="custom", sort_mode="single", sort_by=[], filter_action="custom", filter_query="",
+        virtualization=True, fixed_rows={'headers': True}, style_table={'height': '600px', 'overflowY': 'auto'},
+        **kwargs)
+
+@app.callback(
+    Output({'type': 'windowed-table', 'index': MATCH}, 'data'),
+    Output({'type': 'windowed-table', 'index': MATCH}, 'page_count'),
+    Output({'type': 'windowed-table', 'index': MATCH}, 'page_current'),
+    Input({'type': 'windowed-table', 'index': MATCH}, 'page_current'),
+    Input({'type': 'windowed-table', 'index': MATCH}, 'sort_by'),
+    Input({'type': 'windowed-table', 'index': MATCH}, 'filter_query'),
+    State({'type': 'windowed-table', 'index': MATCH}, 'page_size'),
+    State({'type': 'windowed-table', 'index': MATCH}, 'id'),
+    State({'type': 'windowed-table', 'index': MATCH}, 'columns'),
+    State("session-id", "data"),
+    State("sector-filter", "value"),
+    State("industry-filter", "value"),
+    State("records-filter", "value"),
+    State("pnn-filter", "value"),
+    State("etf-filter", "value"),
+    State("rank-filter", "value"),
+    prevent_initial_call=True
+)
+def page_records(page_current, sort_by, filter_query, page_size, table_id, columns, session_id, *filters):
+    """
+    Next window of a server-side table; a new sort or filter starts again from the top.
+    Under several workers the request may land on one that never built the session's
+    view: it is rebuilt from the shared snapshot and the global filters.
+    """
+    key = f"table-{table_id['index']}"
+    view = get_table_sessions().get(session_id, key)
+    if view is None and table_id['index'] in SNAPSHOT_TABLES and snapshot['df'] is not None:
+        from squeeze.tableview import TableView
+        view = TableView(squeeze.filter_snapshot(snapshot['df'], *filters), [col['id'] for col in columns])
+        get_table_sessions().put(session_id, key, view)
+    if view is None:
+        return no_update, no_update, no_update
+    paging = any(trigger['prop_id'].endswith('.page_current') for trigger in dash.ctx.triggered)
+    page_current = page_current if paging else 0
+    data, page_count = view.window(page_current, page_size, sort_by, filter_query)
+    if not paging:
+        # A new sort or filter caches a new view inside the TableView
+        get_table_sessions().resize(session_id, key)
+    return data, page_count, no_update if paging else page_current
+
+# Current snapshot, filled in by the background loader (cache first, then API)
+snapshot = {'df': None, 'source': None}
+
+# Every worker process maps the snapshot published under cache/; one of them pulls
+# from the API per refresh (machine-wide lock) and the others follow the pointer
+shared_snapshot = None
+
+# How often workers check the pointer file for a newly published version
+SNAPSHOT_POLL_SECONDS = 5
+
+# A version published this recently is not pulled again by a starting worker
+SNAPSHOT_FRESH_SECONDS = 60
+
+PROCESS_START = time.time()
+
+# Signal correlation cubes of the current snapshot, rebuilt when the loader swaps it
+correlation = {'df': None, 'view': None}
+
+def get_signal_correlation():
+    df = snapshot['df']
+    if correlation['df'] is not df:
+        from squeeze.correlation import SignalCorrelation  # deferred: imports scipy
+        correlation.update(df=df, view=SignalCorrelation(df))
+    return correlation['view']
 
 # Load data function for production (fetches from API)
 def load_data_from_api():
     """
     Fetches latest data from SqueezeMetrics API for production deployment
     """
-    api_url = "https://squeezemetrics.com/monitor/api/latest?format=csv&key=0B7661B124724CA4C43BED7742F01266945A7B04BF698A758C9101727FE7392D"
-    
     try:
-        response = requests.get(api_url, timeout=30)
-        response.raise_for_status()
-        
-        # Read CSV data into pandas DataFrame
-        df = pd.read_csv(StringIO(response.text))
-        
-        # Clean data same as local version
-        df = df.dropna(subset=['TICKER'])
-        df = df.fillna('Unknown')
-        
-        # Convert numeric columns
-        numeric_cols = ['P', 'P_NN', 'V', 'G', 'D', 'IV', 'CLOSE', 'VOLUME', 'OPEN', 'HIGH', 'LOW', 'P_NORM', 'V_NORM', 'G_NORM', 'D_NORM', 'IV_NORM']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        print(f"Loaded {len(df)} clean records from API")
-        return df
-        
+        return squeeze.load_snapshot('api')
     except Exception as e:
         print(f"Error loading data from API: {e}")
         # Return empty DataFrame with required columns if API fails
-        return pd.DataFrame(columns=['TICKER', 'NAME', 'SECTOR', 'INDUSTRY', 'P_NN', 'CLOSE', 'VOLUME'])
+        return squeeze.empty_snapshot()
 
-# Load data
-df = load_data_from_api()
+def follow_published():
+    """Serves the published version if the pointer moved; pulled since this process started counts as live"""
+    if shared_snapshot.refresh():
+        age = squeeze.cache_age_seconds()
+        live = age is not None and age <= time.time() - PROCESS_START + SNAPSHOT_FRESH_SECONDS
+        snapshot.update(df=shared_snapshot.df, source='api' if live else 'cache')
+        print(f"Serving snapshot {shared_snapshot.version} ({snapshot['source']})")
 
-# Enhanced layout with professional styling
-app.layout = dbc.Container([
-    # Header
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.H1("SqueezeMetrics Financial Dashboard", className="text-center text-white mb-2"),
-                html.P(f"Analyzing {len(df)} securities with P_NN neural network predictions", className="text-center text-white-50"),
-                html.P("🔴 LIVE DATA from SqueezeMetrics API", className="text-center text-white-50 mb-0")
-            ], style={
-                'background': 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)',
-                'padding': '30px',
-                'borderRadius': '10px',
-                'marginBottom': '30px'
-            })
-        ])
-    ]),
+def serve_empty_if_unavailable():
+    """Nothing published and no pull in progress (it failed): serve the empty frame rather than the loading page"""
+    if snapshot['df'] is None and squeeze.current_version() is None and shared_snapshot.idle():
+        snapshot.update(df=squeeze.empty_snapshot(), source='api')
+
+def warm_start():
+    """
+    Background startup: serve the last published snapshot as soon as it is
+    memory-mapped, then pull and publish a fresh one unless another worker
+    is already pulling or has just published.
+    """
+    global shared_snapshot
+    start = time.perf_counter()
+    shared_snapshot = squeeze.SharedSnapshot()
+    follow_published()
+    if snapshot['df'] is not None:
+        print(f"Serving cached snapshot {(time.perf_counter() - STARTUP_T0) * 1000:.0f} ms after start")
     
-    # Control Panel
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader("Filters & Controls"),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            html.Label("Sector Filter:", className="fw-bold"),
-                            dcc.Dropdown(
-                                id="sector-filter",
-                                options=[{"label": "All Sectors", "value": "All"}] + 
-                                        [{"label": sector, "value": sector} for sector in sorted(df['SECTOR'].unique()) if sector != 'Unknown'] if len(df) > 0 else [],
-                                value="All",
-                                clearable=False
-                            )
-                        ], width=3),
-                        dbc.Col([
-                            html.Label("Industry Filter:", className="fw-bold"),
-                            dcc.Dropdown(
-                                id="industry-filter",
-                                options=[{"label": "All Industries", "value": "All"}] + 
-                                        [{"label": industry, "value": industry} for industry in sorted(df['INDUSTRY'].unique()) if industry != 'Unknown'] if len(df) > 0 else [],
-                                value="All",
-                                clearable=False
-                            )
-                        ], width=3),
-                        dbc.Col([
-                            html.Label("Records to Show:", className="fw-bold"),
-                            dcc.Dropdown(
-                                id="records-filter", 
-                                options=[
-                                    {"label": "Top 50", "value": 50},
-                                    {"label": "Top 100", "value": 100},
-                                    {"label": "Top 200", "value": 200},
-                                    {"label": "All Records", "value": len(df) if len(df) > 0 else 100}
-                                ],
-                                value=len(df) if len(df) > 0 else 100,
-                                clearable=False
-                            )
-                        ], width=3),
-                        dbc.Col([
-                            html.Label("Min P_NN Value:", className="fw-bold"),
-                            dcc.Input(
-                                id="pnn-filter",
-                                type="number",
-                                value=0,
-                                step=0.01,
-                                placeholder="Filter by P_NN..."
-                            )
-                        ], width=3)
-                    ]),
-                    dbc.Row([
-                        dbc.Col([
-                            html.Label("ETF Filter:", className="fw-bold mt-3"),
-                            dcc.RadioItems(
-                                id="etf-filter",
-                                options=[
-                                    {"label": " Include ETFs", "value": "include"},
-                                    {"label": " Exclude ETFs", "value": "exclude"},
-                                    {"label": " ETFs Only", "value": "only"}
-                                ],
-                                value="exclude",
-                                inline=True,
-                                className="mt-2"
-                            )
-                        ], width=12)
+    shared_snapshot.publish(load_data_from_api, SNAPSHOT_FRESH_SECONDS)
+    follow_published()
+    serve_empty_if_unavailable()
+    serving = f"serving {snapshot['source']} data" if snapshot['df'] is not None else "waiting for another worker's pull"
+    print(f"Background load finished in {time.perf_counter() - start:.1f}s ({serving})")
+
+def refresh_loop():
+    """
+    Warm start, then follow newly published versions; a fresh API pull is due
+    every refresh_seconds (0 disables it) and only one worker makes it
+    """
+    warm_start()
+    interval = squeeze.settings().refresh_seconds
+    while True:
+        time.sleep(SNAPSHOT_POLL_SECONDS)
+        if interval > 0:
+            shared_snapshot.publish(load_data_from_api, interval - SNAPSHOT_POLL_SECONDS)
+        follow_published()
+        serve_empty_if_unavailable()
+
+threading.Thread(target=refresh_loop, daemon=True).start()
+
+def loading_layout():
+    """Shown until the first snapshot is available; reloads the page once it is"""
+    return dbc.Container([
+        html.Div([
+            html.H1("SqueezeMetrics Financial Dashboard", className="text-center text-white mb-2"),
+            html.P("Loading latest snapshot...", className="text-center text-white-50 mb-0")
+        ], style={
+            'background': 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)',
+            'padding': '30px',
+            'borderRadius': '10px',
+            'marginBottom': '30px'
+        }),
+        dbc.Spinner(color="primary", children=html.Div(style={'height': '80px'})),
+        dcc.Interval(id="startup-poll", interval=1000),
+        dcc.Location(id="startup-reload", refresh=True)
+    ])
+
+@app.callback(
+    Output("startup-reload", "href"),
+    Input("startup-poll", "n_intervals"),
+    prevent_initial_call=True
+)
+def reload_when_ready(n_intervals):
+    return "/" if snapshot['df'] is not None else no_update
+
+def serve_layout():
+    df = snapshot['df']
+    if df is None:
+        return loading_layout()
+    
+    data_source = ("🔴 LIVE DATA from SqueezeMetrics API" if snapshot['source'] == 'api'
+                   else "💾 Cached snapshot - refreshing from SqueezeMetrics API in the background")
+    
+    # Enhanced layout with professional styling
+    return dbc.Container([
+        # Header
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H1("SqueezeMetrics Financial Dashboard", className="text-center text-white mb-2"),
+                    html.P(f"Analyzing {len(df)} securities with P_NN neural network predictions", className="text-center text-white-50"),
+                    html.P(data_source, className="text-center text-white-50 mb-0")
+                ], style={
+                    'background': 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)',
+                    'padding': '30px',
+                    'borderRadius': '10px',
+                    'marginBottom': '30px'
+                })
+            ])
+        ]),
+    
+        # Control Panel
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("Filters & Controls"),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                html.Label("Sector Filter:", className="fw-bold"),
+                                dcc.Dropdown(
+                                    id="sector-filter",
+                                    options=[{"label": "All Sectors", "value": "All"}] + 
+                                            [{"label": sector, "value": sector} for sector in sorted(df['SECTOR'].unique()) if sector != 'Unknown'] if len(df) > 0 else [],
+                                    value="All",
+                                    clearable=False
+                                )
+                            ], width=3),
+                            dbc.Col([
+                                html.Label("Industry Filter:", className="fw-bold"),
+                                dcc.Dropdown(
+                                    id="industry-filter",
+                                    options=[{"label": "All Industries", "value": "All"}] + 
+                                            [{"label": industry, "value": industry} for industry in sorted(df['INDUSTRY'].unique()) if industry != 'Unknown'] if len(df) > 0 else [],
+                                    value="All",
+                                    clearable=False
+                                )
+                            ], width=3),
+                            dbc.Col([
+                                html.Label("Records to Show:", className="fw-bold"),
+                                dcc.Dropdown(
+                                    id="records-filter", 
+                                    options=[
+                                        {"label": "Top 50", "value": 50},
+                                        {"label": "Top 100", "value": 100},
+                                        {"label": "Top 200", "value": 200},
+                                        {"label": "All Records", "value": len(df) if len(df) > 0 else 100}
+                                    ],
+                                    value=len(df) if len(df) > 0 else 100,
+                                    clearable=False
+                                )
+                            ], width=3),
+                            dbc.Col([
+                                html.Label("Min P_NN Value:", className="fw-bold"),
+                                dcc.Input(
+                                    id="pnn-filter",
+                                    type="number",
+                                    value=0,
+                                    step=0.01,
+                                    placeholder="Filter by P_NN..."
+                                )
+                            ], width=3)
+                        ]),
+                        dbc.Row([
+                            dbc.Col([
+                                html.Label("ETF Filter:", className="fw-bold mt-3"),
+                                dcc.RadioItems(
+                                    id="etf-filter",
+                                    options=[
+                                        {"label": " Include ETFs", "value": "include"},
+                                        {"label": " Exclude ETFs", "value": "exclude"},
+                                        {"label": " ETFs Only", "value": "only"}
+                                    ],
+                                    value="exclude",
+                                    inline=True,
+                                    className="mt-2"
+                                )
+                            ], width=6),
+                            dbc.Col([
+                                html.Label("Signal Percentile:", className="fw-bold mt-3"),
+                                dcc.Dropdown(
+                                    id="rank-filter",
+                                    options=RANK_FILTER_OPTIONS,
+                                    value="all",
+                                    clearable=False
+                                )
+                            ], width=6)
+                        ])
                     ])
                 ])
             ])
-        ])
-    ], className="mb-4"),
+        ], className="mb-4"),
     
-    # Metrics Dashboard
-    html.Div(id="metrics-cards"),
+        # Metrics Dashboard
+        html.Div(id="metrics-cards"),
     
-    # Navigation Tabs - Simplified for production
-    dcc.Tabs(id="tabs", value="overview", children=[
-        dcc.Tab(label="📊 Overview", value="overview"),
-        dcc.Tab(label="💼 Portfolio", value="portfolio"),
-        dcc.Tab(label="📈 Analysis", value="analysis")
-    ]),
+        # Navigation Tabs - Simplified for production
+        dcc.Tabs(id="tabs", value="overview", children=[
+            dcc.Tab(label="📊 Overview", value="overview"),
+            dcc.Tab(label="💼 Portfolio", value="portfolio"),
+            dcc.Tab(label="📈 Analysis", value="analysis")
+        ]),
     
-    html.Div(id="tab-content"),
+        html.Div(id="tab-content"),
+
+        # Identifies this page load's server-side table state
+        dcc.Store(id="session-id", data=secrets.token_urlsafe(12)),
     
-    # Footer
-    html.Hr(className="mt-5"),
-    html.P("Powered by SqueezeMetrics API | Deployed on Render", className="text-center text-muted")
-])
+        # Footer
+        html.Hr(className="mt-5"),
+        html.P("Powered by SqueezeMetrics API | Deployed on Render", className="text-center text-muted")
+    ])
+
+app.layout = serve_layout
 
 # Basic callbacks for production version
 @app.callback(
@@ -164,30 +356,15 @@ app.layout = dbc.Container([
      Input("industry-filter", "value"),
      Input("records-filter", "value"),
      Input("pnn-filter", "value"),
-     Input("etf-filter", "value")]
+     Input("etf-filter", "value"),
+     Input("rank-filter", "value")]
 )
-def update_metrics(sector, industry, records, min_pnn, etf_filter):
-    if len(df) == 0:
+def update_metrics(sector, industry, records, min_pnn, etf_filter, rank_filter):
+    df = snapshot['df']
+    if df is None or len(df) == 0:
         return dbc.Alert("No data available. Please check API connection.", color="warning")
     
-    filtered_df = df.copy()
-    
-    # Apply filters (same logic as full dashboard)
-    if etf_filter == "exclude":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] != 'ETF']
-    elif etf_filter == "only":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] == 'ETF']
-    
-    if sector != "All" and sector in filtered_df['SECTOR'].values:
-        filtered_df = filtered_df[filtered_df['SECTOR'] == sector]
-    
-    if industry != "All" and industry in filtered_df['INDUSTRY'].values:
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] == industry]
-    
-    if min_pnn:
-        filtered_df = filtered_df[filtered_df['P_NN'] >= min_pnn]
-    
-    filtered_df = filtered_df.head(records)
+    filtered_df = squeeze.filter_snapshot(df, sector, industry, records, min_pnn, etf_filter, rank_filter)
     
     return dbc.Row([
         dbc.Col([
@@ -231,46 +408,46 @@ def update_metrics(sector, industry, records, min_pnn, etf_filter):
      Input("industry-filter", "value"),
      Input("records-filter", "value"),
      Input("pnn-filter", "value"),
-     Input("etf-filter", "value")]
+     Input("etf-filter", "value"),
+     Input("rank-filter", "value")],
+    State("session-id", "data")
 )
-def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
-    if len(df) == 0:
+def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter, rank_filter, session_id=None):
+    df = snapshot['df']
+    if df is None or len(df) == 0:
         return dbc.Alert("No data available from API. Please try refreshing the page.", color="danger")
     
-    # Apply same filtering logic
-    filtered_df = df.copy()
-    
-    if etf_filter == "exclude":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] != 'ETF']
-    elif etf_filter == "only":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] == 'ETF']
-    
-    if sector != "All" and sector in filtered_df['SECTOR'].values:
-        filtered_df = filtered_df[filtered_df['SECTOR'] == sector]
-    
-    if industry != "All" and industry in filtered_df['INDUSTRY'].values:
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] == industry]
-    
-    if min_pnn:
-        filtered_df = filtered_df[filtered_df['P_NN'] >= min_pnn]
-    
-    filtered_df = filtered_df.head(records)
+    # Same filtering logic as the full dashboard
+    filtered_df = squeeze.filter_snapshot(df, sector, industry, records, min_pnn, etf_filter, rank_filter)
     
     if tab == "overview":
         return html.Div([
             html.H3("📊 Data Overview", className="mt-3 mb-3"),
-            dash_table.DataTable(
-                data=filtered_df.to_dict('records'),
+            records_table(
+                "overview", filtered_df, session_id,
                 columns=[
                     {'name': 'Ticker', 'id': 'TICKER'},
                     {'name': 'Name', 'id': 'NAME'},
                     {'name': 'Sector', 'id': 'SECTOR'},
                     {'name': 'P_NN Signal', 'id': 'P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                    {'name': 'P_NN %ile', 'id': 'P_NN_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'P_NN Sector %ile', 'id': 'P_NN_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'P_NN Industry %ile', 'id': 'P_NN_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'P %ile', 'id': 'P_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'P Sector %ile', 'id': 'P_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'P Industry %ile', 'id': 'P_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'G %ile', 'id': 'G_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'G Sector %ile', 'id': 'G_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'G Industry %ile', 'id': 'G_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'D %ile', 'id': 'D_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'D Sector %ile', 'id': 'D_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'D Industry %ile', 'id': 'D_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'IV %ile', 'id': 'IV_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'IV Sector %ile', 'id': 'IV_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'IV Industry %ile', 'id': 'IV_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
                     {'name': 'Close', 'id': 'CLOSE', 'type': 'numeric', 'format': {'specifier': '$.2f'}},
                     {'name': 'Volume', 'id': 'VOLUME', 'type': 'numeric', 'format': {'specifier': ',.0f'}}
                 ],
-                sort_action="native",
-                filter_action="native",
                 page_size=20,
                 style_cell={'textAlign': 'left'},
                 style_data_conditional=[
@@ -287,25 +464,18 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
         ])
     
     elif tab == "portfolio":
-        # Simplified portfolio logic for production
-        portfolio_universe = filtered_df[
-            (filtered_df['VOLUME'] >= 10_000_000) & 
-            (filtered_df['INDUSTRY'] != 'ETF')
-        ].copy()
+        # Same balanced 20 long / 40 short construction as the full dashboard
+        portfolio_universe, long_candidates, short_candidates = squeeze.build_portfolio(filtered_df)
         
         if len(portfolio_universe) < 60:
             return dbc.Alert(f"Insufficient liquid securities ({len(portfolio_universe)} found). Need at least 60 for portfolio construction.", color="warning")
         
-        portfolio_universe_sorted = portfolio_universe.sort_values('P_NN', ascending=False)
-        long_candidates = portfolio_universe_sorted.head(20)
-        short_candidates = portfolio_universe_sorted.tail(40)
-        
         return html.Div([
             html.H3("💼 Portfolio Builder", className="mt-3 mb-3"),
             dbc.Row([
                 dbc.Col([
                     dbc.Card([
-                        dbc.CardHeader("Long Positions (20)"),
+                        dbc.CardHeader(f"Long Positions ({len(long_candidates)})"),
                         dbc.CardBody([
                             dash_table.DataTable(
                                 data=long_candidates[['TICKER', 'NAME', 'SECTOR', 'P_NN', 'CLOSE', 'VOLUME']].to_dict('records'),
@@ -322,7 +492,7 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
                 ], width=6),
                 dbc.Col([
                     dbc.Card([
-                        dbc.CardHeader("Short Positions (40)"),
+                        dbc.CardHeader(f"Short Positions ({len(short_candidates)})"),
                         dbc.CardBody([
                             dash_table.DataTable(
                                 data=short_candidates[['TICKER', 'NAME', 'SECTOR', 'P_NN', 'CLOSE', 'VOLUME']].to_dict('records'),
@@ -342,6 +512,7 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
     
     elif tab == "analysis":
         if len(filtered_df) > 0:
+            import plotly.express as px  # deferred: not needed to serve the first page
             fig = px.scatter(
                 filtered_df, 
                 x='P_NN', 
@@ -350,10 +521,83 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
                 hover_data=['TICKER'],
                 title="P_NN vs Price Analysis"
             )
-            return dcc.Graph(figure=fig)
+            return html.Div([
+                html.H4("Signal Correlation & Clustering", className="mt-3 mb-3"),
+                dbc.Row([
+                    dbc.Col([
+                        dcc.RadioItems(
+                            id="corr-signals",
+                            options=[
+                                {"label": " Raw signals", "value": "raw"},
+                                {"label": " Normalized (_NORM)", "value": "norm"},
+                                {"label": " Both", "value": "all"}
+                            ],
+                            value="all",
+                            inline=True,
+                            persistence=True
+                        )
+                    ], width=7),
+                    dbc.Col([
+                        dcc.RadioItems(
+                            id="corr-level",
+                            options=[
+                                {"label": " Cluster sectors", "value": "SECTOR"},
+                                {"label": " Cluster industries", "value": "INDUSTRY"}
+                            ],
+                            value="SECTOR",
+                            inline=True,
+                            persistence=True
+                        )
+                    ], width=5)
+                ], className="mb-3"),
+                html.Div(id="corr-results"),
+                dcc.Graph(figure=encode_figure(fig))
+            ])
         else:
             return dbc.Alert("No data for analysis", color="warning")
 
+@app.callback(
+    Output("corr-results", "children"),
+    [Input("corr-signals", "value"),
+     Input("corr-level", "value")],
+    [State("sector-filter", "value"),
+     State("industry-filter", "value"),
+     State("records-filter", "value"),
+     State("pnn-filter", "value"),
+     State("etf-filter", "value"),
+     State("rank-filter", "value")]
+)
+def update_correlation(signal_set, level, sector, industry, records, min_pnn, etf_filter, rank_filter):
+    if snapshot['df'] is None or len(snapshot['df']) == 0:
+        return no_update
+    import plotly.figure_factory as ff  # deferred: not needed to serve the first page
+    import plotly.graph_objects as go
+    view = get_signal_correlation()
+    filters = (sector, industry, records, min_pnn, etf_filter, rank_filter)
+    corr = view.correlation(filters, signal_set or 'all')
+    fig1 = go.Figure(go.Heatmap(
+        z=corr.to_numpy(), x=list(corr.columns), y=list(corr.index), zmin=-1, zmax=1, colorscale='RdBu',
+        text=corr.round(2).to_numpy(), texttemplate="%{text}"
+    ))
+    fig1.update_layout(title="Signal Correlation (clustered order)", yaxis={'autorange': 'reversed'}, height=500)
+    
+    level = level or 'SECTOR'
+    scores, tree, profiles = view.group_clusters(filters, level, signal_set or 'all')
+    if tree is None:
+        return dcc.Graph(figure=fig1)
+    fig2 = ff.create_dendrogram(scores.loc[profiles.index].to_numpy(), orientation='left',
+                                labels=list(profiles.index), linkagefun=lambda _: tree)
+    fig2.update_layout(title=f"{level.title()} Clusters (average signal profile)",
+                       height=max(400, 22 * len(scores) + 120), showlegend=False, margin={'l': 160})
+    return dbc.Row([
+        dbc.Col([dcc.Graph(figure=fig1)], width=6),
+        dbc.Col([dcc.Graph(figure=fig2)], width=6)
+    ])
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 10000))  # Render uses PORT env variable
+    startup_ms = (time.perf_counter() - STARTUP_T0) * 1000
+    print(f"Startup: binding port {port} after {startup_ms:.0f} ms (budget {STARTUP_BUDGET_MS} ms)")
+    if startup_ms > STARTUP_BUDGET_MS:
+        print(f"WARNING: startup exceeded its {STARTUP_BUDGET_MS} ms budget")
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,30 @@
+// Browser-side decoding of the columnar table payloads built by squeeze.payload.columnar
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    payload: {
+        decode_table: function (payload) {
+            if (!payload) {
+                return [];
+            }
+            const names = payload.columns;
+            const getters = names.map(function (name) {
+                const values = payload.data[name];
+                if (Array.isArray(values)) {
+                    return function (i) { return values[i]; };
+                }
+                return function (i) {
+                    const code = values.codes[i];
+                    return code < 0 ? null : values.categories[code];
+                };
+            });
+            const rows = new Array(payload.length);
+            for (let i = 0; i < payload.length; i++) {
+                const row = {};
+                for (let j = 0; j < names.length; j++) {
+                    row[names[j]] = getters[j](i);
+                }
+                rows[i] = row;
+            }
+            return rows;
+        }
+    }
+});
@@ -0,0 +1,100 @@
+"""
+Benchmark of the API CSV parse: the old inferred-dtype path
+(read_csv + fillna('Unknown') + to_numeric) against the schema-driven
+parse_snapshot_csv with the C and pyarrow engines.
+
+    python benchmarks/csv_parse.py --rows 5400 --repeat 20 --missing 0.01
+    python benchmarks/csv_parse.py --file payload.csv
+"""
+import argparse
+import os
+import sys
+import time
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from squeeze.schema import CANONICAL_COLUMNS, clean_snapshot, parse_snapshot_csv  # noqa: E402
+
+SECTORS = ['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Consumer Cyclical', 'Industrials', 'Utilities']
+
+
+def synthetic_payload(rows, missing=0.01, seed=0):
+    """
+    CSV text shaped like the API payload, with a fraction of empty numeric
+    cells. Prices, volumes and IV are positive, with a consistent daily bar;
+    the signal scores and their _NORM versions are signed.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'TICKER': [f"T{i:05d}" for i in range(rows)],
+        'NAME': [f"Company {i}" for i in range(rows)],
+        'SECTOR': rng.choice(SECTORS, rows),
+        'INDUSTRY': [f"Industry {i}" for i in rng.integers(0, 140, rows)],
+        'DATE': '2025-01-02',
+    })
+    for col in CANONICAL_COLUMNS:
+        if col not in df.columns:
+            df[col] = rng.normal(size=rows).round(6)
+    df['P_NN'] = rng.normal(0, 0.03, rows).round(6)
+    df['IV'] = rng.lognormal(-1, 0.4, rows).round(6)
+
+    # Daily bar around a lognormal close (median ~$33)
+    close = rng.lognormal(3.5, 1, rows)
+    open_ = close * (1 + rng.normal(0, 0.015, rows))
+    df['OPEN'] = open_.round(2)
+    df['HIGH'] = (np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, rows)))).round(2)
+    df['LOW'] = (np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, rows)))).round(2)
+    df['CLOSE'] = close.round(2)
+    df['VOLUME'] = rng.lognormal(13, 2, rows).round()
+    df['ADM21'] = (df['VOLUME'] * rng.lognormal(0, 0.3, rows)).round()
+    df['DAYS'] = rng.integers(1, 253, rows)
+    numeric = CANONICAL_COLUMNS[5:]
+    df[numeric] = df[numeric].mask(rng.uniform(size=(rows, len(numeric))) < missing)
+    return df[CANONICAL_COLUMNS].to_csv(index=False)
+
+
+def legacy_parse(text):
+    return clean_snapshot(pd.read_csv(StringIO(text)))
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, np.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5400)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--missing", type=float, default=0.01, help="Fraction of empty numeric cells")
+    parser.add_argument("--file", help="Parse a saved API payload instead of a synthetic one")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as f:
+            text = f.read()
+    else:
+        text = synthetic_payload(args.rows, args.missing)
+    print(f"Payload: {len(text) / 1e6:.1f} MB, median of {args.repeat} runs")
+
+    paths = {
+        'legacy (inferred + fillna + to_numeric)': lambda: legacy_parse(text),
+        'typed, C engine': lambda: parse_snapshot_csv(text, engine='c')[0],
+        'typed, pyarrow engine': lambda: parse_snapshot_csv(text.encode(), engine='pyarrow')[0],
+    }
+    for name, fn in paths.items():
+        df, ms = timed(fn, args.repeat)
+        memory = df.memory_usage(deep=True).sum() / 1e6
+        print(f"{name:42s} {ms:8.1f} ms   {memory:6.1f} MB in memory   {len(df):,} rows")
+
+
+if __name__ == "__main__":
+    main()
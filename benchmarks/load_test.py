@@ -0,0 +1,398 @@
+"""
+Load test of the dashboard callbacks: simulated traders replay tab switches,
+filter changes, table paging and view controls against the
+/_dash-update-component endpoint, with concurrency ramped in steps.
+
+By default app.py is started in a scratch directory whose snapshot cache
+holds a synthetic snapshot and no API key is set, so no network access is
+needed. Reports throughput, p50/p95/p99 latency per callback and tab, and
+the server's resident memory.
+
+    python benchmarks/load_test.py --users 1 5 10 25 --duration 30
+    python benchmarks/load_test.py --url http://127.0.0.1:10000 --pid 1234
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from csv_parse import synthetic_payload  # noqa: E402
+from squeeze.cache import CACHE_DIR, write_cache  # noqa: E402
+from squeeze.loader import add_derived_columns  # noqa: E402
+from squeeze.schema import parse_snapshot_csv  # noqa: E402
+
+# What a simulated trader does next, and how often
+ACTION_WEIGHTS = {'tab': 0.3, 'filter': 0.4, 'page': 0.2, 'control': 0.1}
+
+FILTER_IDS = ['sector-filter', 'industry-filter', 'records-filter', 'pnn-filter', 'etf-filter', 'rank-filter']
+
+# Values typed into the Min P_NN input (it has no options to pick from)
+PNN_VALUES = [-0.05, 0, 0, 0.01, 0.02, 0.05]
+
+# View controls inside tabs, changed by the 'control' action when present
+CONTROL_IDS = ['corr-signals', 'corr-level']
+
+SERVER_START_TIMEOUT = 120
+RSS_SAMPLE_SECONDS = 0.5
+
+
+def synthetic_snapshot(rows, seed=0):
+    """A prepared snapshot (ranks, buckets, row hashes) from a synthetic API payload"""
+    df, _ = parse_snapshot_csv(synthetic_payload(rows, seed=seed).encode(), engine='pyarrow')
+    return add_derived_columns(df)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir, port, rows):
+    """
+    Starts app.py against a synthetic snapshot: it is published to the
+    snapshot cache in `workdir` just before start, so the app serves it and
+    skips its startup pull (which would fail anyway without an API key)
+    """
+    write_cache(synthetic_snapshot(rows), os.path.join(workdir, CACHE_DIR))
+    env = {**os.environ, 'PORT': str(port), 'SQUEEZE_API_KEY': '', 'SQUEEZE_REFRESH_SECONDS': '0',
+           'SQUEEZE_CONFIG': os.path.join(workdir, 'squeeze_config.json'),
+           'SQUEEZE_AUDIT_LOG': os.path.join(workdir, 'fetch_audit.jsonl')}
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    return subprocess.Popen([sys.executable, os.path.join(REPO_DIR, 'app.py')], cwd=workdir, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_until_ready(base_url, timeout=SERVER_START_TIMEOUT):
+    """Waits for the server to answer with the full layout (not the loading page)"""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(base_url + '/_dash-layout') as response:
+                    if response.status == 200 and 'tab-content' in await response.text():
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"server at {base_url} not ready after {timeout}s")
+
+
+def process_rss(pid):
+    """Resident memory in bytes of a process and its children (e.g. gunicorn workers), from /proc"""
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                total += next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, StopIteration):
+            continue
+    return total
+
+
+def id_key(component_id):
+    """Hashable form of a component id (pattern-matching ids are dicts)"""
+    return json.dumps(component_id, sort_keys=True, separators=(',', ':')) if isinstance(component_id, dict) \
+        else component_id
+
+
+def parse_id(text):
+    return json.loads(text) if text.startswith('{') else text
+
+
+def parse_outputs(output):
+    """'id.prop' or '..id1.prop1...id2.prop2..' as [(id, prop), ...]"""
+    parts = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [(parse_id(part.rsplit('.', 1)[0]), part.rsplit('.', 1)[1]) for part in parts]
+
+
+def is_pattern(component_id):
+    return isinstance(component_id, dict) and any(isinstance(value, list) for value in component_id.values())
+
+
+def resolve(pattern_id, concrete_id):
+    """A pattern id with its wildcards filled from a matching concrete id, or None when they do not match"""
+    if not is_pattern(pattern_id):
+        return pattern_id
+    if not isinstance(concrete_id, dict) or set(concrete_id) != set(pattern_id):
+        return None
+    if any(not isinstance(value, list) and concrete_id[key] != value for key, value in pattern_id.items()):
+        return None
+    return concrete_id
+
+
+def walk_components(node, found):
+    """Collects {id_key: props} for every component with an id in a layout or children tree"""
+    if isinstance(node, list):
+        for child in node:
+            walk_components(child, found)
+    elif isinstance(node, dict) and 'props' in node:
+        props = node['props']
+        if 'id' in props:
+            found[id_key(props['id'])] = (props['id'], props)
+        for value in props.values():
+            if isinstance(value, (dict, list)):
+                walk_components(value, found)
+    return found
+
+
+class VirtualUser:
+    """
+    One browser tab: loads the layout, then keeps changing tabs, filters,
+    table pages and view controls, firing the callbacks the browser would
+    fire for each change (including the initial calls of components a
+    callback has just rendered), and records every request's latency.
+    """
+
+    def __init__(self, session, base_url, dependencies, rng, think, record):
+        self.session = session
+        self.base_url = base_url
+        self.dependencies = dependencies
+        self.rng = rng
+        self.think = think
+        self.record = record
+        self.components = {}
+
+    def value(self, component_id, prop):
+        entry = self.components.get(id_key(component_id))
+        return entry[1].get(prop) if entry else None
+
+    def set_value(self, component_id, prop, value):
+        self.components[id_key(component_id)][1][prop] = value
+
+    def add_components(self, tree):
+        new = walk_components(tree, {})
+        self.components.update(new)
+        return new
+
+    async def start(self):
+        async with self.session.get(self.base_url + '/_dash-layout') as response:
+            self.add_components(await response.json())
+        await self.fire_initial(set(self.components))
+
+    def bound_callbacks(self, changed_keys, initial=False):
+        """(dependency, concrete id for pattern callbacks) pairs with an input among changed_keys"""
+        bound = []
+        for dep in self.dependencies:
+            if initial and dep.get('prevent_initial_call'):
+                continue
+            for spec in dep['inputs']:
+                pattern = parse_id(spec['id'])
+                for key in changed_keys:
+                    concrete = resolve(pattern, self.components[key][0]) if key in self.components else None
+                    if concrete is not None and (is_pattern(pattern) or key == id_key(pattern)):
+                        bound.append((dep, concrete if is_pattern(pattern) else None))
+        unique = {(dep['output'], id_key(concrete) if concrete else None): (dep, concrete) for dep, concrete in bound}
+        return list(unique.values())
+
+    async def fire_initial(self, keys):
+        await asyncio.gather(*(self.fire(dep, concrete, None) for dep, concrete in self.bound_callbacks(keys, True)))
+
+    async def change(self, component_id, prop, value):
+        self.set_value(component_id, prop, value)
+        key = id_key(component_id)
+        callbacks = [(dep, concrete) for dep, concrete in self.bound_callbacks({key})
+                     if any(id_key(resolve(parse_id(spec['id']), component_id) or '') == key and spec['property'] == prop
+                            for spec in dep['inputs'])]
+        await asyncio.gather(*(self.fire(dep, concrete, f"{key}.{prop}") for dep, concrete in callbacks))
+
+    def arguments(self, specs, concrete):
+        values = []
+        for spec in specs:
+            component_id = parse_id(spec['id'])
+            if concrete is not None and is_pattern(component_id):
+                component_id = resolve(component_id, concrete)
+            if id_key(component_id) not in self.components:
+                return None
+            values.append({'id': component_id, 'property': spec['property'],
+                           'value': self.value(component_id, spec['property'])})
+        return values
+
+    async def fire(self, dep, concrete, changed):
+        inputs, state = self.arguments(dep['inputs'], concrete), self.arguments(dep.get('state', []), concrete)
+        if inputs is None or state is None:
+            return
+        outputs = [{'id': resolve(component_id, concrete) if concrete else component_id, 'property': prop}
+                   for component_id, prop in parse_outputs(dep['output'])]
+        body = {'output': dep['output'], 'outputs': outputs if dep['output'].startswith('..') else outputs[0],
+                'inputs': inputs, 'state': state,
+                'changedPropIds': [changed] if changed else [f"{id_key(item['id'])}.{item['property']}" for item in inputs]}
+        first = outputs[0]
+        label = f"{first['id']['type'] if isinstance(first['id'], dict) else first['id']}.{first['property']}"
+        tab = self.value('tabs', 'value')
+        start = time.perf_counter()
+        try:
+            async with self.session.post(self.base_url + '/_dash-update-component', json=body) as response:
+                payload = await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.record(label, tab, time.perf_counter() - start, type(e).__name__, 0)
+            return
+        self.record(label, tab, time.perf_counter() - start, status, len(payload))
+        if status != 200:
+            return
+        new_keys = set()
+        for component_key, props in json.loads(payload).get('response', {}).items():
+            if component_key not in self.components:
+                continue
+            for prop, value in props.items():
+                if prop == 'children':
+                    # Components of the replaced subtree are gone from the page
+                    for key in walk_components(self.components[component_key][1].get('children'), {}):
+                        self.components.pop(key, None)
+                self.components[component_key][1][prop] = value
+                if prop == 'children':
+                    new_keys |= set(self.add_components(value))
+        if new_keys:
+            await self.fire_initial(new_keys)
+
+    async def act(self):
+        action = self.rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()))[0]
+        if action == 'tab':
+            tabs = [tab['props']['value'] for tab in self.value('tabs', 'children') or []]
+            choices = [tab for tab in tabs if tab != self.value('tabs', 'value')]
+            if choices:
+                await self.change('tabs', 'value', self.rng.choice(choices))
+        elif action == 'filter':
+            component_id = self.rng.choice([cid for cid in FILTER_IDS if cid in self.components])
+            options = self.value(component_id, 'options')
+            values = PNN_VALUES if options is None else [option['value'] if isinstance(option, dict) else option
+                                                         for option in options]
+            if values:
+                await self.change(component_id, 'value', self.rng.choice(values))
+        elif action == 'page':
+            tables = [entry[0] for entry in self.components.values()
+                      if isinstance(entry[0], dict) and entry[0].get('type') == 'windowed-table']
+            if tables:
+                table = self.rng.choice(tables)
+                pages = self.value(table, 'page_count') or 1
+                await self.change(table, 'page_current', self.rng.randrange(pages))
+        else:
+            controls = [cid for cid in CONTROL_IDS if cid in self.components]
+            if controls:
+                component_id = self.rng.choice(controls)
+                options = [option['value'] for option in self.value(component_id, 'options')]
+                await self.change(component_id, 'value', self.rng.choice(options))
+
+    async def run(self, until):
+        await self.start()
+        while time.monotonic() < until:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think) if self.think > 0 else 0)
+            await self.act()
+
+
+async def run_step(base_url, users, duration, think, seed, pid):
+    """Runs `users` simulated traders for `duration` seconds; returns (request records, peak RSS)"""
+    records = []
+    peak_rss = [process_rss(pid) if pid else 0]
+
+    def record(label, tab, seconds, status, size):
+        records.append({'users': users, 'callback': label, 'tab': tab, 'ms': seconds * 1000,
+                        'status': status, 'bytes': size})
+
+    async def sample_rss(until):
+        while time.monotonic() < until:
+            peak_rss[0] = max(peak_rss[0], process_rss(pid))
+            await asyncio.sleep(RSS_SAMPLE_SECONDS)
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as session:
+        async with session.get(base_url + '/_dash-dependencies') as response:
+            dependencies = [dep for dep in await response.json() if not dep.get('clientside_function')]
+        until = time.monotonic() + duration
+        tasks = [VirtualUser(session, base_url, dependencies, random.Random(seed * 1000 + i), think, record).run(until)
+                 for i in range(users)]
+        if pid:
+            tasks.append(sample_rss(until))
+        await asyncio.gather(*tasks)
+    return records, peak_rss[0]
+
+
+def percentiles(ms):
+    return pd.Series({'requests': len(ms), 'p50': np.percentile(ms, 50), 'p95': np.percentile(ms, 95),
+                      'p99': np.percentile(ms, 99), 'max': ms.max()})
+
+
+def report(records, steps):
+    results = pd.DataFrame(records)
+    ok = results[results['status'] == 200]
+    print("\nThroughput and latency per concurrency step (ms)")
+    summary = ok.groupby('users')['ms'].apply(percentiles).unstack()
+    summary.insert(1, 'errors', results[results['status'] != 200].groupby('users').size().reindex(summary.index).fillna(0))
+    summary.insert(2, 'req/s', [step['requests'] / step['seconds'] for step in steps])
+    summary['peak RSS MB'] = [step['rss'] / 1e6 for step in steps]
+    print(summary.round(1).to_string())
+    print("\nLatency per callback and tab (ms)")
+    detail = ok.groupby(['users', 'callback', 'tab'])['ms'].apply(percentiles).unstack()
+    detail['kB'] = ok.groupby(['users', 'callback', 'tab'])['bytes'].mean() / 1024
+    print(detail.round(1).to_string())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 5, 10, 20], help="Concurrent users per step")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per step")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean seconds between a user's actions")
+    parser.add_argument("--rows", type=int, default=5400, help="Synthetic snapshot size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="Test an already running server instead of starting app.py")
+    parser.add_argument("--pid", type=int, help="Server process to measure RSS of (with --url)")
+    parser.add_argument("--output", help="Write every request (users, callback, tab, ms, status, bytes) to this CSV")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Exit non-zero above this failed-request share")
+    args = parser.parse_args()
+
+    server, pid, base_url = None, args.pid, args.url
+    workdir = tempfile.mkdtemp(prefix="squeeze_load_")
+    if base_url is None:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        print(f"Starting app.py on {base_url} with a {args.rows:,}-row synthetic snapshot (log: {workdir}/server.log)")
+        server = start_server(workdir, port, args.rows)
+        pid = server.pid
+    try:
+        asyncio.run(wait_until_ready(base_url))
+        records, steps = [], []
+        for users in args.users:
+            start = time.perf_counter()
+            step_records, rss = asyncio.run(run_step(base_url, users, args.duration, args.think, args.seed, pid))
+            seconds = time.perf_counter() - start
+            records += step_records
+            steps.append({'requests': len(step_records), 'seconds': seconds, 'rss': rss})
+            errors = sum(record['status'] != 200 for record in step_records)
+            print(f"{users:4d} users: {len(step_records):6d} requests in {seconds:.1f}s, {errors} errors, "
+                  f"peak RSS {rss / 1e6:.0f} MB")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    results = report(records, steps)
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\nWrote {len(results):,} requests to {args.output}")
+    error_rate = (results['status'] != 200).mean() if len(results) else 1.0
+    if error_rate > args.max_error_rate:
+        print(f"FAILED: {error_rate:.1%} of requests failed (limit {args.max_error_rate:.1%})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
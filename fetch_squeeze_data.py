@@ -1,22 +1,35 @@
+import argparse
 import requests
 import pandas as pd
 from datetime import datetime
+from io import BytesIO
 import os
+from squeeze.alerts import scan_snapshot
+from squeeze.audit import write_record
+from squeeze.config import add_config_arguments, configure
+from squeeze.backfill import store_snapshot
+from squeeze.history import load_manifest, record_raw_payload, save_manifest, saved_copy
+from squeeze.loader import fetch_payload, prepare_snapshot
 
 def fetch_squeeze_data():
     """
-    Fetches latest data from SqueezeMetrics API and saves to Excel file
+    Fetches latest data from SqueezeMetrics API and saves to Excel file.
+    A payload byte-identical to one already saved is not saved or processed
+    again (returns None).
     """
-    api_url = "https://squeezemetrics.com/monitor/api/latest?format=csv&key=0B7661B124724CA4C43BED7742F01266945A7B04BF698A758C9101727FE7392D"
-    
     try:
-        # Fetch data from API
-        response = requests.get(api_url)
-        response.raise_for_status()
+        # Fetch data from API (URL, key and timeout from the settings)
+        body, record = fetch_payload(source='fetch_squeeze_data')
+        
+        # Skip duplicates of an earlier pull
+        duplicate_of = saved_copy(record['sha256'])
+        if duplicate_of:
+            print(f"Payload identical to {duplicate_of}, nothing new to save")
+            write_record({**record, 'duplicate_of': duplicate_of})
+            return None
         
         # Read CSV data into pandas DataFrame
-        from io import StringIO
-        df = pd.read_csv(StringIO(response.text))
+        df = pd.read_csv(BytesIO(body))
         
         # Generate filename with current date
         current_date = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -27,6 +40,22 @@ def fetch_squeeze_data():
         
         print(f"Data successfully saved to {filename}")
         print(f"Records fetched: {len(df)}")
+        write_record({**record, 'rows': len(df), 'file': filename})
+        record_raw_payload(record['sha256'], filename)
+        
+        # Into the history store too, so the next run's day-over-day rules compare against today
+        try:
+            manifest = load_manifest()
+            manifest[filename] = store_snapshot(df, filename)
+            save_manifest(manifest)
+        except Exception as e:
+            print(f"Error storing snapshot in the history store: {e}")
+        
+        # Alert rules against the last stored snapshot before today's and the saved book
+        try:
+            scan_snapshot(prepare_snapshot(df))
+        except Exception as e:
+            print(f"Error scanning alerts: {e}")
         return df
         
     except requests.exceptions.RequestException as e:
@@ -37,4 +66,7 @@ def fetch_squeeze_data():
         return None
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch the latest SqueezeMetrics snapshot to squeeze_data_*.xlsx")
+    add_config_arguments(parser)
+    configure(parser.parse_args())
     fetch_squeeze_data()
\ No newline at end of file
@@ -1,143 +1,257 @@
 import dash
-from dash import dcc, html, dash_table, Input, Output, State, callback
+from dash import dcc, html, dash_table, Input, Output, State, MATCH, ClientsideFunction, callback
 import plotly.express as px
+import plotly.figure_factory as ff
 import plotly.graph_objects as go
 import pandas as pd
 import dash_bootstrap_components as dbc
-import glob
-import os
+import time
 from datetime import datetime
+from squeeze import (load_snapshot, filter_snapshot, industry_dispersion, sector_momentum, sector_summary,
+                     build_portfolio, SimilarityIndex, NORM_COLS, RANK_FILTER_OPTIONS, RiskModel)
+from squeeze.alerts import SEVERITIES, read_events
+from squeeze.correlation import SignalCorrelation
+from squeeze.decay import SignalDecay
+from squeeze.history import has_history
+from squeeze.pairs import PairIndex
+from squeeze.payload import columnar, enable_compression, encode_figure
+from squeeze.liquidity import LIQUIDATION_ADV_PCT, MAX_ADV_PCT, add_liquidity_columns, capacity_table, days_to_liquidate
+from squeeze.portfolio import BOOK_COLUMNS, LONG_EXIT_P_NN, PORTFOLIO_VALUE, SHORT_EXIT_P_NN, portfolio_universe
+from squeeze.rebalance import load_book, rebalance, save_book, snapshot_date
+from squeeze.risk import TARGET_VOL
+from squeeze.scenarios import ScenarioIndex, scenario_grid
+from squeeze.sessions import SessionStore
+from squeeze.tableview import WINDOW_ROWS, WINDOWED_MIN_ROWS, TableView
 
-# Load and clean data
-def load_clean_data():
-    excel_files = glob.glob("squeeze_data_*.xlsx")
-    latest_file = max(excel_files, key=os.path.getctime)
-    df = pd.read_excel(latest_file)
-    
-    # Simple, aggressive cleaning
-    df = df.dropna(subset=['TICKER'])
-    df = df.fillna('Unknown')  # Fill all NaN with 'Unknown'
-    
-    # Convert numeric columns back to numbers where needed
-    numeric_cols = ['P', 'P_NN', 'V', 'G', 'D', 'IV', 'CLOSE', 'VOLUME', 'OPEN', 'HIGH', 'LOW', 'P_NORM', 'V_NORM', 'G_NORM', 'D_NORM', 'IV_NORM']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
-    print(f"Loaded {len(df)} clean records")
-    return df
+# Load the latest locally saved snapshot
+df = load_snapshot('xlsx')
+
+# Nearest-neighbor index over the normalized signal vector, built once per snapshot
+similarity_index = SimilarityIndex(df)
+
+# Sorted P_NN index per ETF mode / sector / industry for the What-If tab
+scenario_index = ScenarioIndex(df)
+
+# Signal moment cubes per filter combination for the Analysis tab's correlation view
+signal_correlation = SignalCorrelation(df)
+
+# Per-session state (the current book) kept server side, keyed by the session-id store
+sessions = SessionStore()
+
+# Covariance model over the stored CLOSE history, built on first use of the Balance Analysis tab
+risk_model = None
+
+
+def get_risk_model():
+    global risk_model
+    if risk_model is None and has_history():
+        risk_model = RiskModel.from_store()
+    return risk_model
 
-df = load_clean_data()
+# Signal persistence over the stored snapshots, built on first use of the Signal Decay tab
+decay_model = None
+
+
+def get_decay_model():
+    global decay_model
+    if decay_model is None and has_history():
+        decay_model = SignalDecay.from_store()
+    return decay_model
 
 # Initialize app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = "SqueezeMetrics Financial Dashboard"
+enable_compression(app.server)
+
+# Large tables ship as a columnar payload and are rebuilt into records in the browser (assets/payload.js)
+app.clientside_callback(
+    ClientsideFunction(namespace="payload", function_name="decode_table"),
+    Output({'type': 'columnar-table', 'index': MATCH}, 'data'),
+    Input({'type': 'columnar-data', 'index': MATCH}, 'data')
+)
+
+
+def columnar_table(name, frame, **kwargs):
+    """DataTable fed from a columnar dcc.Store; only the displayed columns are sent"""
+    return html.Div([
+        dcc.Store(id={'type': 'columnar-data', 'index': name}, data=columnar(frame, [col['id'] for col in kwargs['columns']])),
+        dash_table.DataTable(id={'type': 'columnar-table', 'index': name}, data=[], **kwargs)
+    ])
+
+
+def records_table(name, frame, session_id, page_size, **kwargs):
+    """
+    Sortable, filterable DataTable. Short tables ship whole and sort/filter/page
+    in the browser; from WINDOWED_MIN_ROWS rows on, the rows stay in the
+    session's TableView and the browser only ever receives the window on
+    screen, so 'All Records' costs about the same as 'Top 50' on first paint.
+    """
+    if len(frame) < WINDOWED_MIN_ROWS or session_id is None:
+        return columnar_table(name, frame, sort_action="native", filter_action="native",
+                              page_action="native", page_size=page_size, **kwargs)
+    view = TableView(frame, [col['id'] for col in kwargs['columns']])
+    sessions.put(session_id, f"table-{name}", view)
+    data, page_count = view.window()
+    return dash_table.DataTable(
+        id={'type': 'windowed-table', 'index': name}, data=data,
+        page_action="custom", page_current=0, page_size=WINDOW_ROWS, page_count=page_count,
+        sort_action="custom", sort_mode="single", sort_by=[], filter_action="custom", filter_query="",
+        virtualization=True, fixed_rows={'headers': True}, style_table={'height': '600px', 'overflowY': 'auto'},
+        **kwargs)
+
+
+@app.callback(
+    Output({'type': 'windowed-table', 'index': MATCH}, 'data'),
+    Output({'type': 'windowed-table', 'index': MATCH}, 'page_count'),
+    Output({'type': 'windowed-table', 'index': MATCH}, 'page_current'),
+    Input({'type': 'windowed-table', 'index': MATCH}, 'page_current'),
+    Input({'type': 'windowed-table', 'index': MATCH}, 'sort_by'),
+    Input({'type': 'windowed-table', 'index': MATCH}, 'filter_query'),
+    State({'type': 'windowed-table', 'index': MATCH}, 'page_size'),
+    State({'type': 'windowed-table', 'index': MATCH}, 'id'),
+    State("session-id", "data"),
+    prevent_initial_call=True
+)
+def page_records(page_current, sort_by, filter_query, page_size, table_id, session_id):
+    """Next window of a server-side table; a new sort or filter starts again from the top"""
+    key = f"table-{table_id['index']}"
+    view = sessions.get(session_id, key)
+    if view is None:
+        return dash.no_update, dash.no_update, dash.no_update
+    paging = any(trigger['prop_id'].endswith('.page_current') for trigger in dash.ctx.triggered)
+    page_current = page_current if paging else 0
+    data, page_count = view.window(page_current, page_size, sort_by, filter_query)
+    if not paging:
+        # A new sort or filter caches a new view inside the TableView
+        sessions.resize(session_id, key)
+    return data, page_count, dash.no_update if paging else page_current
 
 # Enhanced layout with professional styling
-app.layout = dbc.Container([
-    # Header
-    dbc.Row([
-        dbc.Col([
-            html.Div([
-                html.H1("SqueezeMetrics Financial Dashboard", className="text-center text-white mb-2"),
-                html.P(f"Analyzing {len(df)} securities with P_NN neural network predictions", className="text-center text-white-50")
-            ], style={
-                'background': 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)',
-                'padding': '30px',
-                'borderRadius': '10px',
-                'marginBottom': '30px'
-            })
-        ])
-    ]),
+def serve_layout():
+    """Built per page load so every browser tab gets its own server-side session"""
+    return dbc.Container([
+        # Header
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H1("SqueezeMetrics Financial Dashboard", className="text-center text-white mb-2"),
+                    html.P(f"Analyzing {len(df)} securities with P_NN neural network predictions", className="text-center text-white-50")
+                ], style={
+                    'background': 'linear-gradient(135deg, #667eea 0%, #764ba2 100%)',
+                    'padding': '30px',
+                    'borderRadius': '10px',
+                    'marginBottom': '30px'
+                })
+            ])
+        ]),
     
-    # Control Panel
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader("Filters & Controls"),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            html.Label("Sector Filter:", className="fw-bold"),
-                            dcc.Dropdown(
-                                id="sector-filter",
-                                options=[{"label": "All Sectors", "value": "All"}] + 
-                                        [{"label": sector, "value": sector} for sector in sorted(df['SECTOR'].unique()) if sector != 'Unknown'],
-                                value="All",
-                                clearable=False
-                            )
-                        ], width=3),
-                        dbc.Col([
-                            html.Label("Industry Filter:", className="fw-bold"),
-                            dcc.Dropdown(
-                                id="industry-filter",
-                                options=[{"label": "All Industries", "value": "All"}] + 
-                                        [{"label": industry, "value": industry} for industry in sorted(df['INDUSTRY'].unique()) if industry != 'Unknown'],
-                                value="All",
-                                clearable=False
-                            )
-                        ], width=3),
-                        dbc.Col([
-                            html.Label("Records to Show:", className="fw-bold"),
-                            dcc.Dropdown(
-                                id="records-filter", 
-                                options=[
-                                    {"label": "Top 50", "value": 50},
-                                    {"label": "Top 100", "value": 100},
-                                    {"label": "Top 200", "value": 200},
-                                    {"label": "All Records", "value": len(df)}
-                                ],
-                                value=len(df),
-                                clearable=False
-                            )
-                        ], width=3),
-                        dbc.Col([
-                            html.Label("Min P_NN Value:", className="fw-bold"),
-                            dcc.Input(
-                                id="pnn-filter",
-                                type="number",
-                                value=0,
-                                step=0.01,
-                                placeholder="Filter by P_NN..."
-                            )
-                        ], width=3)
-                    ]),
-                    dbc.Row([
-                        dbc.Col([
-                            html.Label("ETF Filter:", className="fw-bold mt-3"),
-                            dcc.RadioItems(
-                                id="etf-filter",
-                                options=[
-                                    {"label": " Include ETFs", "value": "include"},
-                                    {"label": " Exclude ETFs", "value": "exclude"},
-                                    {"label": " ETFs Only", "value": "only"}
-                                ],
-                                value="exclude",
-                                inline=True,
-                                className="mt-2"
-                            )
-                        ], width=12)
+        # Control Panel
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("Filters & Controls"),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                html.Label("Sector Filter:", className="fw-bold"),
+                                dcc.Dropdown(
+                                    id="sector-filter",
+                                    options=[{"label": "All Sectors", "value": "All"}] + 
+                                            [{"label": sector, "value": sector} for sector in sorted(df['SECTOR'].unique()) if sector != 'Unknown'],
+                                    value="All",
+                                    clearable=False
+                                )
+                            ], width=3),
+                            dbc.Col([
+                                html.Label("Industry Filter:", className="fw-bold"),
+                                dcc.Dropdown(
+                                    id="industry-filter",
+                                    options=[{"label": "All Industries", "value": "All"}] + 
+                                            [{"label": industry, "value": industry} for industry in sorted(df['INDUSTRY'].unique()) if industry != 'Unknown'],
+                                    value="All",
+                                    clearable=False
+                                )
+                            ], width=3),
+                            dbc.Col([
+                                html.Label("Records to Show:", className="fw-bold"),
+                                dcc.Dropdown(
+                                    id="records-filter", 
+                                    options=[
+                                        {"label": "Top 50", "value": 50},
+                                        {"label": "Top 100", "value": 100},
+                                        {"label": "Top 200", "value": 200},
+                                        {"label": "All Records", "value": len(df)}
+                                    ],
+                                    value=len(df),
+                                    clearable=False
+                                )
+                            ], width=3),
+                            dbc.Col([
+                                html.Label("Min P_NN Value:", className="fw-bold"),
+                                dcc.Input(
+                                    id="pnn-filter",
+                                    type="number",
+                                    value=0,
+                                    step=0.01,
+                                    placeholder="Filter by P_NN..."
+                                )
+                            ], width=3)
+                        ]),
+                        dbc.Row([
+                            dbc.Col([
+                                html.Label("ETF Filter:", className="fw-bold mt-3"),
+                                dcc.RadioItems(
+                                    id="etf-filter",
+                                    options=[
+                                        {"label": " Include ETFs", "value": "include"},
+                                        {"label": " Exclude ETFs", "value": "exclude"},
+                                        {"label": " ETFs Only", "value": "only"}
+                                    ],
+                                    value="exclude",
+                                    inline=True,
+                                    className="mt-2"
+                                )
+                            ], width=6),
+                            dbc.Col([
+                                html.Label("Signal Percentile:", className="fw-bold mt-3"),
+                                dcc.Dropdown(
+                                    id="rank-filter",
+                                    options=RANK_FILTER_OPTIONS,
+                                    value="all",
+                                    clearable=False
+                                )
+                            ], width=6)
+                        ])
                     ])
                 ])
             ])
-        ])
-    ], className="mb-4"),
+        ], className="mb-4"),
     
-    # Metrics Dashboard
-    html.Div(id="metrics-cards"),
+        # Metrics Dashboard
+        html.Div(id="metrics-cards"),
     
-    # Navigation Tabs
-    dcc.Tabs(id="tabs", value="overview", children=[
-        dcc.Tab(label="📊 Overview", value="overview"),
-        dcc.Tab(label="🏆 Rankings", value="rankings"),
-        dcc.Tab(label="🔄 Pair Trades", value="pairs"),
-        dcc.Tab(label="📈 Analysis", value="analysis"), 
-        dcc.Tab(label="🏢 Sectors", value="sectors"),
-        dcc.Tab(label="💼 Portfolio", value="portfolio"),
-        dcc.Tab(label="📋 Data Export", value="export")
-    ]),
+        # Navigation Tabs
+        dcc.Tabs(id="tabs", value="overview", children=[
+            dcc.Tab(label="📊 Overview", value="overview"),
+            dcc.Tab(label="🏆 Rankings", value="rankings"),
+            dcc.Tab(label="🔄 Pair Trades", value="pairs"),
+            dcc.Tab(label="📈 Analysis", value="analysis"), 
+            dcc.Tab(label="🏢 Sectors", value="sectors"),
+            dcc.Tab(label="🧭 Similar", value="similar"),
+            dcc.Tab(label="🧪 What-If", value="whatif"),
+            dcc.Tab(label="🚨 Alerts", value="alerts"),
+            dcc.Tab(label="⏳ Signal Decay", value="decay"),
+            dcc.Tab(label="💼 Portfolio", value="portfolio"),
+            dcc.Tab(label="📋 Data Export", value="export")
+        ]),
     
-    html.Div(id="tab-content")
-])
+        html.Div(id="tab-content"),
+        
+        # Session token: the book and other per-user state live server side in `sessions`
+        dcc.Store(id="session-id", data=sessions.new_session())
+    ])
+
+app.layout = serve_layout
 
 # Callback for metrics cards
 @app.callback(
@@ -146,26 +260,11 @@ app.layout = dbc.Container([
      Input("industry-filter", "value"),
      Input("records-filter", "value"),
      Input("pnn-filter", "value"),
-     Input("etf-filter", "value")]
+     Input("etf-filter", "value"),
+     Input("rank-filter", "value")]
 )
-def update_metrics(sector, industry, records, min_pnn, etf_filter):
-    # Filter data
-    filtered_df = df.copy()
-    
-    # ETF filtering
-    if etf_filter == "exclude":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] != 'ETF']
-    elif etf_filter == "only":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] == 'ETF']
-    # "include" means no ETF filtering
-    
-    if sector != "All":
-        filtered_df = filtered_df[filtered_df['SECTOR'] == sector]
-    if industry != "All":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] == industry]
-    if min_pnn:
-        filtered_df = filtered_df[filtered_df['P_NN'] >= min_pnn]
-    filtered_df = filtered_df.head(records)
+def update_metrics(sector, industry, records, min_pnn, etf_filter, rank_filter):
+    filtered_df = filter_snapshot(df, sector, industry, records, min_pnn, etf_filter, rank_filter)
     
     if len(filtered_df) == 0:
         return dbc.Alert("No data matches the current filters.", color="warning")
@@ -235,26 +334,12 @@ def update_metrics(sector, industry, records, min_pnn, etf_filter):
      Input("industry-filter", "value"),
      Input("records-filter", "value"),
      Input("pnn-filter", "value"),
-     Input("etf-filter", "value")]
+     Input("etf-filter", "value"),
+     Input("rank-filter", "value")],
+    State("session-id", "data")
 )
-def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
-    # Filter data
-    filtered_df = df.copy()
-    
-    # ETF filtering
-    if etf_filter == "exclude":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] != 'ETF']
-    elif etf_filter == "only":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] == 'ETF']
-    # "include" means no ETF filtering
-    
-    if sector != "All":
-        filtered_df = filtered_df[filtered_df['SECTOR'] == sector]
-    if industry != "All":
-        filtered_df = filtered_df[filtered_df['INDUSTRY'] == industry]
-    if min_pnn:
-        filtered_df = filtered_df[filtered_df['P_NN'] >= min_pnn]
-    filtered_df = filtered_df.head(records)
+def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter, rank_filter, session_id=None):
+    filtered_df = filter_snapshot(df, sector, industry, records, min_pnn, etf_filter, rank_filter)
     
     if len(filtered_df) == 0:
         return dbc.Alert("No data matches the current filters.", color="warning")
@@ -266,25 +351,37 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
                 html.Strong("💡 Filtering Tips: "),
                 "Type in column filters below. Case-insensitive partial matching! Try: 'tech' (finds Technology), 'apple' (finds Apple Inc), '>0.1' (P_NN > 0.1)"
             ], color="info", className="mb-3"),
-            dash_table.DataTable(
-                data=filtered_df.to_dict('records'),
+            records_table(
+                "overview", filtered_df, session_id,
                 columns=[
                     {'name': 'Ticker', 'id': 'TICKER'},
                     {'name': 'Name', 'id': 'NAME'}, 
                     {'name': 'Sector', 'id': 'SECTOR'},
                     {'name': 'P Score', 'id': 'P', 'type': 'numeric', 'format': {'specifier': '.3f'}},
+                    {'name': 'P %ile', 'id': 'P_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'P Sector %ile', 'id': 'P_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'P Industry %ile', 'id': 'P_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
                     {'name': 'P_NN 🧠', 'id': 'P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                    {'name': 'P_NN %ile', 'id': 'P_NN_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'P_NN Sector %ile', 'id': 'P_NN_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'P_NN Industry %ile', 'id': 'P_NN_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
                     {'name': 'V Score', 'id': 'V', 'type': 'numeric', 'format': {'specifier': '.3f'}},
                     {'name': 'G Score', 'id': 'G', 'type': 'numeric', 'format': {'specifier': '.3f'}},
+                    {'name': 'G %ile', 'id': 'G_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'G Sector %ile', 'id': 'G_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'G Industry %ile', 'id': 'G_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
                     {'name': 'D Score', 'id': 'D', 'type': 'numeric', 'format': {'specifier': '.3f'}},
+                    {'name': 'D %ile', 'id': 'D_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'D Sector %ile', 'id': 'D_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'D Industry %ile', 'id': 'D_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
                     {'name': 'IV', 'id': 'IV', 'type': 'numeric', 'format': {'specifier': '.1f'}},
+                    {'name': 'IV %ile', 'id': 'IV_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'IV Sector %ile', 'id': 'IV_SECTOR_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
+                    {'name': 'IV Industry %ile', 'id': 'IV_INDUSTRY_PCTL', 'type': 'numeric', 'format': {'specifier': '.0%'}},
                     {'name': 'Close ($)', 'id': 'CLOSE', 'type': 'numeric', 'format': {'specifier': '$.2f'}},
                     {'name': 'Volume', 'id': 'VOLUME', 'type': 'numeric', 'format': {'specifier': ',.0f'}},
                 ],
-                sort_action="native",
-                filter_action="native",
                 filter_options={"case": "insensitive"},
-                page_action="native",
                 page_size=50,
                 style_cell={'textAlign': 'left', 'fontSize': 12},
                 style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
@@ -314,24 +411,11 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
         # Get sector leaderboards (top 10 and bottom 10 per sector)
         sectors = [s for s in filtered_df['SECTOR'].unique() if s not in ['Unknown', '-']]
         
-        # Industry P_NN dispersion analysis
-        industry_stats = filtered_df.groupby('INDUSTRY').agg({
-            'P_NN': ['mean', 'std', 'min', 'max', 'count']
-        }).round(4)
-        industry_stats.columns = ['Avg_P_NN', 'StdDev_P_NN', 'Min_P_NN', 'Max_P_NN', 'Count']
-        industry_stats['P_NN_Range'] = industry_stats['Max_P_NN'] - industry_stats['Min_P_NN']
-        industry_stats = industry_stats.reset_index()
-        industry_stats = industry_stats[industry_stats['Count'] >= 3]  # Only industries with 3+ stocks
-        industry_stats = industry_stats.sort_values('P_NN_Range', ascending=False)
+        # Industry P_NN dispersion analysis (industries with 3+ stocks)
+        industry_stats = industry_dispersion(filtered_df)
         
-        # Sector momentum analysis
-        sector_momentum = filtered_df.groupby('SECTOR').agg({
-            'P_NN': ['mean', 'count']
-        }).round(4)
-        sector_momentum.columns = ['Avg_P_NN', 'Count']
-        sector_momentum = sector_momentum.reset_index()
-        sector_momentum = sector_momentum[sector_momentum['Count'] >= 5]  # Only sectors with 5+ stocks
-        sector_momentum = sector_momentum.sort_values('Avg_P_NN', ascending=False)
+        # Sector momentum analysis (sectors with 5+ stocks)
+        momentum = sector_momentum(filtered_df)
         
         # Create sector leaderboard cards
         sector_cards = []
@@ -365,7 +449,7 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
         
         # Create charts
         sector_chart = px.bar(
-            sector_momentum, x='SECTOR', y='Avg_P_NN',
+            momentum, x='SECTOR', y='Avg_P_NN',
             title="Sector P_NN Momentum (Average P_NN by Sector)",
             color='Avg_P_NN', color_continuous_scale='RdYlGn'
         )
@@ -431,7 +515,7 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
             # Sector Momentum Table
             html.H4("🚀 Sector Momentum Rankings", className="mt-4 mb-3"),
             dash_table.DataTable(
-                data=sector_momentum.to_dict('records'),
+                data=momentum.to_dict('records'),
                 columns=[
                     {'name': 'Sector', 'id': 'SECTOR'},
                     {'name': 'Average P_NN', 'id': 'Avg_P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
@@ -457,229 +541,27 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
         ])
     
     elif tab == "pairs":
-        # Pair Trade Generator
-        
-        # Add dollar volume for market cap proxy
-        filtered_df_copy = filtered_df.copy()
-        filtered_df_copy['DOLLAR_VOLUME'] = filtered_df_copy['CLOSE'] * filtered_df_copy['VOLUME']
-        
-        # Create market cap buckets
-        q25, q75 = filtered_df_copy['DOLLAR_VOLUME'].quantile([0.25, 0.75])
-        filtered_df_copy['MARKET_CAP_BUCKET'] = pd.cut(
-            filtered_df_copy['DOLLAR_VOLUME'],
-            bins=[0, q25, q75, float('inf')],
-            labels=['Small', 'Mid', 'Large']
-        )
-        
-        # Generate pairs within same industry
-        industries_with_pairs = []
-        all_pairs = []
-        
-        for industry in filtered_df_copy['INDUSTRY'].unique():
-            if industry in ['Unknown', 'ETF']:
-                continue
-                
-            industry_stocks = filtered_df_copy[filtered_df_copy['INDUSTRY'] == industry]
-            if len(industry_stocks) < 2:
-                continue
-            
-            # Sort by P_NN
-            industry_stocks = industry_stocks.sort_values('P_NN', ascending=False)
-            
-            # Find pairs with sufficient P_NN spread
-            high_pnn = industry_stocks[industry_stocks['P_NN'] > 0.02]  # Longs
-            low_pnn = industry_stocks[industry_stocks['P_NN'] < -0.02]   # Shorts
-            
-            if len(high_pnn) == 0 or len(low_pnn) == 0:
-                continue
-            
-            # Generate pairs within same market cap bucket when possible
-            for _, long_stock in high_pnn.head(3).iterrows():  # Top 3 longs
-                for _, short_stock in low_pnn.tail(3).iterrows():  # Bottom 3 shorts
-                    
-                    pnn_spread = long_stock['P_NN'] - short_stock['P_NN']
-                    
-                    # Only include pairs with meaningful spread
-                    if pnn_spread < 0.05:
-                        continue
-                    
-                    # Market cap compatibility check
-                    same_bucket = long_stock['MARKET_CAP_BUCKET'] == short_stock['MARKET_CAP_BUCKET']
-                    
-                    # Volume check for liquidity
-                    min_volume = min(long_stock['VOLUME'], short_stock['VOLUME'])
-                    if min_volume < 100000:  # Skip illiquid stocks
-                        continue
-                    
-                    pair = {
-                        'INDUSTRY': industry,
-                        'LONG_TICKER': long_stock['TICKER'],
-                        'LONG_P_NN': long_stock['P_NN'],
-                        'LONG_CLOSE': long_stock['CLOSE'],
-                        'LONG_VOLUME': long_stock['VOLUME'],
-                        'LONG_MARKET_CAP': long_stock['MARKET_CAP_BUCKET'],
-                        'SHORT_TICKER': short_stock['TICKER'],
-                        'SHORT_P_NN': short_stock['P_NN'],
-                        'SHORT_CLOSE': short_stock['CLOSE'],
-                        'SHORT_VOLUME': short_stock['VOLUME'],
-                        'SHORT_MARKET_CAP': short_stock['MARKET_CAP_BUCKET'],
-                        'P_NN_SPREAD': pnn_spread,
-                        'MIN_VOLUME': min_volume,
-                        'MARKET_CAP_MATCH': same_bucket
-                    }
-                    all_pairs.append(pair)
-            
-            if len(high_pnn) > 0 and len(low_pnn) > 0:
-                industries_with_pairs.append({
-                    'INDUSTRY': industry,
-                    'LONG_COUNT': len(high_pnn),
-                    'SHORT_COUNT': len(low_pnn),
-                    'TOTAL_STOCKS': len(industry_stocks),
-                    'AVG_P_NN_SPREAD': industry_stocks['P_NN'].max() - industry_stocks['P_NN'].min()
-                })
-        
-        # Convert to DataFrames
-        pairs_df = pd.DataFrame(all_pairs)
-        industries_df = pd.DataFrame(industries_with_pairs)
-        
-        if len(pairs_df) == 0:
-            return html.Div([
-                html.H3("🔄 Pair Trade Generator", className="mt-3 mb-3"),
-                dbc.Alert("No suitable pairs found with current filters. Try adjusting P_NN or sector filters.", 
-                         color="warning")
-            ])
-        
-        # Sort pairs by P_NN spread (best opportunities first)
-        pairs_df = pairs_df.sort_values('P_NN_SPREAD', ascending=False)
-        industries_df = industries_df.sort_values('AVG_P_NN_SPREAD', ascending=False)
-        
-        # Show all pairs with pagination
-        display_pairs = pairs_df  # Show all pairs
-        
+        # Pair Trade Generator: the scope selector drives the pairs-results callback
         return html.Div([
             html.H3("🔄 Pair Trade Generator", className="mt-3 mb-3"),
-            html.P("Auto-generated long/short pairs within same industries based on P_NN spreads", 
-                   className="text-muted"),
-            
-            
-            # Summary cards
+            html.P("Every long/short combination within an industry (or sector) ranked by P_NN spread per unit of "
+                   "hedged spread volatility", className="text-muted"),
             dbc.Row([
                 dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4(f"{len(pairs_df):,}", className="text-primary"),
-                            html.P("Total Pairs Generated", className="mb-0")
-                        ])
-                    ])
-                ], width=3),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4(f"{len(industries_df):,}", className="text-success"),
-                            html.P("Industries with Pairs", className="mb-0")
-                        ])
-                    ])
-                ], width=3),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4(f"{pairs_df['P_NN_SPREAD'].max():.4f}", className="text-warning"),
-                            html.P("Max P_NN Spread", className="mb-0")
-                        ])
-                    ])
-                ], width=3),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H4(f"{len(pairs_df[pairs_df['MARKET_CAP_MATCH']])}", className="text-info"),
-                            html.P("Market Cap Matched", className="mb-0")
-                        ])
-                    ])
-                ], width=3)
-            ], className="mb-4"),
-            
-            # All pair trades table with pagination  
-            html.H4(f"🔥 All {len(pairs_df)} Pair Trade Opportunities", className="mb-3"),
-            dbc.Alert([
-                html.Strong("🎯 Filter Examples: "),
-                "Industry: 'software', 'bio' | Long/Short: 'AAPL', 'tesla' | P_NN Spread: '>0.15' | Cap Match: 'true'"
-            ], color="info", className="mb-3"),
-            dash_table.DataTable(
-                data=display_pairs.to_dict('records'),
-                columns=[
-                    {'name': 'Industry', 'id': 'INDUSTRY'},
-                    {'name': 'Long', 'id': 'LONG_TICKER'},
-                    {'name': 'Long P_NN', 'id': 'LONG_P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
-                    {'name': 'Short', 'id': 'SHORT_TICKER'},
-                    {'name': 'Short P_NN', 'id': 'SHORT_P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
-                    {'name': 'P_NN Spread', 'id': 'P_NN_SPREAD', 'type': 'numeric', 'format': {'specifier': '.4f'}},
-                    {'name': 'Long Price', 'id': 'LONG_CLOSE', 'type': 'numeric', 'format': {'specifier': '$.2f'}},
-                    {'name': 'Short Price', 'id': 'SHORT_CLOSE', 'type': 'numeric', 'format': {'specifier': '$.2f'}},
-                    {'name': 'Min Volume', 'id': 'MIN_VOLUME', 'type': 'numeric', 'format': {'specifier': ',.0f'}},
-                    {'name': 'Cap Match', 'id': 'MARKET_CAP_MATCH', 'type': 'text'}
-                ],
-                sort_action="native",
-                filter_action="native",
-                filter_options={"case": "insensitive"},
-                page_action="native",
-                page_size=25,
-                style_cell={'textAlign': 'left', 'fontSize': 11},
-                style_data_conditional=[
-                    {
-                        'if': {'filter_query': '{P_NN_SPREAD} > 0.15'},
-                        'backgroundColor': '#d4edda',
-                        'color': 'black',
-                    },
-                    {
-                        'if': {'filter_query': '{P_NN_SPREAD} > 0.10 && {P_NN_SPREAD} <= 0.15'},
-                        'backgroundColor': '#fff3cd',
-                        'color': 'black',
-                    },
-                    {
-                        'if': {'filter_query': '{MARKET_CAP_MATCH} = True'},
-                        'fontWeight': 'bold'
-                    }
-                ]
-            ),
-            
-            # Industry pair opportunities
-            html.H4("🎯 Industries with Best Pair Opportunities", className="mt-4 mb-3"),
-            dash_table.DataTable(
-                data=industries_df.head(15).to_dict('records'),
-                columns=[
-                    {'name': 'Industry', 'id': 'INDUSTRY'},
-                    {'name': 'Long Ideas', 'id': 'LONG_COUNT', 'type': 'numeric'},
-                    {'name': 'Short Ideas', 'id': 'SHORT_COUNT', 'type': 'numeric'},
-                    {'name': 'Total Stocks', 'id': 'TOTAL_STOCKS', 'type': 'numeric'},
-                    {'name': 'P_NN Spread', 'id': 'AVG_P_NN_SPREAD', 'type': 'numeric', 'format': {'specifier': '.4f'}}
-                ],
-                sort_action="native",
-                filter_action="native",
-                filter_options={"case": "insensitive"},
-                style_cell={'textAlign': 'left'},
-                style_data_conditional=[
-                    {
-                        'if': {'filter_query': '{AVG_P_NN_SPREAD} > 0.3'},
-                        'backgroundColor': '#d4edda',
-                        'color': 'black',
-                    }
-                ]
-            ),
-            
-            # Trading notes
-            dbc.Card([
-                dbc.CardHeader("📝 Trading Notes"),
-                dbc.CardBody([
-                    html.P("🎯 P_NN Spread Interpretation:", className="fw-bold"),
-                    html.Ul([
-                        html.Li("Green (>0.15): Exceptional pair opportunity"),
-                        html.Li("Yellow (0.10-0.15): Strong pair opportunity"), 
-                        html.Li("White (<0.10): Moderate pair opportunity")
-                    ]),
-                    html.P("💡 Market Cap Match (Bold): Same size bucket for cleaner pair", className="fw-bold mt-3"),
-                    html.P("⚡ Min Volume: Liquidity check for execution", className="fw-bold"),
-                ])
-            ], className="mt-4")
+                    html.Label("Pair Scope:", className="fw-bold"),
+                    dcc.RadioItems(
+                        id="pairs-scope",
+                        options=[
+                            {"label": " Same Industry", "value": "INDUSTRY"},
+                            {"label": " Same Sector (cross-industry)", "value": "SECTOR"}
+                        ],
+                        value="INDUSTRY",
+                        inline=True,
+                        inputStyle={'marginLeft': '12px'}
+                    )
+                ], width=12)
+            ], className="mb-3"),
+            html.Div(id="pairs-results")
         ])
     
     elif tab == "analysis":
@@ -700,27 +582,55 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
         
         return html.Div([
             html.H3("📈 Advanced Analysis", className="mt-3 mb-3"),
+            html.H4("Signal Correlation & Clustering", className="mb-3"),
             dbc.Row([
-                dbc.Col([dcc.Graph(figure=fig1)], width=6),
-                dbc.Col([dcc.Graph(figure=fig2)], width=6)
+                dbc.Col([
+                    html.Label("Signals:", className="fw-bold"),
+                    dcc.RadioItems(
+                        id="corr-signals",
+                        options=[
+                            {"label": " Raw (P, V, G, D, IV, P_NN)", "value": "raw"},
+                            {"label": " Normalized (_NORM + P_NN)", "value": "norm"},
+                            {"label": " Both", "value": "all"}
+                        ],
+                        value="all",
+                        inline=True,
+                        persistence=True,
+                        className="mt-2"
+                    )
+                ], width=7),
+                dbc.Col([
+                    html.Label("Cluster By:", className="fw-bold"),
+                    dcc.RadioItems(
+                        id="corr-level",
+                        options=[
+                            {"label": " Sector", "value": "SECTOR"},
+                            {"label": " Industry", "value": "INDUSTRY"}
+                        ],
+                        value="SECTOR",
+                        inline=True,
+                        persistence=True,
+                        className="mt-2"
+                    )
+                ], width=5)
+            ], className="mb-3"),
+            html.Div(id="corr-results"),
+            dbc.Row([
+                dbc.Col([dcc.Graph(figure=encode_figure(fig1))], width=6),
+                dbc.Col([dcc.Graph(figure=encode_figure(fig2))], width=6)
             ]),
             dbc.Row([
-                dbc.Col([dcc.Graph(figure=fig3)], width=12)
+                dbc.Col([dcc.Graph(figure=encode_figure(fig3))], width=12)
             ])
         ])
     
     elif tab == "sectors":
         # Sector analysis
-        sector_summary = filtered_df.groupby('SECTOR').agg({
-            'P': 'mean', 'P_NN': 'mean', 'V': 'mean', 'G': 'mean', 'D': 'mean',
-            'VOLUME': 'sum', 'TICKER': 'count'
-        }).round(4)
-        sector_summary.columns = ['Avg_P', 'Avg_P_NN', 'Avg_V', 'Avg_G', 'Avg_D', 'Total_Volume', 'Count']
-        sector_summary = sector_summary.reset_index()
+        summary = sector_summary(filtered_df)
         
         fig = go.Figure(data=go.Heatmap(
-            z=[sector_summary['Avg_P'], sector_summary['Avg_P_NN'], sector_summary['Avg_V']],
-            x=sector_summary['SECTOR'],
+            z=[summary['Avg_P'], summary['Avg_P_NN'], summary['Avg_V']],
+            x=summary['SECTOR'],
             y=['P Score', 'P_NN (Neural Net)', 'V Score'],
             colorscale='RdYlGn'
         ))
@@ -731,8 +641,8 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
             dcc.Graph(figure=fig),
             html.H4("Sector Summary Table", className="mt-4 mb-3"),
             dash_table.DataTable(
-                data=sector_summary.to_dict('records'),
-                columns=[{'name': col, 'id': col, 'type': 'numeric' if col != 'SECTOR' else 'text'} for col in sector_summary.columns],
+                data=summary.to_dict('records'),
+                columns=[{'name': col, 'id': col, 'type': 'numeric' if col != 'SECTOR' else 'text'} for col in summary.columns],
                 sort_action="native",
                 filter_action="native",
                 filter_options={"case": "insensitive"},
@@ -740,67 +650,208 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
             )
         ])
     
-    elif tab == "portfolio":
-        # Portfolio construction with constraints
+    elif tab == "similar":
+        # Similar positioning profile search (KD-tree over P_NORM..IV_NORM)
+        ticker_options = [{"label": f"{row['TICKER']} - {row['NAME']}", "value": row['TICKER']}
+                          for _, row in df[['TICKER', 'NAME']].iterrows()]
+        default_ticker = filtered_df.sort_values('P_NN', ascending=False)['TICKER'].iloc[0]
+        
+        return html.Div([
+            html.H3("🧭 Similar Securities", className="mt-3 mb-3"),
+            html.P("Nearest neighbors by normalized positioning profile (P, V, G, D, IV _NORM)", 
+                   className="text-muted"),
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Ticker:", className="fw-bold"),
+                    dcc.Dropdown(id="similar-ticker", options=ticker_options, value=default_ticker, clearable=False)
+                ], width=5),
+                dbc.Col([
+                    html.Label("Neighbors:", className="fw-bold"),
+                    dcc.Input(id="similar-k", type="number", value=10, min=1, max=100, step=1)
+                ], width=2),
+                dbc.Col([
+                    html.Label("Search Within:", className="fw-bold"),
+                    dcc.RadioItems(
+                        id="similar-scope",
+                        options=[
+                            {"label": " All Securities", "value": "all"},
+                            {"label": " Same Sector", "value": "sector"},
+                            {"label": " Same Industry", "value": "industry"}
+                        ],
+                        value="all",
+                        inline=True,
+                        className="mt-2"
+                    )
+                ], width=5)
+            ], className="mb-3"),
+            html.Div(id="similar-results")
+        ])
+    
+    elif tab == "whatif":
+        # Batch of filter scenarios evaluated side by side from the precomputed P_NN index
+        return html.Div([
+            html.H3("🧪 What-If Scenarios", className="mt-3 mb-3"),
+            html.P(f"Scenarios within Sector: {sector or 'All'} / Industry: {industry or 'All'} "
+                   "(set with the filters above); the records cap and percentile filter are not applied.",
+                   className="text-muted"),
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Min P_NN Thresholds (comma separated):", className="fw-bold"),
+                    dcc.Input(id="whatif-thresholds", type="text", value="0, 0.01, 0.02, 0.03, 0.05", debounce=True,
+                              style={'width': '100%'})
+                ], width=6),
+                dbc.Col([
+                    html.Label("ETF Modes:", className="fw-bold"),
+                    dcc.Checklist(
+                        id="whatif-etf",
+                        options=[
+                            {"label": " Include ETFs", "value": "include"},
+                            {"label": " Exclude ETFs", "value": "exclude"},
+                            {"label": " ETFs Only", "value": "only"}
+                        ],
+                        value=["exclude"],
+                        inline=True,
+                        className="mt-2"
+                    )
+                ], width=6)
+            ], className="mb-3"),
+            html.Div(id="whatif-results")
+        ])
+    
+    elif tab == "alerts":
+        # Events logged by the alert rules on each fetched snapshot
+        events = read_events()
+        if sector and sector != "All":
+            events = events[events['SECTOR'] == sector]
+        if industry and industry != "All":
+            events = events[events['INDUSTRY'] == industry]
+        if len(events) == 0:
+            return dbc.Alert("No alert events yet - they are logged by fetch_squeeze_data.py on each fetch "
+                             "(or run `python -m squeeze.alerts`).", color="info", className="mt-3")
         
-        # Apply $10M volume filter and exclude ETFs
-        portfolio_universe = filtered_df[
-            (filtered_df['VOLUME'] >= 10_000_000) & 
-            (filtered_df['INDUSTRY'] != 'ETF')
-        ].copy()
+        latest = events['SNAPSHOT_DATE'].max()
+        counts = events[events['SNAPSHOT_DATE'] == latest]['SEVERITY'].value_counts()
+        colors = {'critical': 'danger', 'warning': 'warning', 'info': 'info'}
         
-        # Sort by P_NN for long/short selection
-        portfolio_universe_sorted = portfolio_universe.sort_values('P_NN', ascending=False)
+        return html.Div([
+            html.H3("🚨 Signal Alerts", className="mt-3 mb-3"),
+            html.P(f"Latest scan: {latest} (Sector: {sector or 'All'} / Industry: {industry or 'All'})", className="text-muted"),
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardBody([
+                            html.H4(f"{counts.get(severity, 0)}", className=f"text-{colors[severity]}"),
+                            html.P(f"{severity.title()} events", className="mb-0")
+                        ])
+                    ])
+                ], width=4) for severity in SEVERITIES
+            ], className="mb-4"),
+            records_table(
+                "alerts", events, session_id,
+                columns=[
+                    {'name': 'Date', 'id': 'SNAPSHOT_DATE'},
+                    {'name': 'Severity', 'id': 'SEVERITY'},
+                    {'name': 'Rule', 'id': 'RULE'},
+                    {'name': 'Ticker', 'id': 'TICKER'},
+                    {'name': 'Name', 'id': 'NAME'},
+                    {'name': 'Sector', 'id': 'SECTOR'},
+                    {'name': 'Industry', 'id': 'INDUSTRY'},
+                    {'name': 'Field', 'id': 'FIELD'},
+                    {'name': 'Value', 'id': 'VALUE', 'type': 'numeric', 'format': {'specifier': '.4~f'}},
+                    {'name': 'Previous', 'id': 'PREV_VALUE', 'type': 'numeric', 'format': {'specifier': '.4~f'}},
+                    {'name': 'Description', 'id': 'DESCRIPTION'}
+                ],
+                filter_options={"case": "insensitive"},
+                page_size=50,
+                style_cell={'textAlign': 'left', 'fontSize': 12},
+                style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'},
+                style_data_conditional=[
+                    {'if': {'filter_query': '{SEVERITY} = "critical"'}, 'backgroundColor': '#f8d7da'},
+                    {'if': {'filter_query': '{SEVERITY} = "warning"'}, 'backgroundColor': '#fff3cd'}
+                ]
+            )
+        ])
+    
+    elif tab == "decay":
+        # How persistent P_NN, G and D are across the stored snapshots, for the filtered names
+        model = get_decay_model()
+        if model is None or len(model.dates) < 3:
+            return dbc.Alert("Signal decay needs at least three stored snapshots - build the history store with "
+                             "`python -m squeeze.backfill` or let fetch_squeeze_data.py collect them.",
+                             color="info", className="mt-3")
         
-        # Select candidates for longs (top P_NN values) and shorts (bottom P_NN values)
-        # Take top 50 for longs and bottom 50 for shorts to ensure we have enough candidates
-        long_candidates = portfolio_universe_sorted.head(50)
-        short_candidates = portfolio_universe_sorted.tail(50)
+        tickers = filtered_df['TICKER']
+        group = sector if sector in model.group_names else 'All'
+        summary = model.ticker_summary(tickers)
         
-        # Build balanced portfolio with constraints
-        def build_balanced_portfolio(candidates, target_count, is_long=True):
-            selected = []
-            sector_counts = {}
-            industry_counts = {}
-            
-            for _, stock in candidates.iterrows():
-                sector = stock['SECTOR']
-                industry = stock['INDUSTRY']
-                
-                # Check constraints
-                if sector_counts.get(sector, 0) >= 4:  # Max 4 per sector
-                    continue
-                if industry_counts.get(industry, 0) >= 2:  # Max 2 per industry
-                    continue
-                
-                # Add to portfolio
-                selected.append(stock)
-                sector_counts[sector] = sector_counts.get(sector, 0) + 1
-                industry_counts[industry] = industry_counts.get(industry, 0) + 1
-                
-                if len(selected) >= target_count:
-                    break
-            
-            return pd.DataFrame(selected)
+        curves = pd.concat([model.acf_curve(signal, tickers) for signal in model.signals], axis=1)
+        fig1 = px.line(curves, markers=True, title="Median Autocorrelation by Lag (filtered names)",
+                       labels={'LAG': 'Lag (snapshots)', 'value': 'Autocorrelation', 'variable': 'Signal'})
+        fig1.add_hline(y=0.5, line_dash="dot", line_color="gray", annotation_text="half-life")
         
-        # Build 20 longs and 40 shorts
-        long_portfolio = build_balanced_portfolio(long_candidates, 20, True)
-        short_portfolio = build_balanced_portfolio(short_candidates, 40, False)
+        stability = pd.DataFrame({signal: model.stability[signal][group] for signal in model.signals})
+        fig2 = px.line(stability, title=f"Rank Stability Between Consecutive Snapshots ({group})",
+                       labels={'index': 'Snapshot', 'value': 'Rank correlation', 'variable': 'Signal'})
         
-        # Calculate position sizes (equal dollar weight within buckets)
-        portfolio_value = 10_000_000  # $10M portfolio
-        long_allocation = 0.5  # 50% long
-        short_allocation = 0.5  # 50% short
+        sectors = model.group_table()
         
-        if len(long_portfolio) > 0:
-            long_position_size = (portfolio_value * long_allocation) / len(long_portfolio)
-            long_portfolio['POSITION_SIZE'] = long_position_size
-            long_portfolio['POSITION_TYPE'] = 'LONG'
+        return html.Div([
+            html.H3("⏳ Signal Decay", className="mt-3 mb-3"),
+            html.P(f"{len(model.dates)} snapshots from {model.dates[0]:%Y-%m-%d} to {model.dates[-1]:%Y-%m-%d}, "
+                   f"about {model.spacing:.0f} business day(s) apart. Half-life: snapshots until autocorrelation "
+                   f"falls to 0.5, in business days. (Sector: {sector or 'All'} / Industry: {industry or 'All'})",
+                   className="text-muted"),
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardBody([
+                            html.H4(f"{summary[f'{signal}_HALF_LIFE_DAYS'].median():.1f} days", className="text-primary"),
+                            html.P(f"{signal} median half-life", className="mb-0"),
+                            html.Small(f"Lag-1 autocorrelation {summary[f'{signal}_ACF_1'].median():.2f}, "
+                                       f"rank stability {stability[signal].mean():.2f}", className="text-muted")
+                        ])
+                    ])
+                ], width=4) for signal in model.signals
+            ], className="mb-4"),
+            dbc.Row([
+                dbc.Col([dcc.Graph(figure=encode_figure(fig1))], width=6),
+                dbc.Col([dcc.Graph(figure=encode_figure(fig2))], width=6)
+            ]),
+            html.H4("By Sector", className="mt-4 mb-3"),
+            dash_table.DataTable(
+                data=sectors.round(3).to_dict('records'),
+                columns=[{'name': col, 'id': col, 'type': 'numeric' if col not in ('SECTOR', 'SIGNAL') else 'text'}
+                         for col in ['SIGNAL', 'SECTOR', 'NAMES', 'ACF_1', 'ACF_5', 'HALF_LIFE', 'HALF_LIFE_DAYS', 'RANK_STABILITY']],
+                sort_action="native",
+                filter_action="native",
+                filter_options={"case": "insensitive"},
+                page_size=20,
+                style_cell={'textAlign': 'left', 'fontSize': 12},
+                style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'}
+            ),
+            html.H4("By Ticker", className="mt-4 mb-3"),
+            records_table(
+                "decay", summary, session_id,
+                columns=[{'name': 'Ticker', 'id': 'TICKER'}, {'name': 'Sector', 'id': 'SECTOR'}] + [
+                    column for signal in model.signals for column in (
+                        {'name': f"{signal} Lag-1 AC", 'id': f"{signal}_ACF_1", 'type': 'numeric', 'format': {'specifier': '.2f'}},
+                        {'name': f"{signal} Half-life (days)", 'id': f"{signal}_HALF_LIFE_DAYS", 'type': 'numeric', 'format': {'specifier': '.1f'}})
+                ],
+                filter_options={"case": "insensitive"},
+                page_size=50,
+                style_cell={'textAlign': 'left', 'fontSize': 12},
+                style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'}
+            )
+        ])
+    
+    elif tab == "portfolio":
+        # Portfolio construction with constraints
         
-        if len(short_portfolio) > 0:
-            short_position_size = (portfolio_value * short_allocation) / len(short_portfolio)
-            short_portfolio['POSITION_SIZE'] = short_position_size
-            short_portfolio['POSITION_TYPE'] = 'SHORT'
+        # 10M share volume filter, no ETFs, 20 longs / 40 shorts under sector and industry caps
+        portfolio_value = PORTFOLIO_VALUE
+        portfolio_universe, long_portfolio, short_portfolio = build_portfolio(filtered_df, portfolio_value)
+        sessions.put(session_id, 'long_portfolio', long_portfolio)
+        sessions.put(session_id, 'short_portfolio', short_portfolio)
         
         return html.Div([
             html.H3("💼 Portfolio Builder", className="mt-3 mb-3"),
@@ -815,7 +866,7 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
                                 dbc.Col([
                                     html.H5(f"{len(portfolio_universe):,}", className="text-primary"),
                                     html.P("Securities in Universe", className="text-muted mb-0"),
-                                    html.Small(f"(Volume ≥ $10M, No ETFs)", className="text-muted")
+                                    html.Small(f"(Volume ≥ 10M shares, No ETFs)", className="text-muted")
                                 ], width=3),
                                 dbc.Col([
                                     html.H5(f"{len(long_portfolio)}", className="text-success"),
@@ -847,8 +898,10 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
                             dbc.ButtonGroup([
                                 dbc.Button("📈 Export Long Positions", id="btn-download-long", color="success", size="sm"),
                                 dbc.Button("📉 Export Short Positions", id="btn-download-short", color="danger", size="sm"),
-                                dbc.Button("📋 Export Combined Portfolio", id="btn-download-combined", color="primary", size="sm")
-                            ], className="d-grid gap-2 d-md-block")
+                                dbc.Button("📋 Export Combined Portfolio", id="btn-download-combined", color="primary", size="sm"),
+                                dbc.Button("💾 Save Book", id="btn-save-book", color="secondary", size="sm")
+                            ], className="d-grid gap-2 d-md-block"),
+                            html.Span(id="save-book-status", className="text-muted ms-3")
                         ])
                     ])
                 ], width=12)
@@ -858,7 +911,8 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
             dcc.Tabs(id="portfolio-tabs", value="long", children=[
                 dcc.Tab(label=f"📈 Long Positions ({len(long_portfolio)})", value="long"),
                 dcc.Tab(label=f"📉 Short Positions ({len(short_portfolio)})", value="short"),
-                dcc.Tab(label="⚖️ Balance Analysis", value="balance")
+                dcc.Tab(label="⚖️ Balance Analysis", value="balance"),
+                dcc.Tab(label="🔁 Rebalance", value="rebalance")
             ]),
             
             html.Div(id="portfolio-tab-content"),
@@ -866,11 +920,7 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
             # Download components
             dcc.Download(id="download-long-excel"),
             dcc.Download(id="download-short-excel"),
-            dcc.Download(id="download-combined-excel"),
-            
-            # Add JavaScript for portfolio tab switching
-            dcc.Store(id="long-portfolio", data=long_portfolio.to_dict('records') if len(long_portfolio) > 0 else []),
-            dcc.Store(id="short-portfolio", data=short_portfolio.to_dict('records') if len(short_portfolio) > 0 else [])
+            dcc.Download(id="download-combined-excel")
         ])
     
     elif tab == "export":
@@ -894,66 +944,484 @@ def update_tab_content(tab, sector, industry, records, min_pnn, etf_filter):
             ])
         ])
 
+# Callback for similar securities search
+@app.callback(
+    Output("similar-results", "children"),
+    [Input("similar-ticker", "value"),
+     Input("similar-k", "value"),
+     Input("similar-scope", "value")]
+)
+def update_similar(ticker, k, scope):
+    neighbors = similarity_index.query(ticker, k=int(k or 10), scope=scope)
+    if len(neighbors) == 0:
+        return dbc.Alert("No similar securities found for this ticker and scope.", color="warning")
+    
+    target = df[df['TICKER'] == ticker].iloc[0]
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(r=[target[col] for col in NORM_COLS], theta=NORM_COLS, fill='toself', name=ticker))
+    fig.add_trace(go.Scatterpolar(r=neighbors[NORM_COLS].mean().tolist(), theta=NORM_COLS, fill='toself', name="Neighbor Average"))
+    fig.update_layout(title=f"{ticker} vs Nearest Neighbors - Normalized Profile")
+    
+    return dbc.Row([
+        dbc.Col([
+            dash_table.DataTable(
+                data=neighbors.to_dict('records'),
+                columns=[
+                    {'name': 'Ticker', 'id': 'TICKER'},
+                    {'name': 'Name', 'id': 'NAME'},
+                    {'name': 'Sector', 'id': 'SECTOR'},
+                    {'name': 'Industry', 'id': 'INDUSTRY'},
+                    {'name': 'Distance', 'id': 'DISTANCE', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                    {'name': 'P_NN', 'id': 'P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}}
+                ] + [{'name': col, 'id': col, 'type': 'numeric', 'format': {'specifier': '.3f'}} for col in NORM_COLS],
+                sort_action="native",
+                style_cell={'textAlign': 'left', 'fontSize': 12},
+                style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'}
+            )
+        ], width=7),
+        dbc.Col([dcc.Graph(figure=fig)], width=5)
+    ])
+
+# Callback for the signal correlation / clustering view
+@app.callback(
+    Output("corr-results", "children"),
+    [Input("corr-signals", "value"),
+     Input("corr-level", "value")],
+    [State("sector-filter", "value"),
+     State("industry-filter", "value"),
+     State("records-filter", "value"),
+     State("pnn-filter", "value"),
+     State("etf-filter", "value"),
+     State("rank-filter", "value")]
+)
+def update_correlation(signal_set, level, sector, industry, records, min_pnn, etf_filter, rank_filter):
+    filters = (sector, industry, records, min_pnn, etf_filter, rank_filter)
+    corr = signal_correlation.correlation(filters, signal_set or 'all')
+    fig1 = go.Figure(go.Heatmap(
+        z=corr.to_numpy(), x=list(corr.columns), y=list(corr.index), zmin=-1, zmax=1, colorscale='RdBu',
+        text=corr.round(2).to_numpy(), texttemplate="%{text}", colorbar={'title': 'ρ'}
+    ))
+    fig1.update_layout(title="Signal Correlation (clustered order)", yaxis={'autorange': 'reversed'}, height=500)
+    
+    scores, tree, profiles = signal_correlation.group_clusters(filters, level or 'SECTOR', signal_set or 'all')
+    if tree is None:
+        return dbc.Row([
+            dbc.Col([dcc.Graph(figure=fig1)], width=6),
+            dbc.Col([dbc.Alert(f"Clustering needs at least three {level.lower()} groups with "
+                               "3+ names under the current filters.", color="info")], width=6)
+        ])
+    
+    height = max(400, 22 * len(scores) + 120)
+    fig2 = ff.create_dendrogram(scores.loc[profiles.index].to_numpy(), orientation='left',
+                                labels=list(profiles.index), linkagefun=lambda _: tree)
+    fig2.update_layout(title=f"{level.title()} Clusters (average signal profile)", height=height,
+                       showlegend=False, margin={'l': 160})
+    fig3 = go.Figure(go.Heatmap(
+        z=scores.to_numpy(), x=list(scores.columns), y=list(scores.index), colorscale='RdYlGn', zmid=0,
+        customdata=profiles.loc[scores.index, scores.columns].to_numpy(),
+        hovertemplate="%{y}<br>%{x}: %{customdata:.3f} (z %{z:.2f})<extra></extra>", colorbar={'title': 'z'}
+    ))
+    fig3.update_layout(title=f"{level.title()} Signal Profiles (z-score across groups)", height=height)
+    
+    return html.Div([
+        dbc.Row([
+            dbc.Col([dcc.Graph(figure=fig1)], width=6),
+            dbc.Col([dcc.Graph(figure=fig2)], width=6)
+        ]),
+        dbc.Row([
+            dbc.Col([dcc.Graph(figure=fig3)], width=12)
+        ], className="mb-4")
+    ])
+
+# Callback for the pair engine
+@app.callback(
+    Output("pairs-results", "children"),
+    Input("pairs-scope", "value"),
+    [State("sector-filter", "value"),
+     State("industry-filter", "value"),
+     State("records-filter", "value"),
+     State("pnn-filter", "value"),
+     State("etf-filter", "value"),
+     State("rank-filter", "value")]
+)
+def update_pairs(scope, sector, industry, records, min_pnn, etf_filter, rank_filter):
+    filtered_df = filter_snapshot(df, sector, industry, records, min_pnn, etf_filter, rank_filter)
+    model = get_risk_model()
+    index = PairIndex(filtered_df, model.returns if model is not None else None, scope)
+    pairs_df, groups_df = index.pairs, index.groups
+    group_label = scope.title()
+    group_plural = {'INDUSTRY': 'Industries', 'SECTOR': 'Sectors'}[scope]
+
+    if len(pairs_df) == 0:
+        return dbc.Alert("No suitable pairs found with current filters. Try adjusting P_NN or sector filters.", 
+                         color="warning")
+
+    ranking_note = ("Ranked by P_NN spread / annualized spread vol (hedge ratio from CLOSE history)" if pairs_df['SCORE'].notna().any()
+                    else "Not enough price history for hedge ratios (`python -m squeeze.backfill`): ranked by P_NN spread, dollar-neutral hedge")
+
+    return html.Div([
+        html.Small(f"{index.n_candidates:,} candidate pairs scored in {index.elapsed_ms:.0f} ms. {ranking_note}",
+                   className="text-muted"),
+        
+        # Summary cards
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4(f"{index.n_candidates:,}", className="text-primary"),
+                        html.P("Candidate Pairs", className="mb-0")
+                    ])
+                ])
+            ], width=3),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4(f"{len(groups_df):,}", className="text-success"),
+                        html.P(f"{group_plural} with Pairs", className="mb-0")
+                    ])
+                ])
+            ], width=3),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4(f"{pairs_df['P_NN_SPREAD'].max():.4f}", className="text-warning"),
+                        html.P("Max P_NN Spread", className="mb-0")
+                    ])
+                ])
+            ], width=3),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4(f"{len(pairs_df[pairs_df['MARKET_CAP_MATCH']])}", className="text-info"),
+                        html.P("Market Cap Matched", className="mb-0")
+                    ])
+                ])
+            ], width=3)
+        ], className="mb-4"),
+        
+        # All pair trades table with pagination  
+        html.H4(f"🔥 Top {len(pairs_df)} Pair Trade Opportunities", className="mb-3"),
+        dbc.Alert([
+            html.Strong("🎯 Filter Examples: "),
+            "Industry: 'software', 'bio' | Long/Short: 'AAPL', 'tesla' | P_NN Spread: '>0.15' | Cap Match: 'true'"
+        ], color="info", className="mb-3"),
+        dash_table.DataTable(
+            data=pairs_df.to_dict('records'),
+            columns=[{'name': group_label, 'id': scope}] + (
+                [{'name': 'Long Industry', 'id': 'LONG_INDUSTRY'}, {'name': 'Short Industry', 'id': 'SHORT_INDUSTRY'}]
+                if scope == 'SECTOR' else []) + [
+                {'name': 'Long', 'id': 'LONG_TICKER'},
+                {'name': 'Long P_NN', 'id': 'LONG_P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                {'name': 'Short', 'id': 'SHORT_TICKER'},
+                {'name': 'Short P_NN', 'id': 'SHORT_P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                {'name': 'P_NN Spread', 'id': 'P_NN_SPREAD', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                {'name': 'Hedge Ratio', 'id': 'HEDGE_RATIO', 'type': 'numeric', 'format': {'specifier': '.2f'}},
+                {'name': 'Spread Vol', 'id': 'SPREAD_VOL', 'type': 'numeric', 'format': {'specifier': '.1%'}},
+                {'name': 'Spread / Vol', 'id': 'SCORE', 'type': 'numeric', 'format': {'specifier': '.2f'}},
+                {'name': 'Long Price', 'id': 'LONG_CLOSE', 'type': 'numeric', 'format': {'specifier': '$.2f'}},
+                {'name': 'Short Price', 'id': 'SHORT_CLOSE', 'type': 'numeric', 'format': {'specifier': '$.2f'}},
+                {'name': 'Min Volume', 'id': 'MIN_VOLUME', 'type': 'numeric', 'format': {'specifier': ',.0f'}},
+                {'name': 'Cap Match', 'id': 'MARKET_CAP_MATCH', 'type': 'text'}
+            ],
+            sort_action="native",
+            filter_action="native",
+            filter_options={"case": "insensitive"},
+            page_action="native",
+            page_size=25,
+            style_cell={'textAlign': 'left', 'fontSize': 11},
+            style_data_conditional=[
+                {
+                    'if': {'filter_query': '{P_NN_SPREAD} > 0.15'},
+                    'backgroundColor': '#d4edda',
+                    'color': 'black',
+                },
+                {
+                    'if': {'filter_query': '{P_NN_SPREAD} > 0.10 && {P_NN_SPREAD} <= 0.15'},
+                    'backgroundColor': '#fff3cd',
+                    'color': 'black',
+                },
+                {
+                    'if': {'filter_query': '{MARKET_CAP_MATCH} = True'},
+                    'fontWeight': 'bold'
+                }
+            ]
+        ),
+        
+        # Industry pair opportunities
+        html.H4(f"🎯 {group_plural} with Best Pair Opportunities", className="mt-4 mb-3"),
+        dash_table.DataTable(
+            data=groups_df.head(15).to_dict('records'),
+            columns=[
+                {'name': group_label, 'id': scope},
+                {'name': 'Long Ideas', 'id': 'LONG_COUNT', 'type': 'numeric'},
+                {'name': 'Short Ideas', 'id': 'SHORT_COUNT', 'type': 'numeric'},
+                {'name': 'Total Stocks', 'id': 'TOTAL_STOCKS', 'type': 'numeric'},
+                {'name': 'P_NN Spread', 'id': 'AVG_P_NN_SPREAD', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                {'name': 'Candidate Pairs', 'id': 'CANDIDATE_PAIRS', 'type': 'numeric', 'format': {'specifier': ','}}
+            ],
+            sort_action="native",
+            filter_action="native",
+            filter_options={"case": "insensitive"},
+            style_cell={'textAlign': 'left'},
+            style_data_conditional=[
+                {
+                    'if': {'filter_query': '{AVG_P_NN_SPREAD} > 0.3'},
+                    'backgroundColor': '#d4edda',
+                    'color': 'black',
+                }
+            ]
+        ),
+        
+        # Trading notes
+        dbc.Card([
+            dbc.CardHeader("📝 Trading Notes"),
+            dbc.CardBody([
+                html.P("🎯 P_NN Spread Interpretation:", className="fw-bold"),
+                html.Ul([
+                    html.Li("Green (>0.15): Exceptional pair opportunity"),
+                    html.Li("Yellow (0.10-0.15): Strong pair opportunity"), 
+                    html.Li("White (<0.10): Moderate pair opportunity")
+                ]),
+                html.P("⚖️ Hedge Ratio: short dollars per $1 long (beta of the long leg on the short leg)", className="fw-bold mt-3"),
+                html.P("💡 Market Cap Match (Bold): Same size bucket for cleaner pair", className="fw-bold"),
+                html.P("⚡ Min Volume: Liquidity check for execution", className="fw-bold"),
+            ])
+        ], className="mt-4")
+    ])
+
+# Callback for what-if scenarios
+@app.callback(
+    Output("whatif-results", "children"),
+    [Input("whatif-thresholds", "value"),
+     Input("whatif-etf", "value")],
+    [State("sector-filter", "value"),
+     State("industry-filter", "value")]
+)
+def update_whatif(thresholds, etf_modes, sector, industry):
+    try:
+        min_pnns = [float(value) for value in (thresholds or "").split(",") if value.strip()]
+    except ValueError:
+        return dbc.Alert("Thresholds must be numbers separated by commas, e.g. 0, 0.02, 0.05", color="warning")
+    if not min_pnns or not etf_modes:
+        return dbc.Alert("Enter at least one threshold and pick at least one ETF mode.", color="info")
+    
+    start = time.perf_counter()
+    results = scenario_index.run(scenario_grid(min_pnns, etf_modes, sector, industry))
+    elapsed_us = (time.perf_counter() - start) * 1_000_000
+    
+    fig = px.line(results, x='MIN_P_NN', y='UNIVERSE', color='ETF_FILTER', markers=True,
+                  title="Universe Size by Minimum P_NN")
+    
+    return html.Div([
+        html.Small(f"{len(results)} scenarios evaluated in {elapsed_us:,.0f} µs", className="text-muted"),
+        dash_table.DataTable(
+            data=results.to_dict('records'),
+            columns=[
+                {'name': 'ETF Mode', 'id': 'ETF_FILTER'},
+                {'name': 'Min P_NN', 'id': 'MIN_P_NN', 'type': 'numeric', 'format': {'specifier': '.3f'}},
+                {'name': 'Universe', 'id': 'UNIVERSE', 'type': 'numeric', 'format': {'specifier': ','}},
+                {'name': 'Avg P_NN', 'id': 'AVG_P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                {'name': 'Positive', 'id': 'POSITIVE', 'type': 'numeric', 'format': {'specifier': ','}},
+                {'name': 'Positive %', 'id': 'POSITIVE_PCT', 'type': 'numeric', 'format': {'specifier': '.1%'}},
+                {'name': 'Book Universe', 'id': 'PORTFOLIO_UNIVERSE', 'type': 'numeric', 'format': {'specifier': ','}},
+                {'name': 'Longs', 'id': 'LONGS'},
+                {'name': 'Shorts', 'id': 'SHORTS'},
+                {'name': 'Long Avg P_NN', 'id': 'LONG_AVG_P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                {'name': 'Short Avg P_NN', 'id': 'SHORT_AVG_P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
+                {'name': 'Book Sectors', 'id': 'BOOK_SECTORS'}
+            ],
+            sort_action="native",
+            style_cell={'textAlign': 'left', 'fontSize': '13px', 'padding': '8px'},
+            style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'}
+        ),
+        dcc.Graph(figure=fig)
+    ])
+
+def session_book(session_id):
+    """The session's current (long, short) book, or (None, None) once the session has expired"""
+    long_df = sessions.get(session_id, 'long_portfolio')
+    short_df = sessions.get(session_id, 'short_portfolio')
+    if long_df is None or short_df is None:
+        return None, None
+    return long_df, short_df
+
 # Callback for downloading portfolio Excel files
 @app.callback(
     Output("download-long-excel", "data"),
     Input("btn-download-long", "n_clicks"),
-    State("long-portfolio", "data"),
+    State("session-id", "data"),
     prevent_initial_call=True
 )
-def download_long_excel(n_clicks, long_data):
-    if n_clicks and long_data:
-        df = pd.DataFrame(long_data)
-        df = df[['TICKER', 'NAME', 'SECTOR', 'INDUSTRY', 'P_NN', 'CLOSE', 'VOLUME', 'POSITION_SIZE', 'POSITION_TYPE']]
+def download_long_excel(n_clicks, session_id):
+    long_df, _ = session_book(session_id)
+    if n_clicks and long_df is not None and len(long_df) > 0:
+        df = long_df[BOOK_COLUMNS]
         return dcc.send_data_frame(df.to_excel, f"long_positions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx", index=False)
 
 @app.callback(
     Output("download-short-excel", "data"),
     Input("btn-download-short", "n_clicks"),
-    State("short-portfolio", "data"),
+    State("session-id", "data"),
     prevent_initial_call=True
 )
-def download_short_excel(n_clicks, short_data):
-    if n_clicks and short_data:
-        df = pd.DataFrame(short_data)
-        df = df[['TICKER', 'NAME', 'SECTOR', 'INDUSTRY', 'P_NN', 'CLOSE', 'VOLUME', 'POSITION_SIZE', 'POSITION_TYPE']]
+def download_short_excel(n_clicks, session_id):
+    _, short_df = session_book(session_id)
+    if n_clicks and short_df is not None and len(short_df) > 0:
+        df = short_df[BOOK_COLUMNS]
         return dcc.send_data_frame(df.to_excel, f"short_positions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx", index=False)
 
 @app.callback(
     Output("download-combined-excel", "data"),
     Input("btn-download-combined", "n_clicks"),
-    State("long-portfolio", "data"),
-    State("short-portfolio", "data"),
+    State("session-id", "data"),
     prevent_initial_call=True
 )
-def download_combined_excel(n_clicks, long_data, short_data):
-    if n_clicks:
-        long_df = pd.DataFrame(long_data) if long_data else pd.DataFrame()
-        short_df = pd.DataFrame(short_data) if short_data else pd.DataFrame()
-        
+def download_combined_excel(n_clicks, session_id):
+    long_df, short_df = session_book(session_id)
+    if n_clicks and long_df is not None:
         if len(long_df) > 0:
-            long_df = long_df[['TICKER', 'NAME', 'SECTOR', 'INDUSTRY', 'P_NN', 'CLOSE', 'VOLUME', 'POSITION_SIZE', 'POSITION_TYPE']]
+            long_df = long_df[BOOK_COLUMNS]
         if len(short_df) > 0:
-            short_df = short_df[['TICKER', 'NAME', 'SECTOR', 'INDUSTRY', 'P_NN', 'CLOSE', 'VOLUME', 'POSITION_SIZE', 'POSITION_TYPE']]
+            short_df = short_df[BOOK_COLUMNS]
         
         combined_df = pd.concat([long_df, short_df], ignore_index=True)
         return dcc.send_data_frame(combined_df.to_excel, f"portfolio_positions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx", index=False)
 
+@app.callback(
+    Output("save-book-status", "children"),
+    Input("btn-save-book", "n_clicks"),
+    State("session-id", "data"),
+    prevent_initial_call=True
+)
+def save_current_book(n_clicks, session_id):
+    long_df, short_df = session_book(session_id)
+    if n_clicks and long_df is not None and len(long_df) + len(short_df) > 0:
+        date = snapshot_date(df)
+        save_book(long_df, short_df, date)
+        return f"Saved book for {date:%Y-%m-%d}"
+    return "Nothing to save"
+
+def risk_model_section(long_df, short_df):
+    """Ex-ante risk, beta, sector exposure and vol-targeted sizes for the current book"""
+    model = get_risk_model()
+    if model is None:
+        return dbc.Alert("No price history for the risk model yet - run `python -m squeeze.backfill` to build it.",
+                         color="info", className="mt-3")
+
+    report = model.book_report(long_df, short_df)
+    if report is None:
+        return html.Div()
+    sized, scale = model.vol_target_sizes(long_df, short_df)
+
+    return html.Div([
+        html.H5("📐 Risk Model", className="mt-4 mb-3"),
+        dbc.Row([
+            dbc.Col(dbc.Card([dbc.CardBody([
+                html.H4(f"{report['ex_ante_vol']:.1%}", className="text-primary"),
+                html.P(f"Ex-ante Volatility (${report['ex_ante_vol_dollars']:,.0f}/yr)", className="text-muted")
+            ])]), width=3),
+            dbc.Col(dbc.Card([dbc.CardBody([
+                html.H4(f"{report['beta']:+.2f}", className="text-info"),
+                html.P("Beta vs Equal-Weight Universe", className="text-muted")
+            ])]), width=3),
+            dbc.Col(dbc.Card([dbc.CardBody([
+                html.H4(f"${report['net_exposure']:,.0f}", className="text-success"),
+                html.P(f"Net Exposure (Gross ${report['gross_exposure']:,.0f})", className="text-muted")
+            ])]), width=3),
+            dbc.Col(dbc.Card([dbc.CardBody([
+                html.H4(f"{scale:.2f}x", className="text-warning"),
+                html.P(f"Gross Scale for {TARGET_VOL:.0%} Vol Target", className="text-muted")
+            ])]), width=3)
+        ], className="mb-3"),
+        dbc.Row([
+            dbc.Col([
+                html.H6("Sector Exposure"),
+                dash_table.DataTable(
+                    data=report['sector_exposure'].to_dict('records'),
+                    columns=[{'name': 'Sector', 'id': 'SECTOR'}] +
+                            [{'name': c.title(), 'id': c, 'type': 'numeric', 'format': {'specifier': '$,.0f'}}
+                             for c in ['LONG', 'SHORT', 'NET', 'GROSS']],
+                    style_cell={'textAlign': 'left', 'fontSize': '13px', 'padding': '8px'},
+                    style_header={'backgroundColor': '#6c757d', 'color': 'white', 'fontWeight': 'bold'}
+                )
+            ], width=5),
+            dbc.Col([
+                html.H6("Volatility-Targeted Sizing (inverse vol within each side)"),
+                dash_table.DataTable(
+                    data=sized[['TICKER', 'POSITION_TYPE', 'VOL', 'BETA', 'POSITION_SIZE', 'VOL_TARGET_SIZE']].to_dict('records'),
+                    columns=[
+                        {'name': 'Ticker', 'id': 'TICKER'},
+                        {'name': 'Side', 'id': 'POSITION_TYPE'},
+                        {'name': 'Vol', 'id': 'VOL', 'type': 'numeric', 'format': {'specifier': '.1%'}},
+                        {'name': 'Beta', 'id': 'BETA', 'type': 'numeric', 'format': {'specifier': '.2f'}},
+                        {'name': 'Equal Size', 'id': 'POSITION_SIZE', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                        {'name': 'Vol-Target Size', 'id': 'VOL_TARGET_SIZE', 'type': 'numeric', 'format': {'specifier': '$,.0f'}}
+                    ],
+                    sort_action="native",
+                    page_size=15,
+                    style_cell={'textAlign': 'left', 'fontSize': '13px', 'padding': '8px'},
+                    style_header={'backgroundColor': '#6c757d', 'color': 'white', 'fontWeight': 'bold'}
+                )
+            ], width=7)
+        ])
+    ])
+
+def liquidity_section(long_df, short_df):
+    """Days to exit the book and how far it scales before positions hit the ADV cap"""
+    book = pd.concat([long_df, short_df], ignore_index=True)
+    if len(book) == 0 or 'ADV_DOLLARS' not in book.columns:
+        return html.Div()
+    universe = add_liquidity_columns(portfolio_universe(df))
+    capacity = capacity_table(book, PORTFOLIO_VALUE, universe)
+    first_limit = capacity.loc[capacity['N_CAPPED'] > 0, 'NOTIONAL']
+
+    return html.Div([
+        html.H5("💧 Liquidity & Capacity", className="mt-4 mb-3"),
+        dbc.Alert([
+            html.Strong(f"{days_to_liquidate(book):.2f} days "),
+            f"to exit the whole book at {LIQUIDATION_ADV_PCT:.0%} of average daily dollar volume. ",
+            (f"Positions start hitting the ADV cap at ${first_limit.iloc[0] / 1_000_000:,.0f}M."
+             if len(first_limit) > 0 else "No position hits the ADV cap up to $1B.")
+        ], color="warning" if len(first_limit) > 0 else "success"),
+        dash_table.DataTable(
+            data=capacity.to_dict('records'),
+            columns=[
+                {'name': 'Notional', 'id': 'NOTIONAL', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                {'name': 'Deployable', 'id': 'DEPLOYABLE', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                {'name': 'Deployable %', 'id': 'DEPLOYABLE_PCT', 'type': 'numeric', 'format': {'specifier': '.1%'}},
+                {'name': 'Names Capped', 'id': 'N_CAPPED'},
+                {'name': 'Max Days to Exit', 'id': 'MAX_DAYS_TO_LIQUIDATE', 'type': 'numeric', 'format': {'specifier': '.2f'}},
+                {'name': 'Universe Names Able to Hold', 'id': 'UNIVERSE_NAMES_OK'},
+                {'name': 'Status', 'id': 'STATUS'}
+            ],
+            style_cell={'textAlign': 'left', 'fontSize': '13px', 'padding': '8px'},
+            style_header={'backgroundColor': '#6c757d', 'color': 'white', 'fontWeight': 'bold'},
+            style_data_conditional=[
+                {
+                    'if': {'filter_query': '{N_CAPPED} > 0'},
+                    'backgroundColor': '#fff3cd'
+                }
+            ]
+        )
+    ])
+
 # Callback for portfolio sub-tabs
 @app.callback(
     Output("portfolio-tab-content", "children"),
-    [Input("portfolio-tabs", "value"),
-     Input("long-portfolio", "data"),
-     Input("short-portfolio", "data")]
+    Input("portfolio-tabs", "value"),
+    State("session-id", "data")
 )
-def update_portfolio_tabs(portfolio_tab, long_data, short_data):
+def update_portfolio_tabs(portfolio_tab, session_id):
+    long_df, short_df = session_book(session_id)
+    if long_df is None:
+        return dbc.Alert("This session has expired - reload the page to rebuild the portfolio.", color="warning")
+    
     if portfolio_tab == "long":
-        if not long_data:
+        if len(long_df) == 0:
             return html.Div([
-                dbc.Alert("No long positions found with current criteria (Top P_NN, Volume ≥ $10M)", color="warning")
+                dbc.Alert("No long positions found with current criteria (Top P_NN, Volume ≥ 10M shares)", color="warning")
             ])
         
-        long_df = pd.DataFrame(long_data)
         ticker_list = ', '.join(long_df['TICKER'].tolist())
         
         return html.Div([
@@ -971,7 +1439,7 @@ def update_portfolio_tabs(portfolio_tab, long_data, short_data):
             
             # Data table with no pagination
             dash_table.DataTable(
-                data=long_df.to_dict('records'),
+                data=long_df[BOOK_COLUMNS].to_dict('records'),
                 columns=[
                     {'name': 'Ticker', 'id': 'TICKER'},
                     {'name': 'Name', 'id': 'NAME'},
@@ -980,7 +1448,10 @@ def update_portfolio_tabs(portfolio_tab, long_data, short_data):
                     {'name': 'P_NN Signal', 'id': 'P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
                     {'name': 'Close Price', 'id': 'CLOSE', 'type': 'numeric', 'format': {'specifier': '$.2f'}},
                     {'name': 'Volume', 'id': 'VOLUME', 'type': 'numeric', 'format': {'specifier': ',.0f'}},
-                    {'name': 'Position Size', 'id': 'POSITION_SIZE', 'type': 'numeric', 'format': {'specifier': '$,.0f'}}
+                    {'name': 'Size', 'id': 'MARKET_CAP_BUCKET'},
+                    {'name': 'ADV ($)', 'id': 'ADV_DOLLARS', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                    {'name': 'Position Size', 'id': 'POSITION_SIZE', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                    {'name': 'Days to Exit', 'id': 'DAYS_TO_LIQUIDATE', 'type': 'numeric', 'format': {'specifier': '.2f'}}
                 ],
                 sort_action="native",
                 style_cell={'textAlign': 'left', 'fontSize': '13px', 'padding': '8px'},
@@ -997,12 +1468,11 @@ def update_portfolio_tabs(portfolio_tab, long_data, short_data):
         ], style={'marginBottom': '20px'})
     
     elif portfolio_tab == "short":
-        if not short_data:
+        if len(short_df) == 0:
             return html.Div([
-                dbc.Alert("No short positions found with current criteria (Bottom P_NN, Volume ≥ $10M)", color="warning")
+                dbc.Alert("No short positions found with current criteria (Bottom P_NN, Volume ≥ 10M shares)", color="warning")
             ])
         
-        short_df = pd.DataFrame(short_data)
         ticker_list = ', '.join(short_df['TICKER'].tolist())
         
         return html.Div([
@@ -1020,7 +1490,7 @@ def update_portfolio_tabs(portfolio_tab, long_data, short_data):
             
             # Data table with no pagination
             dash_table.DataTable(
-                data=short_df.to_dict('records'),
+                data=short_df[BOOK_COLUMNS].to_dict('records'),
                 columns=[
                     {'name': 'Ticker', 'id': 'TICKER'},
                     {'name': 'Name', 'id': 'NAME'},
@@ -1029,7 +1499,10 @@ def update_portfolio_tabs(portfolio_tab, long_data, short_data):
                     {'name': 'P_NN Signal', 'id': 'P_NN', 'type': 'numeric', 'format': {'specifier': '.4f'}},
                     {'name': 'Close Price', 'id': 'CLOSE', 'type': 'numeric', 'format': {'specifier': '$.2f'}},
                     {'name': 'Volume', 'id': 'VOLUME', 'type': 'numeric', 'format': {'specifier': ',.0f'}},
-                    {'name': 'Position Size', 'id': 'POSITION_SIZE', 'type': 'numeric', 'format': {'specifier': '$,.0f'}}
+                    {'name': 'Size', 'id': 'MARKET_CAP_BUCKET'},
+                    {'name': 'ADV ($)', 'id': 'ADV_DOLLARS', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                    {'name': 'Position Size', 'id': 'POSITION_SIZE', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                    {'name': 'Days to Exit', 'id': 'DAYS_TO_LIQUIDATE', 'type': 'numeric', 'format': {'specifier': '.2f'}}
                 ],
                 sort_action="native",
                 style_cell={'textAlign': 'left', 'fontSize': '13px', 'padding': '8px'},
@@ -1047,9 +1520,6 @@ def update_portfolio_tabs(portfolio_tab, long_data, short_data):
     
     elif portfolio_tab == "balance":
         # Create balance analysis
-        long_df = pd.DataFrame(long_data) if long_data else pd.DataFrame()
-        short_df = pd.DataFrame(short_data) if short_data else pd.DataFrame()
-        
         # Sector distribution
         long_sectors = long_df['SECTOR'].value_counts() if len(long_df) > 0 else pd.Series()
         short_sectors = short_df['SECTOR'].value_counts() if len(short_df) > 0 else pd.Series()
@@ -1080,20 +1550,70 @@ def update_portfolio_tabs(portfolio_tab, long_data, short_data):
                             html.Ul([
                                 html.Li("Maximum 4 positions per sector"),
                                 html.Li("Maximum 2 positions per industry"),
-                                html.Li("Minimum $10M daily volume"),
-                                html.Li("Equal dollar weighting within buckets")
+                                html.Li("Minimum 10M shares daily volume"),
+                                html.Li(f"Equal dollar weighting within buckets, capped at {MAX_ADV_PCT:.0%} of ADV")
                             ]),
                             html.Hr(),
                             html.P("Rebalancing Triggers:"),
                             html.Ul([
                                 html.Li("Long signals: P_NN drops below 0.03"),
                                 html.Li("Short signals: P_NN rises above -0.03"),
-                                html.Li("Volume falls below $10M threshold")
+                                html.Li("Volume falls below 10M shares threshold")
                             ])
                         ])
                     ])
                 ], width=6)
-            ])
+            ]),
+            risk_model_section(long_df, short_df),
+            liquidity_section(long_df, short_df)
+        ])
+    
+    elif portfolio_tab == "rebalance":
+        # Today's book with exit hysteresis against the last saved book
+        prior_book = load_book(before=snapshot_date(df))
+        if prior_book is None:
+            return dbc.Alert("No earlier saved book to rebalance from - use 💾 Save Book to start the book history.",
+                             color="info", className="mt-3")
+        
+        long_portfolio, short_portfolio, trades, stats = rebalance(df, prior_book)
+        
+        return html.Div([
+            html.H4(f"🔁 Rebalance vs Book of {prior_book['DATE'].iloc[0]:%Y-%m-%d}", className="mt-3 mb-3"),
+            dbc.Row([
+                dbc.Col(dbc.Card([dbc.CardBody([
+                    html.H4(f"{stats['TRADES']}", className="text-primary"),
+                    html.P(f"Trades ({stats['BUY']} buy / {stats['SELL']} sell / {stats['SHORT']} short / {stats['COVER']} cover)", className="text-muted")
+                ])]), width=4),
+                dbc.Col(dbc.Card([dbc.CardBody([
+                    html.H4(f"${stats['TRADED_DOLLARS']:,.0f}", className="text-info"),
+                    html.P("Traded Dollars", className="text-muted")
+                ])]), width=4),
+                dbc.Col(dbc.Card([dbc.CardBody([
+                    html.H4(f"{stats['TURNOVER']:.1%}", className="text-warning"),
+                    html.P("One-way Turnover", className="text-muted")
+                ])]), width=4)
+            ], className="mb-3"),
+            dbc.Alert(f"Held longs stay while P_NN ≥ {LONG_EXIT_P_NN}, held shorts while P_NN ≤ {SHORT_EXIT_P_NN}, "
+                      f"both above the 10M share volume floor.", color="light"),
+            dash_table.DataTable(
+                data=trades.to_dict('records'),
+                columns=[
+                    {'name': 'Ticker', 'id': 'TICKER'},
+                    {'name': 'Action', 'id': 'ACTION'},
+                    {'name': 'Old Size', 'id': 'OLD_SIZE', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                    {'name': 'New Size', 'id': 'NEW_SIZE', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                    {'name': 'Trade ($)', 'id': 'TRADE_DOLLARS', 'type': 'numeric', 'format': {'specifier': '$,.0f'}},
+                    {'name': 'Trade (Shares)', 'id': 'TRADE_SHARES', 'type': 'numeric', 'format': {'specifier': ',.0f'}}
+                ],
+                sort_action="native",
+                page_size=20,
+                style_cell={'textAlign': 'left', 'fontSize': '13px', 'padding': '8px'},
+                style_header={'backgroundColor': '#6c757d', 'color': 'white', 'fontWeight': 'bold'},
+                style_data_conditional=[
+                    {'if': {'filter_query': '{ACTION} = "BUY" || {ACTION} = "COVER"'}, 'backgroundColor': '#d4edda'},
+                    {'if': {'filter_query': '{ACTION} = "SELL" || {ACTION} = "SHORT"'}, 'backgroundColor': '#f8d7da'}
+                ]
+            )
         ])
 
 if __name__ == '__main__':
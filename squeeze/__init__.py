@@ -0,0 +1,47 @@
+"""
+Shared SqueezeMetrics data layer: loading, filtering, aggregates and the
+portfolio/pair engines. Imports without Dash so batch jobs and benchmarks
+can use it directly; app.py and final_dashboard.py are front-ends over it.
+
+Names are resolved lazily: `import squeeze` is instant and pandas, scipy and
+pyarrow are only imported by the first attribute that needs them.
+"""
+import importlib
+
+_EXPORTS = {
+    'industry_dispersion': 'aggregates', 'sector_momentum': 'aggregates', 'sector_summary': 'aggregates',
+    'scan_snapshot': 'alerts',
+    'add_market_cap_buckets': 'buckets',
+    'SharedSnapshot': 'cache', 'cache_age_seconds': 'cache', 'current_version': 'cache', 'read_cache': 'cache',
+    'write_cache': 'cache',
+    'configure': 'config', 'settings': 'config',
+    'SignalCorrelation': 'correlation',
+    'SignalDecay': 'decay',
+    'AsyncFetcher': 'fetcher', 'fetch_feeds': 'fetcher',
+    'apply_etf_filter': 'filters', 'filter_snapshot': 'filters',
+    'empty_snapshot': 'loader', 'load_from_api': 'loader', 'load_from_store': 'loader',
+    'load_latest_xlsx': 'loader', 'load_snapshot': 'loader',
+    'PairIndex': 'pairs', 'generate_pairs': 'pairs',
+    'columnar': 'payload', 'enable_compression': 'payload', 'encode_figure': 'payload',
+    'build_balanced_portfolio': 'portfolio', 'build_portfolio': 'portfolio',
+    'RANK_FILTER_OPTIONS': 'ranks', 'add_rank_columns': 'ranks', 'apply_rank_filter': 'ranks',
+    'RiskModel': 'risk',
+    'SessionStore': 'sessions',
+    'CANONICAL_COLUMNS': 'schema', 'NUMERIC_COLS': 'schema', 'clean_snapshot': 'schema', 'normalize_snapshot': 'schema',
+    'NORM_COLS': 'similarity', 'SimilarityIndex': 'similarity',
+    'TableView': 'tableview',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'squeeze' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return __all__
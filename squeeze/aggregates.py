@@ -0,0 +1,34 @@
+def industry_dispersion(df, min_count=3):
+    """
+    P_NN mean/std/min/max/count per industry plus the max-min range,
+    widest range first (best pair trading candidates)
+    """
+    industry_stats = df.groupby('INDUSTRY', observed=True).agg({
+        'P_NN': ['mean', 'std', 'min', 'max', 'count']
+    }).round(4)
+    industry_stats.columns = ['Avg_P_NN', 'StdDev_P_NN', 'Min_P_NN', 'Max_P_NN', 'Count']
+    industry_stats['P_NN_Range'] = industry_stats['Max_P_NN'] - industry_stats['Min_P_NN']
+    industry_stats = industry_stats.reset_index()
+    industry_stats = industry_stats[industry_stats['Count'] >= min_count]
+    return industry_stats.sort_values('P_NN_Range', ascending=False)
+
+
+def sector_momentum(df, min_count=5):
+    """Average P_NN and name count per sector, strongest first"""
+    momentum = df.groupby('SECTOR', observed=True).agg({
+        'P_NN': ['mean', 'count']
+    }).round(4)
+    momentum.columns = ['Avg_P_NN', 'Count']
+    momentum = momentum.reset_index()
+    momentum = momentum[momentum['Count'] >= min_count]
+    return momentum.sort_values('Avg_P_NN', ascending=False)
+
+
+def sector_summary(df):
+    """Average P, P_NN, V, G, D, total volume and name count per sector"""
+    summary = df.groupby('SECTOR', observed=True).agg({
+        'P': 'mean', 'P_NN': 'mean', 'V': 'mean', 'G': 'mean', 'D': 'mean',
+        'VOLUME': 'sum', 'TICKER': 'count'
+    }).round(4)
+    summary.columns = ['Avg_P', 'Avg_P_NN', 'Avg_V', 'Avg_G', 'Avg_D', 'Total_Volume', 'Count']
+    return summary.reset_index()
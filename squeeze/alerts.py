@@ -0,0 +1,314 @@
+import argparse
+import ast
+import functools
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .config import add_config_arguments, configure
+from .history import HISTORY_DIR, read_history
+from .portfolio import LONG_EXIT_P_NN, SHORT_EXIT_P_NN
+from .rebalance import load_book, snapshot_date
+
+# Event log next to the snapshot history
+ALERTS_DB = "alerts.sqlite"
+
+# Optional JSON list of rules replacing DEFAULT_RULES
+RULES_FILE = "alert_rules.json"
+
+# How far back to look for the previous snapshot in the history store
+PREVIOUS_LOOKBACK_DAYS = 14
+
+SEVERITIES = ['critical', 'warning', 'info']
+
+# Names rules can use as @NAME inside their expressions
+RULE_CONSTANTS = {'LONG_EXIT_P_NN': LONG_EXIT_P_NN, 'SHORT_EXIT_P_NN': SHORT_EXIT_P_NN}
+
+# Columns carried over from the previous snapshot as PREV_<col> with D_<col> = today - previous
+DELTA_COLS = ['P_NN', 'P', 'V', 'G', 'D', 'IV', 'CLOSE', 'VOLUME', 'P_NN_INDUSTRY_RANK']
+
+EVENT_COLUMNS = ['SNAPSHOT_DATE', 'RULE', 'SEVERITY', 'TICKER', 'NAME', 'SECTOR', 'INDUSTRY',
+                 'FIELD', 'VALUE', 'PREV_VALUE', 'DESCRIPTION', 'CREATED_AT']
+
+# Each rule is a boolean expression in DataFrame.eval syntax (and/or/not, @CONSTANT)
+# over alert_frame's columns; FIELD is the column whose today/previous values are
+# recorded with the event
+DEFAULT_RULES = [
+    {'name': 'pnn_jump_up', 'when': 'D_P_NN >= 0.05', 'severity': 'info', 'field': 'P_NN',
+     'description': 'P_NN up 0.05 or more day over day'},
+    {'name': 'pnn_jump_down', 'when': 'D_P_NN <= -0.05', 'severity': 'info', 'field': 'P_NN',
+     'description': 'P_NN down 0.05 or more day over day'},
+    {'name': 'long_sign_flip', 'when': 'IS_LONG and P_NN < 0 and PREV_P_NN >= 0', 'severity': 'critical', 'field': 'P_NN',
+     'description': 'Held long turned negative'},
+    {'name': 'short_sign_flip', 'when': 'IS_SHORT and P_NN > 0 and PREV_P_NN <= 0', 'severity': 'critical', 'field': 'P_NN',
+     'description': 'Held short turned positive'},
+    {'name': 'long_exit_cross', 'when': 'IS_LONG and P_NN < @LONG_EXIT_P_NN and not (PREV_P_NN < @LONG_EXIT_P_NN)',
+     'severity': 'warning', 'field': 'P_NN', 'description': 'Held long fell below the long exit threshold'},
+    {'name': 'short_exit_cross', 'when': 'IS_SHORT and P_NN > @SHORT_EXIT_P_NN and not (PREV_P_NN > @SHORT_EXIT_P_NN)',
+     'severity': 'warning', 'field': 'P_NN', 'description': 'Held short rose above the short exit threshold'},
+    {'name': 'industry_leader', 'when': 'P_NN_INDUSTRY_RANK == 1 and PREV_P_NN_INDUSTRY_RANK > 1 and INDUSTRY_SIZE >= 5',
+     'severity': 'info', 'field': 'P_NN_INDUSTRY_RANK', 'description': 'New P_NN leader of its industry'},
+    {'name': 'industry_rank_up', 'when': 'D_P_NN_INDUSTRY_RANK <= -10', 'severity': 'info', 'field': 'P_NN_INDUSTRY_RANK',
+     'description': 'Up 10 or more places in its industry P_NN ranking'},
+    {'name': 'industry_rank_down', 'when': 'D_P_NN_INDUSTRY_RANK >= 10', 'severity': 'info', 'field': 'P_NN_INDUSTRY_RANK',
+     'description': 'Down 10 or more places in its industry P_NN ranking'},
+    {'name': 'volume_spike', 'when': 'VOLUME >= 3 * PREV_VOLUME and PREV_VOLUME > 0 and VOLUME >= 1000000',
+     'severity': 'info', 'field': 'VOLUME', 'description': 'Volume at least 3x the previous snapshot'},
+]
+
+
+def alerts_db_path(root=HISTORY_DIR):
+    return os.path.join(root, ALERTS_DB)
+
+
+def load_rules(path=RULES_FILE):
+    """Rules from the JSON file when it exists, else DEFAULT_RULES"""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return DEFAULT_RULES
+
+
+def industry_ranks(df):
+    """P_NN rank within INDUSTRY (1 = highest) and the industry's size"""
+    grouped = df.groupby('INDUSTRY', sort=False, observed=True)['P_NN']
+    return grouped.rank(method='min', ascending=False), grouped.transform('size')
+
+
+def previous_snapshot(date, root=HISTORY_DIR, lookback_days=PREVIOUS_LOOKBACK_DAYS):
+    """Latest stored snapshot from a day before `date` (today's own pulls are skipped), or None"""
+    day = pd.Timestamp(date).normalize()
+    history = read_history(root, columns=['DATE', 'TICKER', 'INDUSTRY'] + DELTA_COLS[:-1],
+                           start=day - pd.Timedelta(days=lookback_days), end=day)
+    history = history[history['DATE'] < day]
+    if len(history) == 0:
+        return None
+    previous = history[history['DATE'] == history['DATE'].max()]
+    # Several pulls on one DATE: the last one is that day's snapshot
+    return previous.drop_duplicates('TICKER', keep='last').reset_index(drop=True)
+
+
+def alert_frame(current, previous=None, book=None):
+    """
+    One row per current TICKER with everything rules can reference: today's
+    columns, P_NN_INDUSTRY_RANK and INDUSTRY_SIZE, PREV_<col> and D_<col> for
+    DELTA_COLS (NaN without a previous snapshot), and IS_LONG/IS_SHORT for
+    names in the held book.
+    """
+    frame = current.reset_index(drop=True).copy()
+    frame['P_NN_INDUSTRY_RANK'], frame['INDUSTRY_SIZE'] = industry_ranks(frame)
+
+    if previous is not None and len(previous) > 0:
+        previous = previous.copy()
+        previous['P_NN_INDUSTRY_RANK'] = industry_ranks(previous)[0]
+        prior = previous.drop_duplicates('TICKER', keep='last').set_index('TICKER')
+        cols = [col for col in DELTA_COLS if col in prior.columns and col in frame.columns]
+        aligned = prior[cols].reindex(frame['TICKER'])
+        for col in cols:
+            frame[f"PREV_{col}"] = pd.to_numeric(aligned[col], errors='coerce').to_numpy(dtype=float)
+    for col in DELTA_COLS:
+        if f"PREV_{col}" not in frame.columns:
+            frame[f"PREV_{col}"] = np.nan
+        if col in frame.columns:
+            frame[f"D_{col}"] = frame[col] - frame[f"PREV_{col}"]
+
+    held = book[['TICKER', 'POSITION_TYPE']] if book is not None and len(book) > 0 else None
+    frame['IS_LONG'] = frame['TICKER'].isin(held.loc[held['POSITION_TYPE'] == 'LONG', 'TICKER']) if held is not None else False
+    frame['IS_SHORT'] = frame['TICKER'].isin(held.loc[held['POSITION_TYPE'] == 'SHORT', 'TICKER']) if held is not None else False
+    return frame
+
+
+class _Elementwise(ast.NodeTransformer):
+    """Rewrites and/or/not and chained comparisons into elementwise &, |, ~ as DataFrame.eval does"""
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        return functools.reduce(lambda left, right: ast.BinOp(left, op, right), node.values)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        return ast.UnaryOp(ast.Invert(), node.operand) if isinstance(node.op, ast.Not) else node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        operands = [node.left] + node.comparators
+        parts = [ast.Compare(left, [op], [right]) for left, op, right in zip(operands, node.ops, operands[1:])]
+        return functools.reduce(lambda left, right: ast.BinOp(left, ast.BitAnd(), right), parts)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_rule(expression):
+    """
+    Parses a rule expression once into a code object over numpy columns, so
+    evaluating hundreds of rules costs only the array operations themselves
+    """
+    source = re.sub(r"@(\w+)", r"_const_\1", expression)
+    tree = _Elementwise().visit(ast.parse(source, mode='eval'))
+    return compile(ast.fix_missing_locations(tree), f"<rule {expression}>", 'eval')
+
+
+class _Columns(dict):
+    """Rule namespace: frame columns as numpy arrays, fetched on first use"""
+
+    def __init__(self, frame):
+        super().__init__({f"_const_{name}": value for name, value in RULE_CONSTANTS.items()}, abs=np.abs)
+        self.frame = frame
+
+    def __missing__(self, name):
+        if name not in self.frame.columns:
+            raise NameError(f"name '{name}' is not a column")
+        values = self.frame[name].to_numpy()
+        self[name] = values
+        return values
+
+
+def evaluate_rules(frame, rules, date=None):
+    """
+    Evaluates every rule as one vectorized expression over the whole frame and
+    returns the matches as an events frame (EVENT_COLUMNS). A rule that fails
+    to evaluate is reported and skipped.
+    """
+    date = snapshot_date(frame) if date is None else pd.Timestamp(date).normalize()
+    namespace = _Columns(frame)
+    matched_rules = []
+    matched_rows = []
+    for rule in rules:
+        try:
+            mask = np.asarray(eval(compile_rule(rule['when']), {'__builtins__': {}}, namespace))
+            if mask.dtype != bool or mask.shape != (len(frame),):
+                raise ValueError("expression is not a boolean column")
+        except Exception as e:
+            print(f"Alert rule {rule.get('name')}: {type(e).__name__}: {e}")
+            continue
+        rows = np.flatnonzero(mask)
+        if len(rows):
+            matched_rules.append(rule)
+            matched_rows.append(rows)
+
+    if not matched_rules:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    # One gather for all matches; per-rule attributes are repeated over each rule's rows
+    counts = [len(rows) for rows in matched_rows]
+    rows = np.concatenate(matched_rows)
+    fields = [rule.get('field', 'P_NN') for rule in matched_rules]
+    text = {col: frame[col].astype(str).to_numpy()[rows] if col in frame.columns else ''
+            for col in ['TICKER', 'NAME', 'SECTOR', 'INDUSTRY']}
+    numeric = {}
+    values = np.concatenate([_field_values(frame, field, field_rows, numeric)
+                             for field, field_rows in zip(fields, matched_rows)])
+    prev_values = np.concatenate([_field_values(frame, f"PREV_{field}", field_rows, numeric)
+                                  for field, field_rows in zip(fields, matched_rows)])
+    events = pd.DataFrame({
+        'SNAPSHOT_DATE': date.strftime('%Y-%m-%d'),
+        'RULE': np.repeat([rule['name'] for rule in matched_rules], counts),
+        'SEVERITY': np.repeat([rule.get('severity', 'info') for rule in matched_rules], counts),
+        **text,
+        'FIELD': np.repeat(fields, counts),
+        'VALUE': values,
+        'PREV_VALUE': prev_values,
+        'DESCRIPTION': np.repeat([rule.get('description', rule['when']) for rule in matched_rules], counts),
+        'CREATED_AT': datetime.now().isoformat(timespec='seconds'),
+    })
+    return events[EVENT_COLUMNS]
+
+
+def _field_values(frame, col, rows, cache):
+    """Float values of `col` at `rows` (NaN when the frame has no such column), converting each column once"""
+    if col not in frame.columns:
+        return np.full(len(rows), np.nan)
+    if col not in cache:
+        cache[col] = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=float)
+    return cache[col][rows]
+
+
+def connect(root=HISTORY_DIR):
+    os.makedirs(root, exist_ok=True)
+    conn = sqlite3.connect(alerts_db_path(root))
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS alert_events (
+            SNAPSHOT_DATE TEXT, RULE TEXT, SEVERITY TEXT, TICKER TEXT, NAME TEXT, SECTOR TEXT, INDUSTRY TEXT,
+            FIELD TEXT, VALUE REAL, PREV_VALUE REAL, DESCRIPTION TEXT, CREATED_AT TEXT,
+            UNIQUE (SNAPSHOT_DATE, RULE, TICKER)
+        )""")
+    return conn
+
+
+def write_events(events, root=HISTORY_DIR):
+    """Appends events; re-scanning the same snapshot does not duplicate them. Returns rows inserted."""
+    if len(events) == 0:
+        return 0
+    records = events[EVENT_COLUMNS].astype(object).where(events[EVENT_COLUMNS].notna(), None)
+    with connect(root) as conn:
+        before = conn.total_changes
+        conn.executemany(f"INSERT OR IGNORE INTO alert_events ({', '.join(EVENT_COLUMNS)}) "
+                         f"VALUES ({', '.join('?' * len(EVENT_COLUMNS))})", records.itertuples(index=False, name=None))
+        inserted = conn.total_changes - before
+    conn.close()
+    return inserted
+
+
+def read_events(root=HISTORY_DIR, since=None, limit=5000):
+    """Most recent events first, optionally from SNAPSHOT_DATE `since` on"""
+    if not os.path.exists(alerts_db_path(root)):
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    query = f"SELECT {', '.join(EVENT_COLUMNS)} FROM alert_events"
+    params = []
+    if since is not None:
+        query += " WHERE SNAPSHOT_DATE >= ?"
+        params.append(pd.Timestamp(since).strftime('%Y-%m-%d'))
+    query += " ORDER BY SNAPSHOT_DATE DESC, CASE SEVERITY WHEN 'critical' THEN 0 WHEN 'warning' THEN 1 ELSE 2 END, RULE LIMIT ?"
+    params.append(limit)
+    conn = connect(root)
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+
+def scan_snapshot(df, rules=None, root=HISTORY_DIR, previous=None, book=None):
+    """
+    Runs the rules over a freshly fetched (cleaned) snapshot against the
+    previous stored snapshot and the latest saved book, and logs the events.
+    Returns the events frame.
+    """
+    start = time.perf_counter()
+    rules = load_rules() if rules is None else rules
+    date = snapshot_date(df)
+    previous = previous_snapshot(date, root) if previous is None else previous
+    book = load_book(before=date + pd.Timedelta(days=1), root=root) if book is None else book
+    if previous is None:
+        print("Alerts: no previous snapshot in the history store - day-over-day rules match nothing")
+
+    events = evaluate_rules(alert_frame(df, previous, book), rules, date)
+    inserted = write_events(events, root)
+    print(f"Alerts: {len(rules)} rules, {len(events)} events ({inserted} new) for {date:%Y-%m-%d} "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a snapshot for alert events")
+    parser.add_argument("--source", default="xlsx", choices=["api", "xlsx", "store"])
+    parser.add_argument("--rules", default=RULES_FILE, help="JSON rule list (default: built-in rules)")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    configure(args)
+
+    from .loader import load_snapshot
+    events = scan_snapshot(load_snapshot(args.source), load_rules(args.rules))
+    if len(events):
+        print(events.groupby(['SEVERITY', 'RULE']).size().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import glob
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from .history import has_history, read_history
+from .similarity import NORM_COLS
+
+# Forward horizons in trading days (one snapshot DATE per trading day)
+HORIZONS = [5, 10, 21, 63]
+
+# P_NN is the average P that materialized after similar conditions
+TARGET_COL = 'P'
+
+
+def load_snapshot_history(pattern="squeeze_data_*.xlsx", columns=None):
+    """
+    Reads every stored snapshot into one long frame with one row per (DATE, TICKER).
+    Uses the columnar history store when it has been backfilled, otherwise the
+    xlsx files. If several pulls share a DATE, the most recent one wins.
+    """
+    if has_history():
+        history = read_history(columns=columns)
+        return _one_row_per_date(history)
+
+    files = sorted(glob.glob(pattern), key=os.path.getctime)
+    frames = []
+    for path in files:
+        snap = pd.read_excel(path, usecols=columns)
+        snap = snap.dropna(subset=['TICKER'])
+        if 'DATE' not in snap.columns:
+            # Fall back to the fetch date encoded in squeeze_data_YYYYMMDD_HHMMSS.xlsx
+            snap['DATE'] = datetime.strptime(os.path.basename(path)[13:21], "%Y%m%d")
+        frames.append(snap)
+
+    if not frames:
+        return pd.DataFrame(columns=['DATE', 'TICKER'])
+
+    return _one_row_per_date(pd.concat(frames, ignore_index=True))
+
+
+def _one_row_per_date(history):
+    history['DATE'] = pd.to_datetime(history['DATE'], errors='coerce')
+    history = history.dropna(subset=['DATE'])
+    history = history.drop_duplicates(subset=['DATE', 'TICKER'], keep='last')
+    return history.sort_values(['DATE', 'TICKER']).reset_index(drop=True)
+
+
+def add_forward_outcomes(history, horizons=HORIZONS, target=TARGET_COL):
+    """
+    Adds FWD_<target>_<h> = target value for the same ticker h snapshot dates later.
+
+    Horizons count distinct snapshot dates, so a ticker missing on the
+    target date simply has no outcome instead of borrowing a later one.
+    """
+    history = history.copy()
+    dates = np.sort(history['DATE'].unique())
+    history['_DATE_ORD'] = np.searchsorted(dates, history['DATE'].to_numpy())
+    outcomes = history[['TICKER', '_DATE_ORD', target]]
+
+    for h in horizons:
+        shifted = outcomes.assign(_DATE_ORD=outcomes['_DATE_ORD'] - h).rename(columns={target: f"FWD_{target}_{h}"})
+        history = history.merge(shifted, on=['TICKER', '_DATE_ORD'], how='left')
+        # Remember when each outcome became known so forecasts can avoid look-ahead
+        outcome_dates = pd.Series(dates[np.minimum(history['_DATE_ORD'] + h, len(dates) - 1)], index=history.index)
+        history[f"FWD_DATE_{h}"] = outcome_dates.where(history['_DATE_ORD'] + h < len(dates))
+
+    return history.drop(columns=['_DATE_ORD'])
+
+
+class AnalogForecaster:
+    """
+    Nearest-neighbor analog forecasts from stored snapshot history.
+
+    One KD-tree per horizon is built over historical feature vectors whose
+    forward outcome is known (as of `as_of` when given). A forecast is the
+    mean outcome of the k closest analogs, queried for the whole universe
+    in one batched call spread across all cores.
+    """
+
+    def __init__(self, history, feature_cols=NORM_COLS, target=TARGET_COL, horizons=HORIZONS, as_of=None):
+        self.feature_cols = list(feature_cols)
+        self.target = target
+        self.horizons = list(horizons)
+
+        history = add_forward_outcomes(history, self.horizons, target)
+        features = history[self.feature_cols].apply(pd.to_numeric, errors='coerce')
+        complete = features.notna().all(axis=1).to_numpy()
+
+        self.trees = {}
+        self.outcomes = {}
+        for h in self.horizons:
+            known = complete & history[f"FWD_{target}_{h}"].notna().to_numpy()
+            if as_of is not None:
+                known &= (history[f"FWD_DATE_{h}"] <= pd.Timestamp(as_of)).to_numpy()
+            if known.sum() == 0:
+                continue
+            self.trees[h] = cKDTree(features.to_numpy(dtype=float)[known])
+            self.outcomes[h] = pd.to_numeric(history.loc[known, f"FWD_{target}_{h}"], errors='coerce').to_numpy(dtype=float)
+
+        print(f"Analog index: {len(history):,} historical rows, horizons with data: {sorted(self.trees)}")
+
+    def forecast(self, current, k=50, workers=-1):
+        """
+        Returns TICKER plus <target>_ANALOG_<h> (mean analog outcome) and
+        <target>_ANALOG_<h>_STD for every horizon with history.
+        """
+        result = current[['TICKER']].copy().reset_index(drop=True)
+        features = current[self.feature_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(features).any(axis=1)
+
+        for h in self.horizons:
+            col = f"{self.target}_ANALOG_{h}"
+            result[col] = np.nan
+            result[f"{col}_STD"] = np.nan
+            if h not in self.trees or not valid.any():
+                continue
+
+            tree = self.trees[h]
+            n = min(k, tree.n)
+            _, idx = tree.query(features[valid], k=n, workers=workers)
+            neighbor_outcomes = self.outcomes[h][idx.reshape(len(idx), -1)]
+            result.loc[valid, col] = neighbor_outcomes.mean(axis=1)
+            result.loc[valid, f"{col}_STD"] = neighbor_outcomes.std(axis=1)
+
+        return result
+
+
+def run_analog_forecast(pattern="squeeze_data_*.xlsx", horizons=HORIZONS, k=50, feature_cols=NORM_COLS, output=None):
+    """
+    Forecasts the latest snapshot from all earlier stored snapshots
+    """
+    start = time.perf_counter()
+    history = load_snapshot_history(pattern)
+    if len(history) == 0:
+        print("No snapshot history found")
+        return None
+    print(f"Loaded {len(history):,} rows over {history['DATE'].nunique()} dates in {time.perf_counter() - start:.1f}s")
+
+    latest_date = history['DATE'].max()
+    current = history[history['DATE'] == latest_date]
+
+    start = time.perf_counter()
+    forecaster = AnalogForecaster(history, feature_cols=feature_cols, horizons=horizons, as_of=latest_date)
+    forecast = forecaster.forecast(current, k=k)
+    print(f"Forecast {len(forecast):,} tickers for {latest_date:%Y-%m-%d} in {time.perf_counter() - start:.2f}s")
+
+    if output:
+        forecast.to_excel(output, index=False)
+        print(f"Forecast saved to {output}")
+    return forecast
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local nearest-neighbor analog forecast from stored snapshots")
+    parser.add_argument("--pattern", default="squeeze_data_*.xlsx", help="Glob for stored snapshot files")
+    parser.add_argument("--horizons", type=int, nargs="+", default=HORIZONS, help="Forward horizons in trading days")
+    parser.add_argument("--k", type=int, default=50, help="Number of analogs per forecast")
+    parser.add_argument("--features", nargs="+", default=NORM_COLS, help="Feature columns defining similar conditions")
+    parser.add_argument("--output", default=None, help="Optional .xlsx path for the forecast")
+    args = parser.parse_args()
+    run_analog_forecast(args.pattern, args.horizons, args.k, args.features, args.output)
@@ -0,0 +1,78 @@
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from .config import settings
+
+# Pulls slower than this are listed by the summary
+SLOW_FETCH_SECONDS = 10
+
+
+def content_hash(payload):
+    """SHA-256 of a raw response body, used to spot byte-identical pulls"""
+    return hashlib.sha256(payload).hexdigest()
+
+
+def last_record(path=None):
+    """Most recent audit record, read from the end of the log, or None"""
+    path = path or settings().audit_log
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as f:
+        f.seek(max(os.path.getsize(path) - 4096, 0))
+        lines = f.read().splitlines()
+    return json.loads(lines[-1]) if lines else None
+
+
+def write_record(record, path=None):
+    """
+    Appends one pull to the JSON-lines audit log, adding the time and whether
+    the body is identical to the previous logged pull
+    """
+    path = path or settings().audit_log
+    previous = last_record(path)
+    record = {'time': datetime.now().isoformat(timespec='seconds'), **record}
+    if 'sha256' in record:
+        record['same_as_previous'] = previous is not None and previous.get('sha256') == record['sha256']
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+
+def read_audit(path=None):
+    """The whole audit log as a frame, one row per pull"""
+    path = path or settings().audit_log
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_json(path, lines=True)
+
+
+def summarize(audit, slow_seconds=SLOW_FETCH_SECONDS):
+    """Counts, timing percentiles, duplicate pulls and the slow or failed ones"""
+    if len(audit) == 0:
+        print("No pulls logged yet")
+        return
+    ok = audit[audit['status'] == 200] if 'status' in audit.columns else audit
+    print(f"{len(audit)} pulls from {audit['time'].min()} to {audit['time'].max()}, {len(audit) - len(ok)} failed")
+    if len(ok):
+        seconds = ok['seconds'].quantile([0.5, 0.95, 1.0])
+        print(f"Fetch seconds p50 {seconds[0.5]:.2f}, p95 {seconds[0.95]:.2f}, max {seconds[1.0]:.2f}; "
+              f"median {ok['bytes'].median() / 1024:.0f} kB, {ok['rows'].median():.0f} rows")
+        print(f"Identical to the previous pull: {int(ok['same_as_previous'].sum())}, "
+              f"distinct payloads: {ok['sha256'].nunique()}")
+    slow = audit[(audit['seconds'] >= slow_seconds) | (audit['status'] != 200)]
+    if len(slow):
+        print(f"Slow or failed pulls:\n{slow.to_string(index=False)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the API fetch audit log")
+    parser.add_argument("--path", default=None, help="Audit log (default: the audit_log setting)")
+    parser.add_argument("--slow", type=float, default=SLOW_FETCH_SECONDS, help="Seconds above which a pull is listed")
+    args = parser.parse_args()
+    summarize(read_audit(args.path), args.slow)
@@ -0,0 +1,134 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .history import (HISTORY_DIR, fetch_time_from_filename, load_manifest,
+                      save_manifest, snapshot_path, write_snapshot)
+from .schema import normalize_snapshot, snapshot_hash, validate_snapshot
+
+ERROR_REPORT = "backfill_errors.json"
+
+
+def file_signature(path):
+    """Size and mtime identify a source file; a changed file is re-ingested"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def store_snapshot(raw, path, root=HISTORY_DIR):
+    """
+    Normalizes, validates and stores one snapshot read from `path` (an
+    xlsx file name); returns its manifest entry without the timing.
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    df = normalize_snapshot(raw)
+
+    # Older pulls without a DATE column fall back to the fetch time in the filename
+    if df['DATE'].isna().all():
+        fetched = fetch_time_from_filename(path)
+        if fetched is not None:
+            df['DATE'] = pd.Timestamp(fetched.date())
+    df['SOURCE_FILE'] = os.path.basename(path)
+
+    warnings = validate_snapshot(raw, df)
+    write_snapshot(df, name, root)
+    return {'file': path, 'status': 'ok', 'rows': len(df), 'warnings': warnings,
+            'snapshot_hash': snapshot_hash(df), **file_signature(path)}
+
+
+def ingest_file(path, root=HISTORY_DIR):
+    """
+    Parses, normalizes, validates and stores one snapshot file.
+    Runs in a worker process and only returns a small summary.
+    """
+    start = time.perf_counter()
+    try:
+        entry = store_snapshot(pd.read_excel(path), path, root)
+        return {**entry, 'seconds': round(time.perf_counter() - start, 3)}
+    except Exception as e:
+        return {'file': path, 'status': 'error', 'error': f"{type(e).__name__}: {e}",
+                'seconds': round(time.perf_counter() - start, 3), **file_signature(path)}
+
+
+def discover_files(pattern, manifest, force=False):
+    """Files matching the pattern that are new or changed since they were last ingested"""
+    files = sorted(glob.glob(pattern))
+    if force:
+        return files
+    pending = []
+    for path in files:
+        entry = manifest.get(os.path.basename(path))
+        if entry and entry.get('status') in ('ok', 'duplicate') and entry.get('size') == os.path.getsize(path) \
+                and entry.get('mtime') == os.path.getmtime(path):
+            continue
+        pending.append(path)
+    return pending
+
+
+def backfill(pattern="squeeze_data_*.xlsx", root=HISTORY_DIR, workers=None, force=False):
+    """
+    Ingests every pending snapshot file into the columnar history store in
+    parallel. The manifest is saved after each file, so an interrupted run
+    resumes where it stopped.
+    """
+    manifest = load_manifest(root)
+    pending = discover_files(pattern, manifest, force)
+    total_files = len(glob.glob(pattern))
+    print(f"Found {total_files} snapshot files, {len(pending)} to ingest into {root}/")
+    if not pending:
+        return manifest
+
+    start = time.perf_counter()
+    errors = []
+    # Snapshot content already stored -> its file, so identical pulls are kept once
+    stored = {entry['snapshot_hash']: name for name, entry in manifest.items()
+              if entry.get('status') == 'ok' and 'snapshot_hash' in entry}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(ingest_file, path, root) for path in pending]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            name = os.path.basename(result['file'])
+            duplicate_of = stored.get(result.get('snapshot_hash'))
+            if result['status'] == 'ok' and duplicate_of not in (None, name):
+                os.remove(snapshot_path(os.path.splitext(name)[0], root))
+                result.update(status='duplicate', duplicate_of=duplicate_of)
+            elif result['status'] == 'ok':
+                stored[result['snapshot_hash']] = name
+            manifest[name] = result
+            save_manifest(manifest, root)
+
+            if result['status'] == 'duplicate':
+                print(f"[{done}/{len(pending)}] {result['file']}: same content as {duplicate_of}, not stored again")
+            elif result['status'] == 'ok':
+                note = f" ({len(result['warnings'])} warnings)" if result['warnings'] else ""
+                print(f"[{done}/{len(pending)}] {result['file']}: {result['rows']} rows in {result['seconds']}s{note}")
+            else:
+                errors.append(result)
+                print(f"[{done}/{len(pending)}] {result['file']}: FAILED - {result['error']}")
+
+    report = [{'file': entry['file'], 'error': entry.get('error'), 'warnings': entry.get('warnings', [])}
+              for entry in manifest.values() if entry['status'] == 'error' or entry.get('warnings')]
+    with open(os.path.join(root, ERROR_REPORT), "w") as f:
+        json.dump(report, f, indent=2)
+
+    elapsed = time.perf_counter() - start
+    duplicates = sum(1 for path in pending if manifest[os.path.basename(path)]['status'] == 'duplicate')
+    print(f"Ingested {len(pending) - len(errors) - duplicates} files, {duplicates} duplicates skipped, "
+          f"{len(errors)} failed in {elapsed:.1f}s")
+    print(f"Per-file error report: {os.path.join(root, ERROR_REPORT)}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill squeeze_data_*.xlsx snapshots into the columnar history store")
+    parser.add_argument("--pattern", default="squeeze_data_*.xlsx", help="Glob for snapshot files")
+    parser.add_argument("--root", default=HISTORY_DIR, help="History store directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="Re-ingest files that are already in the manifest")
+    args = parser.parse_args()
+    backfill(args.pattern, args.root, args.workers, args.force)
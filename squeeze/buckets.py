@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Size buckets from dollar volume (CLOSE x VOLUME), the snapshot's market cap proxy:
+# cut at the 25/75 quantiles into Small/Mid/Large
+BUCKET_QUANTILES = (0.25, 0.75)
+BUCKET_LABELS = ['Small', 'Mid', 'Large']
+
+# Grouping the cut points are taken within (None = one set for the whole snapshot, or 'SECTOR')
+BUCKET_GROUP = None
+
+# Default names when a different number of buckets is asked for
+NAMED_BUCKETS = {
+    3: BUCKET_LABELS,
+    4: ['Small', 'Mid', 'Large', 'Mega'],
+    5: ['Micro', 'Small', 'Mid', 'Large', 'Mega'],
+}
+
+
+def even_quantiles(n_buckets):
+    """Inner cut points for n equal-count buckets, e.g. (0.2, 0.4, 0.6, 0.8) for 5"""
+    return tuple(np.arange(1, n_buckets) / n_buckets)
+
+
+def bucket_labels(n_buckets):
+    """Bucket names smallest first: Small/Mid/Large style up to 5 buckets, Q1..Qn beyond"""
+    return NAMED_BUCKETS.get(n_buckets, [f"Q{i}" for i in range(1, n_buckets + 1)])
+
+
+def bucket_codes(values, cuts):
+    """
+    pd.cut(values, [0, *cuts, inf], right=True) as integer codes, -1 for
+    values <= 0 or missing. cuts is one sorted array, or one row of cut points
+    per value (per-group cuts).
+    """
+    cuts = np.asarray(cuts, dtype=float)
+    if cuts.ndim == 1:
+        codes = np.searchsorted(cuts, values, side='left')
+    else:
+        codes = (values[:, None] > cuts).sum(axis=1)
+    return np.where(values > 0, codes, -1)
+
+
+def bucket_categorical(codes, labels):
+    """Ordered categorical (int8 codes) so buckets compare as Small < Mid < Large"""
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+
+def add_market_cap_buckets(df, quantiles=BUCKET_QUANTILES, labels=None, by=BUCKET_GROUP):
+    """
+    Adds DOLLAR_VOLUME and MARKET_CAP_BUCKET, cut at the given dollar-volume
+    quantiles of the whole snapshot, or of each SECTOR when by='SECTOR'.
+
+    Meant to run once per snapshot at load time: buckets then stay the same
+    however the frame is filtered afterwards, so pair and book code compares
+    names on one scale.
+    """
+    labels = bucket_labels(len(quantiles) + 1) if labels is None else list(labels)
+    if len(labels) != len(quantiles) + 1:
+        raise ValueError(f"{len(quantiles)} cut points need {len(quantiles) + 1} labels, got {len(labels)}")
+
+    dollar_volume = df['CLOSE'] * df['VOLUME']
+    values = dollar_volume.to_numpy(dtype=float)
+    if len(df) == 0:
+        codes = np.array([], dtype=int)
+    elif by is None:
+        codes = bucket_codes(values, dollar_volume.quantile(list(quantiles)).to_numpy())
+    else:
+        cuts = dollar_volume.groupby(df[by], observed=True).quantile(list(quantiles)).unstack()
+        codes = bucket_codes(values, cuts.reindex(df[by].to_numpy()).to_numpy())
+    return df.assign(DOLLAR_VOLUME=dollar_volume,
+                     MARKET_CAP_BUCKET=pd.Series(bucket_categorical(codes, labels), index=df.index))
+
+
+def ensure_market_cap_buckets(df):
+    """The frame as is when it already carries snapshot buckets, else with them added"""
+    return df if 'MARKET_CAP_BUCKET' in df.columns else add_market_cap_buckets(df)
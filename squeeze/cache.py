@@ -0,0 +1,208 @@
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process, nothing to coordinate
+    fcntl = None
+
+# Published snapshots, kept as uncompressed Arrow IPC files so every worker
+# process can memory-map the same pages. Each publish writes a new immutable
+# file under versions/ and then swaps the CURRENT pointer file to it.
+CACHE_DIR = "cache"
+VERSIONS_DIR = "versions"
+POINTER_FILE = "CURRENT"
+LOCK_FILE = "fetch.lock"
+
+# Touched at every pull attempt, so a failing API is retried once per refresh, not by every worker
+ATTEMPT_FILE = "last_fetch"
+
+# Single-file cache written before snapshots were versioned; still read when there is no pointer
+CACHE_FILE = "snapshot.arrow"
+
+# Versions kept on disk; older ones are deleted (workers still mapping them keep their pages)
+KEEP_VERSIONS = 3
+
+
+def cache_path(root=CACHE_DIR):
+    return os.path.join(root, CACHE_FILE)
+
+
+def pointer_path(root=CACHE_DIR):
+    return os.path.join(root, POINTER_FILE)
+
+
+def current_version(root=CACHE_DIR):
+    """File name of the published snapshot the pointer refers to, or None"""
+    try:
+        with open(pointer_path(root)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def version_path(version, root=CACHE_DIR):
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def snapshot_table(df):
+    """
+    The snapshot as an Arrow table. Float columns keep NaN as a value rather
+    than a null, so they need no validity bitmap and map back into pandas
+    without a copy.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_floating(field.type) and table.column(i).null_count:
+            table = table.set_column(i, field, pa.array(df[field.name].to_numpy(dtype=float), from_pandas=False))
+    return table
+
+
+def write_cache(df, root=CACHE_DIR):
+    """
+    Publishes the snapshot: writes a new version file, then atomically
+    replaces the pointer (temp file, then rename), so readers see either the
+    old version or the complete new one. Returns the new version's path.
+    """
+    os.makedirs(os.path.join(root, VERSIONS_DIR), exist_ok=True)
+    version = f"snapshot-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{os.getpid()}.arrow"
+    path = version_path(version, root)
+    table = snapshot_table(df)
+    with pa.OSFile(path + ".tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(path + ".tmp", path)
+    with open(pointer_path(root) + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer_path(root) + ".tmp", pointer_path(root))
+    prune_versions(root)
+    return path
+
+
+def prune_versions(root=CACHE_DIR, keep=KEEP_VERSIONS):
+    """Deletes all but the newest `keep` versions (never the current one)"""
+    current = current_version(root)
+    versions = sorted(name for name in os.listdir(os.path.join(root, VERSIONS_DIR)) if name.endswith(".arrow"))
+    for name in versions[:-keep]:
+        if name != current:
+            try:
+                os.remove(version_path(name, root))
+            except OSError:
+                pass
+
+
+def read_snapshot(path):
+    """
+    Memory-maps a snapshot file as a DataFrame. Numeric columns are backed
+    by the mapped pages (read-only, shared with every process mapping the
+    same file); text columns are built as Python objects per process.
+    """
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+
+
+def read_cache(root=CACHE_DIR, version=None):
+    """
+    The published snapshot (or a given version) as a DataFrame, or None when
+    there is no usable cache yet.
+    """
+    version = version or current_version(root)
+    path = version_path(version, root) if version else cache_path(root)
+    if not os.path.exists(path):
+        return None
+    start = time.perf_counter()
+    try:
+        df = read_snapshot(path)
+    except (pa.ArrowInvalid, OSError) as e:
+        print(f"Ignoring unreadable snapshot cache {path}: {e}")
+        return None
+    print(f"Loaded {len(df)} cached records from {path} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return df
+
+
+def cache_age_seconds(root=CACHE_DIR):
+    """Seconds since the last publish"""
+    path = pointer_path(root) if os.path.exists(pointer_path(root)) else cache_path(root)
+    return time.time() - os.path.getmtime(path) if os.path.exists(path) else None
+
+
+@contextmanager
+def fetch_lock(root=CACHE_DIR):
+    """
+    Non-blocking machine-wide lock around an API pull: yields True in the
+    one process that holds it and False in the others, which keep serving
+    and pick the result up from the pointer file. Released if the holder dies.
+    """
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK_FILE), "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SharedSnapshot:
+    """
+    A worker process's view of the published snapshot. refresh() maps a new
+    version when the pointer moves, and publish() pulls and publishes one
+    only if no other process on the machine is already doing so and the
+    current version is older than max_age_seconds, so N workers share one
+    copy of the numeric data and one API pull per refresh.
+    """
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+        self.version = None
+        self.df = None
+
+    def refresh(self):
+        """Maps the published version if it changed since the last call; True when it did"""
+        version = current_version(self.root)
+        if self.df is not None and version == self.version:
+            return False
+        df = read_cache(self.root, version)
+        if df is None:
+            return False
+        self.version, self.df = version, df
+        return True
+
+    def publish(self, load, max_age_seconds=0):
+        """
+        Calls load() and publishes its result when this process wins the
+        fetch lock and both the published version and the last pull attempt
+        are at least max_age_seconds old. Returns True when a new version was
+        published; refresh() maps it.
+        """
+        with fetch_lock(self.root) as holder:
+            if not holder:
+                return False
+            attempt = os.path.join(self.root, ATTEMPT_FILE)
+            ages = [cache_age_seconds(self.root)]
+            if os.path.exists(attempt):
+                ages.append(time.time() - os.path.getmtime(attempt))
+            if any(age is not None and age < max_age_seconds for age in ages):
+                return False
+            with open(attempt, "w") as f:
+                f.write(str(os.getpid()))
+            fresh = load()
+            if len(fresh) == 0:
+                return False
+            write_cache(fresh, self.root)
+        return True
+
+    def idle(self):
+        """True when no process on the machine is pulling right now"""
+        with fetch_lock(self.root) as free:
+            return free
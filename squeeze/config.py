@@ -0,0 +1,107 @@
+import json
+import os
+from functools import lru_cache
+
+# Settings and their defaults. A JSON file, SQUEEZE_* environment variables
+# and command-line flags override them, in that order.
+DEFAULTS = {
+    'api_base': "https://squeezemetrics.com",
+    'api_key': "",
+    'timeout': 30.0,
+    'refresh_seconds': 3600,
+    'audit_log': os.path.join("history", "fetch_audit.jsonl"),
+}
+
+CONFIG_FILE = "squeeze_config.json"
+ENV_PREFIX = "SQUEEZE_"
+
+# Overrides from configure(), e.g. parsed command-line flags
+_overrides = {}
+
+
+class Settings:
+    """Resolved settings as read-only attributes, plus where each value came from"""
+
+    def __init__(self, values, sources):
+        self._values = values
+        self.sources = sources
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f"no setting named {name!r}") from None
+
+    def as_dict(self, redact=True):
+        """All values, with the API key masked unless redact=False"""
+        values = dict(self._values)
+        if redact and values.get('api_key'):
+            values['api_key'] = values['api_key'][:4] + "..."
+        return values
+
+
+def coerce(name, value):
+    """Strings from the environment or the command line, typed like the default"""
+    default = DEFAULTS[name]
+    if isinstance(default, bool):
+        return str(value).lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, float):
+        return float(value)
+    if isinstance(default, int):
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError(f"{name} must be a whole number, got {value!r}")
+        return int(number)
+    return str(value)
+
+
+def read_config_file(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        values = json.load(f)
+    unknown = sorted(set(values) - set(DEFAULTS))
+    if unknown:
+        print(f"Ignoring unknown settings in {path}: {', '.join(unknown)}")
+    return {name: coerce(name, value) for name, value in values.items() if name in DEFAULTS}
+
+
+@lru_cache(maxsize=1)
+def settings():
+    """
+    The settings, resolved once per process: defaults < JSON file
+    (SQUEEZE_CONFIG or ./squeeze_config.json) < SQUEEZE_<NAME> environment
+    variables < configure() overrides.
+    """
+    values = dict(DEFAULTS)
+    sources = dict.fromkeys(DEFAULTS, 'default')
+    config_file = os.environ.get(ENV_PREFIX + "CONFIG", CONFIG_FILE)
+    env = {name: coerce(name, os.environ[ENV_PREFIX + name.upper()])
+           for name in DEFAULTS if ENV_PREFIX + name.upper() in os.environ}
+    for source, layer in [(config_file, read_config_file(config_file)), ('env', env), ('cli', _overrides)]:
+        values.update(layer)
+        sources.update(dict.fromkeys(layer, source))
+    return Settings(values, sources)
+
+
+def add_config_arguments(parser):
+    """Adds --api-base, --api-key, --timeout, ... flags (unset unless given) to a script's parser"""
+    group = parser.add_argument_group("settings")
+    for name in DEFAULTS:
+        group.add_argument("--" + name.replace('_', '-'), dest=f"config_{name}", default=None,
+                           help=f"Overrides the {name} setting (default: {DEFAULTS[name]!r})" if name != 'api_key' else
+                           "API key (prefer SQUEEZE_API_KEY or the config file)")
+    return parser
+
+
+def configure(args=None, **values):
+    """
+    Applies overrides from parsed add_config_arguments() flags and/or keyword
+    values, and drops the cached settings so the next settings() call sees them
+    """
+    if args is not None:
+        values = {**{name: getattr(args, f"config_{name}") for name in DEFAULTS
+                     if getattr(args, f"config_{name}", None) is not None}, **values}
+    _overrides.update({name: coerce(name, value) for name, value in values.items()})
+    settings.cache_clear()
+    return settings()
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
+
+from .filters import filter_snapshot
+from .similarity import NORM_COLS
+
+RAW_SIGNALS = ['P', 'V', 'G', 'D', 'IV', 'P_NN']
+
+# Column sets offered by the correlation view
+SIGNAL_SETS = {
+    'raw': RAW_SIGNALS,
+    'norm': NORM_COLS + ['P_NN'],
+    'all': RAW_SIGNALS + NORM_COLS,
+}
+
+# The cube keeps one slot of moments per (SECTOR, INDUSTRY)
+CUBE_GROUPS = ['SECTOR', 'INDUSTRY']
+
+# Filter combinations whose cubes are kept per snapshot
+CUBE_CACHE_SIZE = 64
+
+# Groups with fewer names are left out of the group clustering
+MIN_GROUP_NAMES = 3
+
+LINKAGE_METHOD = 'average'
+
+
+class MomentCube:
+    """
+    Sufficient statistics of the signal columns per (SECTOR, INDUSTRY) group:
+    for every pair of columns (i, j), the number of rows where both are
+    present, and over those rows the sums of x_i and x_i**2 and the sum of
+    x_i * x_j. Correlations and group means for any set of columns, at
+    sector or industry level, are sums over this (group, col, col) cube
+    instead of passes over the rows.
+    """
+
+    def __init__(self, df, cols, by=CUBE_GROUPS):
+        self.cols = list(cols)
+        grouped = df.groupby(by, observed=True, sort=True)
+        codes = grouped.ngroup().to_numpy()
+        self.groups = grouped.size().index
+        order = np.argsort(codes, kind='stable')
+        x = df[self.cols].to_numpy(dtype=float)[order]
+        present = ~np.isnan(x)
+        weights = present.astype(float)
+        x = np.where(present, x, 0.0)
+        starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0]) if len(codes) else np.array([], dtype=int)
+
+        def per_group(left, right):
+            if len(starts) == 0:
+                return np.zeros((0, len(self.cols), len(self.cols)))
+            return np.add.reduceat(left[:, :, None] * right[:, None, :], starts, axis=0)
+
+        self.counts = per_group(weights, weights)
+        self.sums = per_group(x, weights)
+        self.squares = per_group(x * x, weights)
+        self.products = per_group(x, x)
+
+    def correlation(self, cols=None):
+        """Pairwise-complete Pearson correlation of the columns over all groups, as a DataFrame"""
+        cols = self.cols if cols is None else [col for col in cols if col in self.cols]
+        pos = [self.cols.index(col) for col in cols]
+        index = np.ix_(pos, pos)
+        n = self.counts.sum(axis=0)[index]
+        s = self.sums.sum(axis=0)[index]
+        q = self.squares.sum(axis=0)[index]
+        p = self.products.sum(axis=0)[index]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = p - s * s.T / n
+            var = (q - s * s / n) * (q.T - s.T * s.T / n)
+            corr = np.where((n > 1) & (var > 0), cov / np.sqrt(var), np.nan)
+        return pd.DataFrame(np.clip(corr, -1, 1), index=cols, columns=cols)
+
+    def profiles(self, level, cols=None, min_names=MIN_GROUP_NAMES):
+        """Mean of each column per `level` (SECTOR or INDUSTRY) value, plus a NAMES count"""
+        cols = self.cols if cols is None else [col for col in cols if col in self.cols]
+        pos = [self.cols.index(col) for col in cols]
+        keys = self.groups.get_level_values(level)
+        sums = pd.DataFrame(self.sums[:, pos, pos], columns=cols).groupby(keys).sum()
+        counts = pd.DataFrame(self.counts[:, pos, pos], columns=cols).groupby(keys).sum()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+        means['NAMES'] = counts.max(axis=1)
+        means.index.name = level
+        return means[means['NAMES'] >= min_names]
+
+
+def signal_order(corr, method=LINKAGE_METHOD):
+    """Columns reordered so that correlated signals sit together (clustering on 1 - correlation)"""
+    if len(corr) < 3:
+        return list(corr.index)
+    distance = 1 - corr.fillna(0).to_numpy()
+    np.fill_diagonal(distance, 0)
+    tree = linkage(squareform(np.clip(distance, 0, 2), checks=False), method=method)
+    return list(corr.index[leaves_list(tree)])
+
+
+def cluster_profiles(profiles, method=LINKAGE_METHOD):
+    """
+    Hierarchical clustering of group profiles: (z-scored profiles in leaf
+    order, linkage matrix in the original row order), or (profiles, None)
+    for fewer than three groups. Each signal is standardized across groups
+    first so no single signal's scale dominates the distances.
+    """
+    values = profiles.drop(columns='NAMES')
+    std = values.std(ddof=0).replace(0, np.nan)
+    scores = ((values - values.mean()) / std).fillna(0)
+    if len(scores) < 3:
+        return scores, None
+    tree = linkage(scores.to_numpy(), method=method)
+    return scores.iloc[leaves_list(tree)], tree
+
+
+class SignalCorrelation:
+    """
+    Cross-signal correlation and sector/industry clustering for one snapshot.
+
+    The moment cube of each filter combination (the filter_snapshot
+    arguments) is built once and kept in a small LRU cache, so switching
+    back to a filter, or between column sets and sector/industry level,
+    only redoes the (col x col) algebra and the clustering of a few hundred
+    groups.
+    """
+
+    def __init__(self, df, cols=SIGNAL_SETS['all'], cache_size=CUBE_CACHE_SIZE):
+        start = time.perf_counter()
+        self.df = df
+        self.cols = [col for col in cols if col in df.columns]
+        self.cache_size = cache_size
+        self._cubes = OrderedDict()
+        self._lock = threading.Lock()
+        self.cube()
+        print(f"Signal correlation: {len(self.cols)} columns, full-snapshot cube in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def cube(self, sector="All", industry="All", records=None, min_pnn=None, etf_filter="include", rank_filter=None):
+        """Moment cube of the snapshot under the given filters, cached per filter combination"""
+        key = (sector, industry, records, min_pnn, etf_filter, rank_filter)
+        with self._lock:
+            if key in self._cubes:
+                self._cubes.move_to_end(key)
+                return self._cubes[key]
+        cube = MomentCube(filter_snapshot(self.df, *key), self.cols)
+        with self._lock:
+            self._cubes[key] = cube
+            while len(self._cubes) > self.cache_size:
+                self._cubes.popitem(last=False)
+        return cube
+
+    def correlation(self, filters, signal_set='all'):
+        """Correlation matrix of a column set under the filters, clustered order on both axes"""
+        corr = self.cube(*filters).correlation(SIGNAL_SETS[signal_set])
+        order = signal_order(corr)
+        return corr.loc[order, order]
+
+    def group_clusters(self, filters, level='SECTOR', signal_set='all'):
+        """(z-scored mean profiles per SECTOR/INDUSTRY in leaf order, linkage matrix, raw profiles)"""
+        profiles = self.cube(*filters).profiles(level, SIGNAL_SETS[signal_set])
+        scores, tree = cluster_profiles(profiles)
+        return scores, tree, profiles
@@ -0,0 +1,238 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from .history import HISTORY_DIR, read_history
+
+# Signals whose persistence is measured
+DECAY_SIGNALS = ['P_NN', 'G', 'D']
+
+# Autocorrelation is computed at lags 1..MAX_LAG snapshots
+MAX_LAG = 20
+
+# Lags used to fit the exponential decay behind the half-life (longer lags are mostly noise)
+HALF_LIFE_LAGS = 5
+
+# Fewer overlapping observations than this gives NaN instead of a correlation
+MIN_PAIRS = 5
+
+
+def signal_matrices(history, signals):
+    """
+    Dense DATE x TICKER matrices of the given signals as (dates, tickers,
+    {signal: values}), NaN where a ticker is missing from a snapshot. Later
+    rows win when a ticker appears twice on one date.
+    """
+    date_codes, dates = pd.factorize(history['DATE'], sort=True)
+    ticker_codes, tickers = pd.factorize(history['TICKER'], sort=True)
+    matrices = {}
+    for signal in signals:
+        values = np.full((len(dates), len(tickers)), np.nan)
+        values[date_codes, ticker_codes] = history[signal].to_numpy(dtype=float)
+        matrices[signal] = values
+    return pd.DatetimeIndex(dates), pd.Index(tickers), matrices
+
+
+def masked_corr(x, y, axis=0, min_pairs=MIN_PAIRS):
+    """
+    Pearson correlation of x and y along `axis` over the entries where both
+    are present (NaN = missing), plus the number of pairs used.
+    """
+    mask = ~np.isnan(x) & ~np.isnan(y)
+    n = mask.sum(axis=axis)
+    safe_n = np.maximum(n, 1)
+    xc = np.where(mask, x - np.expand_dims(np.where(mask, x, 0.0).sum(axis=axis) / safe_n, axis), 0.0)
+    yc = np.where(mask, y - np.expand_dims(np.where(mask, y, 0.0).sum(axis=axis) / safe_n, axis), 0.0)
+    denom = np.sqrt((xc * xc).sum(axis=axis) * (yc * yc).sum(axis=axis))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = (xc * yc).sum(axis=axis) / denom
+    return np.where((n >= min_pairs) & (denom > 0), corr, np.nan), n
+
+
+def lagged_autocorrelation(values, max_lag=MAX_LAG, min_pairs=MIN_PAIRS):
+    """
+    Per-ticker autocorrelation of a DATE x TICKER matrix at lags 1..max_lag
+    (in snapshots), as a (lag, ticker) array. Each lag correlates the dates
+    where the ticker is present at both ends.
+
+    Built from masked sums (NaN filled with 0, a 0/1 presence matrix), so each
+    lag costs six column dot products instead of a masked copy of the matrix.
+    """
+    max_lag = max(min(max_lag, len(values) - 1), 0)
+    acf = np.full((max_lag, values.shape[1]), np.nan)
+    present = ~np.isnan(values)
+    if not present.any():
+        return acf
+    weights = present.astype(float)
+    # Centering on each ticker's overall mean first keeps the sums well conditioned
+    x = np.where(present, values - np.nanmean(np.where(present.any(axis=0), values, 0.0), axis=0), 0.0)
+    x2 = x * x
+    for lag in range(1, max_lag + 1):
+        w0, w1 = weights[:-lag], weights[lag:]
+        n = np.einsum('ij,ij->j', w0, w1)
+        sx, sy = np.einsum('ij,ij->j', x[:-lag], w1), np.einsum('ij,ij->j', x[lag:], w0)
+        safe_n = np.maximum(n, 1)
+        cov = np.einsum('ij,ij->j', x[:-lag], x[lag:]) - sx * sy / safe_n
+        var_x = np.einsum('ij,ij->j', x2[:-lag], w1) - sx * sx / safe_n
+        var_y = np.einsum('ij,ij->j', x2[lag:], w0) - sy * sy / safe_n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.sqrt(var_x * var_y)
+        acf[lag - 1] = np.where((n >= min_pairs) & (var_x > 0) & (var_y > 0), np.clip(corr, -1, 1), np.nan)
+    return acf
+
+
+def half_life(acf, max_lag=HALF_LIFE_LAGS):
+    """
+    Half-life in snapshots from an AR(1)-style fit acf[k] ~ phi**k over the
+    leading positive lags (least squares on log acf through the origin).
+    0 when lag-1 autocorrelation is not positive, inf when it does not decay.
+    """
+    acf = acf[:max_lag]
+    if len(acf) == 0:
+        return np.full(acf.shape[1], np.nan)
+    lags = np.arange(1, len(acf) + 1)[:, None]
+    # Only the run of positive lags from lag 1 is used: after the first zero crossing it is noise
+    usable = np.cumprod(np.nan_to_num(acf) > 0, axis=0).astype(bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_acf = np.log(np.where(usable, acf, 1.0))
+        log_phi = (lags * log_acf).sum(axis=0) / (lags ** 2 * usable).sum(axis=0)
+        result = np.where(log_phi < 0, -np.log(2) / log_phi, np.inf)
+    result = np.where(usable[0], result, 0.0)
+    return np.where(np.isnan(acf[0]), np.nan, result)
+
+
+def snapshot_ranks(values, groups=None):
+    """
+    Each ticker's rank within its snapshot (row), or within its group of the
+    snapshot when integer `groups` (one per ticker) are given; NaN stays NaN
+    """
+    if groups is not None and len(groups) and not np.isnan(values).all():
+        # Ranking (group, value) keys gives the in-group ranks shifted by a per-snapshot,
+        # per-group constant, which the correlations below ignore
+        values = values + groups * (np.nanmax(values) - np.nanmin(values) + 1)
+    return pd.DataFrame(values).rank(axis=1).to_numpy()
+
+
+def rank_stability(values, groups=None, min_pairs=MIN_PAIRS):
+    """
+    Correlation of each ticker's rank in one snapshot with its rank in the
+    next, over the tickers present in both, as a (date - 1,) array. With
+    integer `groups` (one per ticker) the ranks are taken and correlated
+    within each group instead, giving a (date - 1, group) array.
+
+    Ranks are within each whole snapshot (like the P_NN_PCTL columns), so
+    every snapshot is sorted once rather than once per neighbour.
+    """
+    ranks = snapshot_ranks(values, groups)
+    if groups is None:
+        return masked_corr(ranks[:-1], ranks[1:], axis=1, min_pairs=min_pairs)[0]
+    n_groups = groups.max() + 1 if len(groups) else 0
+    return np.column_stack([masked_corr(ranks[:-1, groups == g], ranks[1:, groups == g], axis=1,
+                                        min_pairs=min_pairs)[0] for g in range(n_groups)]) \
+        if n_groups else np.empty((max(len(values) - 1, 0), 0))
+
+
+def snapshot_spacing(dates):
+    """Median number of business days between consecutive snapshots (1 for daily pulls)"""
+    if len(dates) < 2:
+        return 1.0
+    days = np.busday_count(dates[:-1].values.astype('datetime64[D]'), dates[1:].values.astype('datetime64[D]'))
+    return float(max(np.median(days), 1))
+
+
+class SignalDecay:
+    """
+    Persistence of the signals over the stored snapshot history: per-ticker
+    lagged autocorrelation and half-life, and cross-sectional rank stability
+    between consecutive snapshots for the universe and within each SECTOR.
+
+    Everything is computed once on a dense DATE x TICKER matrix per signal
+    (NaN where a ticker is missing), so years of daily snapshots take seconds.
+    """
+
+    def __init__(self, history, signals=DECAY_SIGNALS, max_lag=MAX_LAG, group_col='SECTOR'):
+        self.signals = [signal for signal in signals if signal in history.columns]
+        self.group_col = group_col
+        self.dates, self.tickers, matrices = signal_matrices(history, self.signals)
+        latest = history.sort_values('DATE').drop_duplicates('TICKER', keep='last').set_index('TICKER')
+        self.groups = latest[group_col].astype(str).reindex(self.tickers).fillna('Unknown')
+        self.group_names = pd.Index(sorted(self.groups.unique()))
+        group_codes = self.group_names.get_indexer(self.groups)
+        self.spacing = snapshot_spacing(self.dates)
+
+        self.acf, self.half_lives, self.observations, self.stability = {}, {}, {}, {}
+        for signal, values in matrices.items():
+            self.acf[signal] = lagged_autocorrelation(values, max_lag)
+            self.half_lives[signal] = half_life(self.acf[signal])
+            self.observations[signal] = (~np.isnan(values)).sum(axis=0)
+            overall = rank_stability(values)
+            by_group = rank_stability(values, group_codes)
+            self.stability[signal] = pd.DataFrame(np.column_stack([overall, by_group]) if len(overall) else
+                                                  np.empty((0, len(self.group_names) + 1)),
+                                                  index=self.dates[1:], columns=['All', *self.group_names])
+        print(f"Signal decay: {len(self.tickers):,} names over {len(self.dates)} snapshots, "
+              f"{', '.join(self.signals)} up to lag {len(next(iter(self.acf.values()), []))}")
+
+    @classmethod
+    def from_store(cls, signals=DECAY_SIGNALS, max_lag=MAX_LAG, group_col='SECTOR', root=HISTORY_DIR):
+        """Builds the analytics from the columnar history store"""
+        history = read_history(root, columns=['DATE', 'TICKER', group_col, *signals])
+        return cls(history, signals, max_lag, group_col)
+
+    def ticker_table(self, signal, tickers=None):
+        """One row per ticker: autocorrelation at lags 1/5/20, half-life (snapshots and business days), observations"""
+        acf = self.acf[signal]
+        table = pd.DataFrame({
+            'TICKER': self.tickers,
+            self.group_col: self.groups.to_numpy(),
+            'OBSERVATIONS': self.observations[signal],
+            **{f"ACF_{lag}": acf[lag - 1] if len(acf) >= lag else np.nan for lag in (1, 5, 20)},
+            'HALF_LIFE': self.half_lives[signal],
+            'HALF_LIFE_DAYS': self.half_lives[signal] * self.spacing,
+        })
+        if tickers is not None:
+            table = table[table['TICKER'].isin(tickers)]
+        return table.reset_index(drop=True)
+
+    def acf_curve(self, signal, tickers=None):
+        """Median autocorrelation by lag across tickers (optionally a subset), as a Series"""
+        acf = self.acf[signal]
+        if tickers is not None:
+            acf = acf[:, self.tickers.isin(tickers)]
+        curve = pd.DataFrame(acf.T).median().to_numpy() if acf.size else np.full(len(acf), np.nan)
+        return pd.Series(curve, index=pd.RangeIndex(1, len(acf) + 1, name='LAG'), name=signal)
+
+    def ticker_summary(self, tickers=None):
+        """Lag-1 autocorrelation and half-life in business days of every signal, one row per ticker"""
+        table = pd.DataFrame({'TICKER': self.tickers, self.group_col: self.groups.to_numpy()})
+        for signal in self.signals:
+            acf = self.acf[signal]
+            table[f"{signal}_ACF_1"] = acf[0] if len(acf) else np.nan
+            table[f"{signal}_HALF_LIFE_DAYS"] = self.half_lives[signal] * self.spacing
+        if tickers is not None:
+            table = table[table['TICKER'].isin(tickers)]
+        return table.reset_index(drop=True)
+
+    def group_table(self):
+        """Per group and signal: names, median lag-1/5 autocorrelation, median half-life and mean rank stability"""
+        rows = []
+        for signal in self.signals:
+            table = self.ticker_table(signal)
+            stats = table.groupby(self.group_col).agg(
+                NAMES=('TICKER', 'count'), ACF_1=('ACF_1', 'median'), ACF_5=('ACF_5', 'median'),
+                HALF_LIFE=('HALF_LIFE', 'median'), HALF_LIFE_DAYS=('HALF_LIFE_DAYS', 'median'))
+            stats['RANK_STABILITY'] = self.stability[signal].mean().reindex(stats.index)
+            rows.append(stats.reset_index().assign(SIGNAL=signal))
+        return pd.concat(rows, ignore_index=True) if rows else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Signal persistence over the snapshot history")
+    parser.add_argument("--root", default=HISTORY_DIR, help="History store directory")
+    parser.add_argument("--signals", nargs="+", default=DECAY_SIGNALS, help="Signal columns to analyse")
+    parser.add_argument("--max-lag", type=int, default=MAX_LAG, help="Longest lag in snapshots")
+    args = parser.parse_args()
+    decay = SignalDecay.from_store(args.signals, args.max_lag, root=args.root)
+    summary = decay.group_table()
+    print(summary.round(3).to_string(index=False))
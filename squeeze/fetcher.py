@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from io import BytesIO
+from urllib.parse import urlsplit
+
+import aiohttp
+import pandas as pd
+
+from .audit import content_hash, write_record
+from .config import add_config_arguments, configure, settings
+from .history import HISTORY_DIR, load_manifest, save_manifest, write_snapshot
+from .loader import redact_url
+from .schema import CATEGORY_COLS, normalize_snapshot, parse_snapshot_csv
+
+# SqueezeMetrics feeds: name -> (URL path template, kind). 'snapshot' feeds are
+# per-ticker CSVs stored one parquet per date in the history store; 'series'
+# feeds are date-indexed time series (DIX/GEX) stored as one parquet each.
+FEEDS = {
+    'latest': ('/monitor/api/latest?format=csv&key={key}', 'snapshot'),
+    'snapshot': ('/monitor/api/{date}?format=csv&key={key}', 'snapshot'),
+    'dix': ('/monitor/static/DIX.csv', 'series'),
+}
+SERIES_DIR = "series"
+
+# Concurrency and politeness towards the API
+LIMIT_PER_HOST = 4
+REQUESTS_PER_SECOND = 4.0
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+CHUNK_BYTES = 64 * 1024
+
+# Parsing runs in threads so downloads keep streaming meanwhile
+PARSE_WORKERS = 4
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` request starts per second, bursts of up to `burst`"""
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying: the server's Retry-After when numeric, else exponential backoff"""
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        return 0.5 * 2 ** attempt
+
+
+def feed_jobs(feeds, dates=None, base_url=None, key=None):
+    """
+    One job per (feed, date): dated templates are expanded for every date,
+    undated feeds are fetched once. Job names double as store file names.
+    Base URL and key default to the settings.
+    """
+    base_url = base_url or settings().api_base
+    key = key or settings().api_key
+    jobs = []
+    for feed in feeds:
+        template, kind = FEEDS[feed]
+        if '{date}' in template:
+            for day in ([] if dates is None else dates):
+                day = pd.Timestamp(day)
+                jobs.append({'name': f"{feed}_{day:%Y%m%d}", 'feed': feed, 'kind': kind, 'date': day,
+                             'url': base_url + template.format(date=f"{day:%Y-%m-%d}", key=key)})
+        else:
+            day = pd.Timestamp(date.today())
+            jobs.append({'name': f"{feed}_{day:%Y%m%d}" if kind == 'snapshot' else feed, 'feed': feed,
+                         'kind': kind, 'date': day, 'url': base_url + template.format(key=key)})
+    return jobs
+
+
+def store_snapshot(body, job, root=HISTORY_DIR):
+    """Parses one snapshot payload against the schema and writes it to the history store"""
+    df, problems = parse_snapshot_csv(body, engine='pyarrow')
+    # The store keeps text columns as plain strings
+    df = normalize_snapshot(df.astype({col: str for col in CATEGORY_COLS if col in df.columns}))
+    if df['DATE'].isna().all():
+        df['DATE'] = job['date']
+    df['SOURCE_FILE'] = job['name']
+    write_snapshot(df, job['name'], root)
+    return len(df), problems
+
+
+def store_series(body, job, root=HISTORY_DIR):
+    """Writes one time-series feed to history/series/<feed>.parquet, replacing the previous pull"""
+    df = pd.read_csv(BytesIO(body), engine='pyarrow')
+    df.columns = [col.upper() for col in df.columns]
+    if 'DATE' in df.columns:
+        df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
+    directory = os.path.join(root, SERIES_DIR)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{job['feed']}.parquet")
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return len(df), []
+
+
+STORERS = {'snapshot': store_snapshot, 'series': store_series}
+
+
+class AsyncFetcher:
+    """
+    Pulls many feed/date URLs concurrently on one event loop.
+
+    Connections are capped per host, request starts go through a per-host
+    token bucket, and 429/5xx responses are retried with backoff (honouring
+    Retry-After). Each body is streamed in chunks and handed to a parser
+    thread as soon as it completes, so parsing and writing to the store
+    overlap with the downloads still in flight. Results go into the history
+    manifest after every job, so an interrupted backfill resumes where it
+    stopped.
+    """
+
+    def __init__(self, root=HISTORY_DIR, limit_per_host=LIMIT_PER_HOST, rate=REQUESTS_PER_SECOND,
+                 timeout=None, retries=MAX_RETRIES, parse_workers=PARSE_WORKERS):
+        self.root = root
+        self.limit_per_host = limit_per_host
+        self.rate = rate
+        self.timeout = timeout or settings().timeout
+        self.retries = retries
+        self.parse_workers = parse_workers
+        self._limiters = {}
+
+    def limiter(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            self._limiters[host] = RateLimiter(self.rate, burst=self.limit_per_host)
+        return self._limiters[host]
+
+    async def download(self, session, url):
+        """Streams one body; returns (status, bytes) after retrying transient failures"""
+        for attempt in range(self.retries + 1):
+            await self.limiter(url).acquire()
+            try:
+                async with session.get(url) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        await asyncio.sleep(retry_delay(response, attempt))
+                        continue
+                    if response.status != 200:
+                        return response.status, b""
+                    body = bytearray()
+                    async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+                        body.extend(chunk)
+                    return response.status, bytes(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def fetch_job(self, session, pool, job):
+        start = time.perf_counter()
+        result = {'file': job['name'], 'feed': job['feed'], 'date': f"{job['date']:%Y-%m-%d}"}
+        try:
+            status, body = await self.download(session, job['url'])
+            result.update({'http_status': status, 'bytes': len(body)})
+            if status != 200:
+                # No data for that date (weekend, holiday) is not an error
+                result['status'] = 'missing' if status == 404 else 'error'
+                result['error'] = f"HTTP {status}"
+            else:
+                result['sha256'] = content_hash(body)
+                loop = asyncio.get_running_loop()
+                rows, problems = await loop.run_in_executor(pool, STORERS[job['kind']], body, job, self.root)
+                result.update({'status': 'ok', 'rows': rows, 'warnings': problems})
+        except Exception as e:
+            result.update({'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        return result
+
+    async def run(self, jobs):
+        manifest = load_manifest(self.root)
+        connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host)
+        # Per-socket timeouts: time spent queued for a connection slot is not a failure
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        results = []
+        job_urls = {job['name']: job['url'] for job in jobs}
+        with ThreadPoolExecutor(max_workers=self.parse_workers) as pool:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                tasks = [asyncio.create_task(self.fetch_job(session, pool, job)) for job in jobs]
+                for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+                    result = await task
+                    results.append(result)
+                    write_record({'source': 'fetcher', 'url': redact_url(job_urls[result['file']]),
+                                  'status': result.get('http_status'), 'seconds': result['seconds'],
+                                  **{key: result[key] for key in ('bytes', 'sha256', 'rows', 'error') if key in result}})
+                    if result['status'] != 'error':
+                        manifest[result['file']] = result
+                        save_manifest(manifest, self.root)
+                    note = f"{result.get('rows', 0)} rows, {result.get('bytes', 0) / 1024:.0f} kB" \
+                        if result['status'] == 'ok' else result.get('error', '')
+                    print(f"[{done}/{len(jobs)}] {result['file']}: {result['status']} - {note} in {result['seconds']}s")
+        return results
+
+
+def pending_jobs(jobs, root=HISTORY_DIR, force=False):
+    """Dated jobs already stored (or known to have no data) are skipped; undated feeds always refresh"""
+    if force:
+        return jobs
+    manifest = load_manifest(root)
+    return [job for job in jobs
+            if job['feed'] == 'latest' or FEEDS[job['feed']][1] == 'series'
+            or manifest.get(job['name'], {}).get('status') not in ('ok', 'missing')]
+
+
+def fetch_feeds(feeds, dates=None, root=HISTORY_DIR, force=False, **kwargs):
+    """Fetches the given feeds (and dates for dated feeds) into the store; returns one summary per job"""
+    jobs = pending_jobs(feed_jobs(feeds, dates), root, force)
+    print(f"Fetching {len(jobs)} feed pulls into {root}/")
+    if not jobs:
+        return []
+    start = time.perf_counter()
+    results = asyncio.run(AsyncFetcher(root, **kwargs).run(jobs))
+    counts = pd.Series([result['status'] for result in results]).value_counts().to_dict()
+    print(f"Fetched {len(results)} pulls in {time.perf_counter() - start:.1f}s: {counts}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent SqueezeMetrics fetch into the history store")
+    parser.add_argument("--feeds", nargs="+", default=['latest'], choices=sorted(FEEDS), help="Feeds to pull")
+    parser.add_argument("--start", help="First date for dated feeds (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="Last date for dated feeds (default: today)")
+    parser.add_argument("--root", default=HISTORY_DIR, help="History store directory")
+    parser.add_argument("--limit-per-host", type=int, default=LIMIT_PER_HOST, help="Open connections per host")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="Request starts per second per host")
+    parser.add_argument("--force", action="store_true", help="Re-fetch dates already in the manifest")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    configure(args)
+    dates = pd.bdate_range(args.start, args.end or date.today()) if args.start else None
+    fetch_feeds(args.feeds, dates, args.root, args.force, limit_per_host=args.limit_per_host, rate=args.rate)
@@ -0,0 +1,31 @@
+from .ranks import apply_rank_filter
+
+
+def apply_etf_filter(df, etf_filter):
+    """'include' keeps everything, 'exclude' drops ETFs, 'only' keeps just ETFs"""
+    if etf_filter == "exclude":
+        return df[df['INDUSTRY'] != 'ETF']
+    if etf_filter == "only":
+        return df[df['INDUSTRY'] == 'ETF']
+    return df
+
+
+def filter_snapshot(df, sector="All", industry="All", records=None, min_pnn=None, etf_filter="include", rank_filter=None):
+    """
+    The dashboards' global filter controls applied in one place:
+    ETF mode, sector, industry, minimum P_NN, percentile filter, then the
+    records cap.
+    """
+    filtered_df = apply_etf_filter(df, etf_filter)
+
+    if sector and sector != "All":
+        filtered_df = filtered_df[filtered_df['SECTOR'] == sector]
+    if industry and industry != "All":
+        filtered_df = filtered_df[filtered_df['INDUSTRY'] == industry]
+    if min_pnn:
+        filtered_df = filtered_df[filtered_df['P_NN'] >= min_pnn]
+    filtered_df = apply_rank_filter(filtered_df, rank_filter)
+
+    if records:
+        filtered_df = filtered_df.head(records)
+    return filtered_df
@@ -0,0 +1,117 @@
+import glob
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+# Columnar snapshot history: one parquet file per source snapshot plus a manifest
+HISTORY_DIR = "history"
+SNAPSHOT_DIR = "snapshots"
+MANIFEST_FILE = "manifest.json"
+
+# Content hash of each saved raw API payload -> the file it was saved as
+RAW_INDEX_FILE = "raw_index.json"
+
+
+def snapshot_dir(root=HISTORY_DIR):
+    return os.path.join(root, SNAPSHOT_DIR)
+
+
+def snapshot_path(name, root=HISTORY_DIR):
+    return os.path.join(snapshot_dir(root), f"{name}.parquet")
+
+
+def fetch_time_from_filename(path):
+    """Fetch time encoded by fetch_squeeze_data.py in squeeze_data_YYYYMMDD_HHMMSS.xlsx"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    try:
+        return datetime.strptime(stem[len("squeeze_data_"):], "%Y%m%d_%H%M%S")
+    except ValueError:
+        return None
+
+
+def snapshot_files(root=HISTORY_DIR):
+    """Stored snapshot files, skipping temp files and anything else in the directory"""
+    return sorted(glob.glob(os.path.join(snapshot_dir(root), "*.parquet")))
+
+
+def write_snapshot(df, name, root=HISTORY_DIR):
+    """
+    Writes one normalized snapshot atomically (temp file, then rename). The
+    temp file is dot-prefixed, so readers never pick up a half-written one.
+    """
+    os.makedirs(snapshot_dir(root), exist_ok=True)
+    path = snapshot_path(name, root)
+    tmp_path = os.path.join(snapshot_dir(root), f".{name}.parquet.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_history(root=HISTORY_DIR, columns=None, start=None, end=None, tickers=None):
+    """
+    Reads the stored history as one long frame. Only the requested columns
+    are read from disk, and DATE/TICKER filters are pushed down to parquet.
+    """
+    paths = snapshot_files(root)
+    if not paths:
+        return pd.DataFrame(columns=columns or ['DATE', 'TICKER'])
+
+    filters = []
+    if start is not None:
+        filters.append(('DATE', '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append(('DATE', '<=', pd.Timestamp(end)))
+    if tickers is not None:
+        filters.append(('TICKER', 'in', list(tickers)))
+
+    history = pd.read_parquet(paths, columns=columns, filters=filters or None)
+    return history.reset_index(drop=True)
+
+
+def has_history(root=HISTORY_DIR):
+    return os.path.exists(os.path.join(root, MANIFEST_FILE))
+
+
+def load_manifest(root=HISTORY_DIR):
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, root=HISTORY_DIR):
+    """Atomic rewrite so an interrupted backfill never leaves a broken manifest"""
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_raw_index(root=HISTORY_DIR):
+    path = os.path.join(root, RAW_INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def saved_copy(sha256, root=HISTORY_DIR):
+    """File an identical raw payload was already saved as, if it still exists"""
+    path = load_raw_index(root).get(sha256)
+    return path if path and os.path.exists(path) else None
+
+
+def record_raw_payload(sha256, path, root=HISTORY_DIR):
+    """Adds one saved raw payload to the index (atomic rewrite, like the manifest)"""
+    index = load_raw_index(root)
+    index[sha256] = path
+    os.makedirs(root, exist_ok=True)
+    index_path = os.path.join(root, RAW_INDEX_FILE)
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(index_path + ".tmp", index_path)
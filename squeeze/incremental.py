@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+from .buckets import BUCKET_LABELS, BUCKET_QUANTILES, bucket_categorical, bucket_codes
+from .ranks import RANK_COLS, RANK_LEVELS, rank_column
+from .schema import ROW_HASH_COLS, TEXT_COLS, row_hash
+
+
+def sorted_quantiles(sorted_values, quantiles):
+    """
+    np.quantile (linear interpolation) on an already sorted array, skipping
+    the NaNs np.sort leaves at the end like Series.quantile does
+    """
+    sorted_values = sorted_values[:np.searchsorted(sorted_values, np.nan)]
+    n = len(sorted_values)
+    if n == 0:
+        return np.full(len(quantiles), np.nan)
+    pos = np.asarray(quantiles) * (n - 1)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, n - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def diff_hashes(new, old):
+    """(added, removed, changed) tickers between two ticker-indexed hash Series"""
+    added = new.index.difference(old.index)
+    removed = old.index.difference(new.index)
+    common = new.index.intersection(old.index)
+    changed = common[(new[common].to_numpy() != old[common].to_numpy())]
+    return added, removed, changed
+
+
+def changed_tickers(current, previous):
+    """
+    (added, removed, changed) tickers between two snapshots that carry
+    ROW_HASH (loaded frames, stored history), without comparing any values
+    """
+    def hashes(df):
+        df = df.drop_duplicates(subset=['TICKER'], keep='last')
+        return pd.Series(df['ROW_HASH'].to_numpy(), index=df['TICKER'])
+    return diff_hashes(hashes(current), hashes(previous))
+
+
+def unique_tickers(df):
+    """Cleaned snapshot indexed by TICKER, last row kept for a repeated ticker"""
+    return df[~df['TICKER'].duplicated(keep='last').to_numpy()].set_index('TICKER')
+
+
+def rows_differ(new, old, positions, cols=ROW_HASH_COLS):
+    """
+    Mask over `new` of rows whose ROW_HASH columns differ from the `old` rows
+    at `positions` (both TICKER-indexed). Compared value by value, which is
+    what ROW_HASH equality means, so a pull is diffed without hashing every row.
+    """
+    differ = np.zeros(len(new), dtype=bool)
+    for col in cols:
+        if col == 'TICKER' or col not in new.columns:
+            continue
+        if col not in old.columns:
+            return np.ones(len(new), dtype=bool)
+        if col in TEXT_COLS:
+            a, b = new[col].to_numpy(dtype=object), old[col].to_numpy(dtype=object)[positions]
+            differ |= a != b
+        else:
+            a, b = new[col].to_numpy(dtype=float), old[col].to_numpy(dtype=float)[positions]
+            differ |= (a != b) & ~(np.isnan(a) & np.isnan(b))
+    return differ
+
+
+class IncrementalDeriver:
+    """
+    Keeps the derived columns of the last cleaned snapshot and updates them
+    from the next pull by touching only the tickers whose values changed.
+
+    Derived state, as arrays aligned with the last pull's tickers:
+      - ROW_HASH, hashed only for added and changed rows
+      - MARKET_CAP_BUCKET from global dollar-volume quantiles, kept as a sorted
+        array so cut points are re-read in O(1) and rows are only re-bucketed
+        when a cut point actually moves
+      - percentile rank columns: the global level over the whole universe,
+        sector and industry levels re-ranked only inside the touched groups
+
+    snapshot() is the latest pull with these columns plus DOLLAR_VOLUME,
+    laid out like loader.add_derived_columns.
+    """
+
+    def __init__(self, quantiles=BUCKET_QUANTILES, labels=BUCKET_LABELS):
+        self.quantiles = quantiles
+        self.labels = labels
+        self.current = None
+        self.hashes = None
+        self.codes = None
+        self.ranks = {}
+        self.sorted_dollar_volume = np.array([])
+        self.cuts = None
+
+    def load(self, df):
+        """Full derivation for the first (cleaned) snapshot"""
+        current = unique_tickers(df)
+        dollar_volume = (current['CLOSE'] * current['VOLUME']).to_numpy(dtype=float)
+        self.sorted_dollar_volume = np.sort(dollar_volume)
+        self.cuts = sorted_quantiles(self.sorted_dollar_volume, self.quantiles)
+        self.current = current
+        self.hashes = row_hash(current.reset_index())
+        self.codes = bucket_codes(dollar_volume, self.cuts)
+        self.ranks = {}
+        for level in RANK_LEVELS:
+            self.ranks.update(self._rank(np.arange(len(current)), level))
+        return self.snapshot()
+
+    def update(self, df):
+        """
+        Applies the next (cleaned) pull; returns a summary of what was
+        recomputed. Falls back to a full load when there is no previous snapshot.
+        """
+        if self.current is None:
+            self.load(df)
+            return {'added': len(self.current), 'removed': 0, 'changed': 0, 'cuts_moved': True, 'groups': {}}
+
+        old, new = self.current, unique_tickers(df)
+        positions = old.index.get_indexer(new.index)
+        known = positions >= 0
+        changed = np.zeros(len(new), dtype=bool)
+        changed[known] = rows_differ(new[known], old, positions[known])
+        dirty = np.flatnonzero(changed | ~known)
+        kept = np.zeros(len(old), dtype=bool)
+        kept[positions[known]] = True
+        outgoing = np.concatenate([positions[changed], np.flatnonzero(~kept)])
+
+        # Columns outside the hash (DATE) and the row order come from the new pull
+        self.current = new
+        self.hashes = self._carry(self.hashes, positions, known)
+        self.codes = self._carry(self.codes, positions, known)
+        self.ranks = {name: self._carry(values, positions, known) for name, values in self.ranks.items()}
+        summary = {'added': int((~known).sum()), 'removed': int((~kept).sum()), 'changed': int(changed.sum()),
+                   'cuts_moved': False, 'groups': {}}
+        if len(dirty) == 0 and len(outgoing) == 0:
+            return summary
+        self.hashes[dirty] = row_hash(new.iloc[dirty].reset_index())
+
+        # Sorted dollar volume: delete outgoing values, insert incoming ones
+        # (a plain re-sort is cheaper once most of the book has changed)
+        dollar_volume = (new['CLOSE'] * new['VOLUME']).to_numpy(dtype=float)
+        if len(outgoing) > len(self.sorted_dollar_volume) // 4:
+            sorted_dv = np.sort(dollar_volume)
+        else:
+            old_dv = np.sort((old['CLOSE'] * old['VOLUME']).to_numpy(dtype=float)[outgoing])
+            # Equal values delete consecutive slots
+            repeat = np.arange(len(old_dv)) - np.searchsorted(old_dv, old_dv)
+            sorted_dv = np.delete(self.sorted_dollar_volume,
+                                  np.searchsorted(self.sorted_dollar_volume, old_dv) + repeat)
+            incoming = np.sort(dollar_volume[dirty])
+            sorted_dv = np.insert(sorted_dv, np.searchsorted(sorted_dv, incoming), incoming)
+        self.sorted_dollar_volume = sorted_dv
+
+        new_cuts = sorted_quantiles(sorted_dv, self.quantiles)
+        summary['cuts_moved'] = not np.array_equal(new_cuts, self.cuts)
+        self.cuts = new_cuts
+        if summary['cuts_moved']:
+            self.codes = bucket_codes(dollar_volume, self.cuts)
+        else:
+            self.codes[dirty] = bucket_codes(dollar_volume[dirty], self.cuts)
+
+        self.ranks.update(self._rank(np.arange(len(new)), 'PCTL'))
+        for level, group_col in RANK_LEVELS.items():
+            if group_col is not None:
+                touched = set(old[group_col].to_numpy()[outgoing]) | set(new[group_col].to_numpy()[dirty])
+                rows = np.flatnonzero(new[group_col].isin(touched).to_numpy())
+                for name, values in self._rank(rows, level).items():
+                    self.ranks[name][rows] = values
+                summary['groups'][group_col] = touched
+        return summary
+
+    def derive(self, df):
+        """The cleaned pull with its derived columns, re-deriving only what changed since the last one"""
+        summary = self.update(df)
+        if summary['added'] != len(self.current):
+            print(f"Incremental derive: {summary['changed']} changed, {summary['added']} added, "
+                  f"{summary['removed']} removed tickers; bucket cuts {'moved' if summary['cuts_moved'] else 'unchanged'}")
+        return self.snapshot()
+
+    def snapshot(self):
+        """Latest pull with the derived columns (rank columns, DOLLAR_VOLUME, MARKET_CAP_BUCKET, ROW_HASH)"""
+        current = self.current
+        derived = {name: values for name, values in self.ranks.items()}
+        derived['DOLLAR_VOLUME'] = (current['CLOSE'] * current['VOLUME']).to_numpy()
+        derived['MARKET_CAP_BUCKET'] = bucket_categorical(self.codes, self.labels)
+        derived['ROW_HASH'] = self.hashes
+        return pd.concat([current.reset_index(), pd.DataFrame(derived)], axis=1)
+
+    @staticmethod
+    def _carry(values, positions, known):
+        """Values of the previous pull re-ordered to the new pull's tickers (new tickers filled later)"""
+        carried = np.zeros(len(positions), dtype=values.dtype)
+        carried[known] = values[positions[known]]
+        return carried
+
+    def _rank(self, rows, level):
+        """Percentile ranks at one level for the given row positions (whole groups): {column name: values}"""
+        cols = [col for col in RANK_COLS if col in self.current.columns]
+        group_col = RANK_LEVELS[level]
+        subset = self.current.iloc[rows] if len(rows) < len(self.current) else self.current
+        if group_col is None:
+            pct = subset[cols].rank(pct=True)
+        else:
+            pct = subset.groupby(group_col, sort=False, observed=True)[cols].rank(pct=True)
+        return {rank_column(col, level): pct[col].to_numpy() for col in cols}
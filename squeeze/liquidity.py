@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Largest position as a share of average daily dollar volume
+MAX_ADV_PCT = 0.10
+
+# Assumed daily participation when exiting, as a share of average daily dollar volume
+LIQUIDATION_ADV_PCT = 0.05
+
+# Book notionals for the capacity table
+CAPACITY_NOTIONALS = [10_000_000, 25_000_000, 50_000_000, 100_000_000, 250_000_000, 500_000_000, 1_000_000_000]
+
+
+# ADM21 is only trusted as an average share volume when its median ratio to VOLUME is in this range
+ADM21_VOLUME_RATIO = (0.05, 20)
+
+
+def adm21_is_share_volume(df):
+    """True when ADM21 is on the scale of daily share volume rather than a ratio or a price move"""
+    if 'ADM21' not in df.columns or len(df) == 0:
+        return False
+    ratio = (pd.to_numeric(df['ADM21'], errors='coerce') / df['VOLUME'].where(df['VOLUME'] > 0)).median()
+    return bool(ADM21_VOLUME_RATIO[0] <= ratio <= ADM21_VOLUME_RATIO[1])
+
+
+def add_liquidity_columns(df):
+    """
+    DOLLAR_VOLUME (today's CLOSE x VOLUME) and ADV_DOLLARS, the 21-day average
+    (CLOSE x ADM21), falling back to today's dollar volume where ADM21 is
+    missing or the snapshot's ADM21 is not a share volume
+    """
+    df = df.copy()
+    df['DOLLAR_VOLUME'] = df['CLOSE'] * df['VOLUME']
+    adm21 = pd.to_numeric(df['ADM21'], errors='coerce') if adm21_is_share_volume(df) else np.nan
+    adv = df['CLOSE'] * adm21
+    df['ADV_DOLLARS'] = adv.where(adv > 0, df['DOLLAR_VOLUME'])
+    return df
+
+
+def cap_positions(book, max_adv_pct=MAX_ADV_PCT, liquidation_adv_pct=LIQUIDATION_ADV_PCT):
+    """
+    Caps POSITION_SIZE at max_adv_pct of ADV_DOLLARS and adds DAYS_TO_LIQUIDATE
+    for the capped size at the liquidation_adv_pct exit rate. TARGET_SIZE keeps
+    the uncapped size and LIQUIDITY_CAPPED marks the names that were cut.
+    """
+    if len(book) == 0:
+        return book
+    if 'ADV_DOLLARS' not in book.columns:
+        book = add_liquidity_columns(book)
+    capacity = book['ADV_DOLLARS'] * max_adv_pct
+    book['TARGET_SIZE'] = book['POSITION_SIZE']
+    book['LIQUIDITY_CAPPED'] = book['POSITION_SIZE'] > capacity
+    book['POSITION_SIZE'] = np.minimum(book['POSITION_SIZE'], capacity)
+    exit_rate = book['ADV_DOLLARS'] * liquidation_adv_pct
+    book['DAYS_TO_LIQUIDATE'] = book['POSITION_SIZE'] / exit_rate.where(exit_rate > 0)
+    return book
+
+
+def days_to_liquidate(book, liquidation_adv_pct=LIQUIDATION_ADV_PCT):
+    """Trading days to exit the whole book at liquidation_adv_pct participation (the slowest name)"""
+    if len(book) == 0:
+        return 0.0
+    exit_rate = book['ADV_DOLLARS'] * liquidation_adv_pct
+    return float((book['POSITION_SIZE'] / exit_rate.where(exit_rate > 0)).max())
+
+
+def capacity_table(book, portfolio_value, universe=None, notionals=CAPACITY_NOTIONALS, max_adv_pct=MAX_ADV_PCT,
+                   liquidation_adv_pct=LIQUIDATION_ADV_PCT):
+    """
+    Scales the book's target (uncapped) weights to each notional and reports
+    how much of it fits under the ADV cap: deployable dollars, names capped,
+    the slowest exit of the target sizes at the liquidation rate, and (given
+    the universe) how many names could hold an average-sized position.
+    """
+    notionals = np.asarray(notionals, dtype=float)
+    sizes = book['TARGET_SIZE'] if 'TARGET_SIZE' in book.columns else book['POSITION_SIZE']
+    weights = sizes.to_numpy(dtype=float) / portfolio_value
+    capacity = book['ADV_DOLLARS'].to_numpy(dtype=float) * max_adv_pct
+
+    sizes = np.outer(weights, notionals)  # names x notionals
+    capped = np.minimum(sizes, capacity[:, None])
+    exit_rate = book['ADV_DOLLARS'].to_numpy(dtype=float)[:, None] * liquidation_adv_pct
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = np.where(exit_rate > 0, sizes / exit_rate, np.inf)
+
+    table = pd.DataFrame({
+        'NOTIONAL': notionals,
+        'DEPLOYABLE': capped.sum(axis=0),
+        'DEPLOYABLE_PCT': capped.sum(axis=0) / (weights.sum() * notionals),
+        'N_CAPPED': (sizes > capacity[:, None]).sum(axis=0),
+        'MAX_DAYS_TO_LIQUIDATE': days.max(axis=0) if len(book) else 0.0,
+    })
+    if universe is not None:
+        universe_capacity = np.sort(universe['ADV_DOLLARS'].to_numpy(dtype=float) * max_adv_pct)
+        avg_size = weights.mean() * notionals if len(book) else notionals * 0
+        table['UNIVERSE_NAMES_OK'] = len(universe_capacity) - np.searchsorted(universe_capacity, avg_size, side='left')
+    table['STATUS'] = np.where(table['N_CAPPED'] == 0, 'OK', 'Capacity limit')
+    return table
@@ -0,0 +1,147 @@
+import glob
+import os
+import re
+import time
+import pandas as pd
+import requests
+
+from .audit import content_hash, write_record
+from .buckets import add_market_cap_buckets
+from .config import settings
+from .history import read_history
+from .incremental import IncrementalDeriver
+from .ranks import add_rank_columns
+from .schema import clean_snapshot, parse_snapshot_csv, row_hash
+
+# Latest snapshot endpoint; base URL and key come from the settings (squeeze/config.py)
+LATEST_PATH = "/monitor/api/latest?format=csv&key={key}"
+
+# Arrow's multithreaded CSV reader; 'c' is the pandas parser
+CSV_ENGINE = 'pyarrow'
+
+# Columns the dashboards need even when the API is down
+EMPTY_COLUMNS = ['TICKER', 'NAME', 'SECTOR', 'INDUSTRY', 'P_NN', 'CLOSE', 'VOLUME']
+
+# Last parsed API payload and its frame: a byte-identical pull is not parsed again
+_last_parse = {'sha256': None, 'df': None}
+
+# Derived columns of the last API pull; the next pull only re-derives the tickers that changed
+_deriver = IncrementalDeriver()
+
+
+def api_url(path=LATEST_PATH):
+    """Full API URL from the configured base and key"""
+    config = settings()
+    if not config.api_key:
+        raise RuntimeError("No SqueezeMetrics API key configured: set SQUEEZE_API_KEY, "
+                           "api_key in squeeze_config.json or --api-key")
+    return config.api_base + path.format(key=config.api_key)
+
+
+def redact_url(url):
+    """URL as written to logs, without the API key"""
+    return re.sub(r"key=[^&]+", "key=***", url)
+
+
+def fetch_payload(url=None, timeout=None, source='loader'):
+    """
+    GETs one API payload. Returns (body, audit record) with timing, byte
+    count, HTTP status and content hash; failed pulls are logged to the
+    audit log before the error is raised.
+    """
+    url = url or api_url()
+    start = time.perf_counter()
+    record = {'source': source, 'url': redact_url(url)}
+    try:
+        response = requests.get(url, timeout=timeout or settings().timeout)
+        record.update(status=response.status_code, seconds=round(time.perf_counter() - start, 3),
+                      bytes=len(response.content))
+        response.raise_for_status()
+    except requests.RequestException as e:
+        record.setdefault('seconds', round(time.perf_counter() - start, 3))
+        write_record({**record, 'error': f"{type(e).__name__}: {e}"})
+        raise
+    record['sha256'] = content_hash(response.content)
+    return response.content, record
+
+
+def add_derived_columns(df):
+    """Per-snapshot derived columns every front-end reads"""
+    # Percentile ranks and size buckets are computed once per snapshot, not per callback
+    df = add_market_cap_buckets(add_rank_columns(df))
+    # Lets incremental jobs tell which tickers changed since another snapshot
+    df['ROW_HASH'] = row_hash(df)
+    return df
+
+
+def prepare_snapshot(df):
+    """Cleaning plus the per-snapshot derived columns"""
+    return add_derived_columns(clean_snapshot(df))
+
+
+def load_from_api(url=None, timeout=None, engine=CSV_ENGINE):
+    """
+    Fetches the latest snapshot from the SqueezeMetrics API and parses it
+    against the snapshot schema, printing any validation problems. A body
+    identical to the last one parsed reuses that frame. Every pull goes to
+    the fetch audit log.
+    """
+    body, record = fetch_payload(url, timeout)
+    if record['sha256'] == _last_parse['sha256']:
+        df = _last_parse['df']
+        record['parsed'] = False
+    else:
+        start = time.perf_counter()
+        try:
+            df, problems = parse_snapshot_csv(body, engine=engine)
+        except Exception as e:
+            write_record({**record, 'parsed': False, 'error': f"{type(e).__name__}: {e}"})
+            raise
+        for problem in problems:
+            print(f"API payload: {problem}")
+        # Already typed and cleaned by the parse
+        df = _deriver.derive(df) if len(df) else add_derived_columns(df)
+        _last_parse.update(sha256=record['sha256'], df=df)
+        record.update(parsed=True, parse_seconds=round(time.perf_counter() - start, 3), problems=len(problems))
+    write_record({**record, 'rows': len(df)})
+    return df.copy()
+
+
+def load_latest_xlsx(pattern="squeeze_data_*.xlsx"):
+    """
+    Loads the most recent snapshot saved by fetch_squeeze_data.py
+    """
+    excel_files = glob.glob(pattern)
+    latest_file = max(excel_files, key=os.path.getctime)
+    return prepare_snapshot(pd.read_excel(latest_file))
+
+
+def load_from_store(date=None):
+    """
+    Loads one snapshot date (default: the latest) from the columnar history store
+    """
+    history = read_history(start=date, end=date)
+    if len(history) == 0:
+        return prepare_snapshot(pd.DataFrame(columns=EMPTY_COLUMNS))
+    latest = history[history['DATE'] == history['DATE'].max()]
+    latest = latest.drop_duplicates(subset=['TICKER'], keep='last')
+    return prepare_snapshot(latest.drop(columns=['SOURCE_FILE'], errors='ignore'))
+
+
+SOURCES = {'api': load_from_api, 'xlsx': load_latest_xlsx, 'store': load_from_store}
+
+
+def load_snapshot(source='api', **kwargs):
+    """
+    Source-agnostic loader: 'api', 'xlsx' or 'store'. Every source returns the
+    same cleaned frame with rank columns, so front-ends don't care where the
+    snapshot came from.
+    """
+    df = SOURCES[source](**kwargs)
+    print(f"Loaded {len(df)} clean records from {source}")
+    return df
+
+
+def empty_snapshot():
+    """Empty frame with the columns the dashboards index into"""
+    return pd.DataFrame(columns=EMPTY_COLUMNS)
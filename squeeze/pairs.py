@@ -0,0 +1,181 @@
+import heapq
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from .buckets import ensure_market_cap_buckets
+from .risk import TRADING_DAYS
+
+# Pair selection thresholds
+LONG_MIN_P_NN = 0.02
+SHORT_MAX_P_NN = -0.02
+MIN_SPREAD = 0.05
+MIN_PAIR_VOLUME = 100_000
+
+# Pairs are formed within one INDUSTRY, or within one SECTOR (cross-industry)
+PAIR_SCOPES = ['INDUSTRY', 'SECTOR']
+EXCLUDED_GROUPS = ['Unknown', 'ETF']
+
+# Pairs kept in the ranked index
+TOP_K = 500
+
+# Common daily returns needed before a hedge ratio and spread vol are estimated
+MIN_OBS = 20
+
+
+def pair_moments(long_returns, short_returns, min_obs=MIN_OBS):
+    """
+    Hedge ratio (beta of the long leg on the short leg) and annualized vol of
+    the hedged spread for every long x short combination, from DATE x name
+    return matrices with NaN gaps. Returns two (n_long, n_short) arrays, NaN
+    where the legs share fewer than min_obs dates.
+    """
+    # Every moment is taken over each pair's common dates (like decay.masked_corr),
+    # so the correlation stays within [-1, 1] and the residual variance non-negative.
+    # Centering each leg on its own mean first only shifts the values, for precision.
+    long_mask = ~np.isnan(long_returns)
+    short_mask = ~np.isnan(short_returns)
+    long_m, short_m = long_mask.astype(float), short_mask.astype(float)
+    long_c = np.where(long_mask, long_returns - np.nansum(long_returns, axis=0) / np.maximum(long_m.sum(axis=0), 1), 0.0)
+    short_c = np.where(short_mask, short_returns - np.nansum(short_returns, axis=0) / np.maximum(short_m.sum(axis=0), 1), 0.0)
+
+    # Sums over the common dates of every pair as matrix products of the zero-filled legs and masks
+    common = long_m.T @ short_m
+    n = np.maximum(common, 1)
+    sum_long = long_c.T @ short_m
+    sum_short = long_m.T @ short_c
+    cov = (long_c.T @ short_c - sum_long * sum_short / n) / np.maximum(common - 1, 1)
+    var_long = ((long_c ** 2).T @ short_m - sum_long ** 2 / n) / np.maximum(common - 1, 1)
+    var_short = (long_m.T @ short_c ** 2 - sum_short ** 2 / n) / np.maximum(common - 1, 1)
+
+    valid = (common >= min_obs) & (var_short > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hedge = np.where(valid, cov / var_short, np.nan)
+        residual = var_long - hedge * cov
+    vol = np.sqrt(np.maximum(residual, 0.0) * TRADING_DAYS)
+    return hedge, np.where(valid, vol, np.nan)
+
+
+class PairIndex:
+    """
+    Ranked long/short pairs within each INDUSTRY, or within each SECTOR so
+    legs can come from different industries. Every long x short combination
+    of a group is scored at once as arrays: P_NN spread, hedge ratio and
+    spread vol from the CLOSE return history, and SCORE = spread / spread vol.
+    A bounded heap keeps the best top_k pairs across groups, so only the kept
+    pairs ever become Python objects.
+
+    Without return history for a pair (or at all) HEDGE_RATIO is 1 (dollar
+    neutral), SCORE is NaN and the pair ranks after scored pairs by P_NN spread.
+    """
+
+    def __init__(self, df, returns=None, scope='INDUSTRY', top_k=TOP_K):
+        start = time.perf_counter()
+        if scope not in PAIR_SCOPES:
+            raise ValueError(f"scope must be one of {PAIR_SCOPES}, got {scope!r}")
+        self.scope = scope
+
+        universe = ensure_market_cap_buckets(df)
+        universe = universe[~universe['INDUSTRY'].isin(EXCLUDED_GROUPS) & ~universe[scope].isin(EXCLUDED_GROUPS)]
+        universe = universe.reset_index(drop=True)
+        pnn = universe['P_NN'].to_numpy(dtype=float)
+        liquid = universe['VOLUME'].to_numpy(dtype=float) >= MIN_PAIR_VOLUME
+        is_long = liquid & (pnn > LONG_MIN_P_NN)
+        is_short = liquid & (pnn < SHORT_MAX_P_NN)
+        aligned = returns.reindex(columns=universe['TICKER']).to_numpy(dtype=float) \
+            if returns is not None and len(returns) else None
+
+        heap = []  # (rank key, tie-break, long row, short row, hedge ratio, spread vol); worst pair on top
+        counter = itertools.count()
+        groups = []
+        self.n_candidates = 0
+        for group, rows in universe.groupby(scope, sort=False, observed=True).indices.items():
+            longs = rows[is_long[rows]]
+            shorts = rows[is_short[rows]]
+            if len(longs) == 0 or len(shorts) == 0:
+                continue
+
+            spread = pnn[longs][:, None] - pnn[shorts][None, :]
+            if aligned is not None:
+                hedge, vol = pair_moments(aligned[:, longs], aligned[:, shorts])
+            else:
+                hedge = vol = np.full(spread.shape, np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # Scored pairs (key > 0) first, then unscored ones by spread (key in (-20, 0))
+                key = np.where(vol > 0, spread / vol, -1.0 / spread)
+            long_pos, short_pos = np.nonzero(spread >= MIN_SPREAD)
+            keys = key[long_pos, short_pos]
+            self.n_candidates += len(keys)
+            groups.append({scope: group, 'LONG_COUNT': len(longs), 'SHORT_COUNT': len(shorts),
+                           'TOTAL_STOCKS': len(rows), 'AVG_P_NN_SPREAD': pnn[rows].max() - pnn[rows].min(),
+                           'CANDIDATE_PAIRS': len(keys)})
+
+            # Only pairs that can enter the heap are pushed
+            if len(heap) == top_k:
+                better = keys > heap[0][0]
+                long_pos, short_pos, keys = long_pos[better], short_pos[better], keys[better]
+            if len(keys) > top_k:
+                best = np.argpartition(keys, -top_k)[-top_k:]
+                long_pos, short_pos, keys = long_pos[best], short_pos[best], keys[best]
+            entries = zip(keys.tolist(), longs[long_pos].tolist(), shorts[short_pos].tolist(),
+                          hedge[long_pos, short_pos].tolist(), vol[long_pos, short_pos].tolist())
+            for key_value, long_row, short_row, hedge_ratio, spread_vol in entries:
+                entry = (key_value, next(counter), long_row, short_row, hedge_ratio, spread_vol)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif key_value > heap[0][0]:
+                    heapq.heappushpop(heap, entry)
+
+        self.pairs = self._pair_frame(universe, sorted(heap, reverse=True))
+        self.groups = pd.DataFrame(groups, columns=[scope, 'LONG_COUNT', 'SHORT_COUNT', 'TOTAL_STOCKS',
+                                                    'AVG_P_NN_SPREAD', 'CANDIDATE_PAIRS'])
+        self.groups = self.groups.sort_values('AVG_P_NN_SPREAD', ascending=False).reset_index(drop=True)
+        self.elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Pair index ({scope}): {self.n_candidates:,} candidate pairs in {len(self.groups)} groups, "
+              f"top {len(self.pairs)} kept in {self.elapsed_ms:.0f} ms")
+
+    def _pair_frame(self, universe, ranked):
+        if not ranked:
+            return pd.DataFrame(columns=[self.scope, 'LONG_TICKER', 'SHORT_TICKER', 'P_NN_SPREAD', 'HEDGE_RATIO',
+                                         'SPREAD_VOL', 'SCORE', 'MIN_VOLUME', 'MARKET_CAP_MATCH'])
+        _, _, long_rows, short_rows, hedge, vol = (np.array(values) for values in zip(*ranked))
+        long_legs = universe.iloc[long_rows.astype(int)].reset_index(drop=True)
+        short_legs = universe.iloc[short_rows.astype(int)].reset_index(drop=True)
+        spread = long_legs['P_NN'].to_numpy(dtype=float) - short_legs['P_NN'].to_numpy(dtype=float)
+        vol = vol.astype(float)
+        return pd.DataFrame({
+            self.scope: long_legs[self.scope].astype(str),
+            'LONG_TICKER': long_legs['TICKER'],
+            'LONG_INDUSTRY': long_legs['INDUSTRY'].astype(str),
+            'LONG_P_NN': long_legs['P_NN'],
+            'LONG_CLOSE': long_legs['CLOSE'],
+            'LONG_VOLUME': long_legs['VOLUME'],
+            'LONG_MARKET_CAP': long_legs['MARKET_CAP_BUCKET'],
+            'SHORT_TICKER': short_legs['TICKER'],
+            'SHORT_INDUSTRY': short_legs['INDUSTRY'].astype(str),
+            'SHORT_P_NN': short_legs['P_NN'],
+            'SHORT_CLOSE': short_legs['CLOSE'],
+            'SHORT_VOLUME': short_legs['VOLUME'],
+            'SHORT_MARKET_CAP': short_legs['MARKET_CAP_BUCKET'],
+            'P_NN_SPREAD': spread,
+            'HEDGE_RATIO': np.where(np.isnan(hedge.astype(float)), 1.0, hedge.astype(float)),
+            'SPREAD_VOL': vol,
+            'SCORE': spread / vol,
+            'MIN_VOLUME': np.minimum(long_legs['VOLUME'], short_legs['VOLUME']),
+            'MARKET_CAP_MATCH': (long_legs['MARKET_CAP_BUCKET'] == short_legs['MARKET_CAP_BUCKET']).to_numpy(),
+        })
+
+
+def generate_pairs(df, returns=None, scope='INDUSTRY', top_k=TOP_K):
+    """
+    Long/short pairs (P_NN > 0.02 against P_NN < -0.02, spread of at least
+    0.05, both legs trading 100K+ shares) from every combination within each
+    industry or sector, ranked by spread / spread vol (see PairIndex).
+
+    Returns (pairs_df, groups_df): the top_k pairs best first, and per-group
+    counts sorted by P_NN dispersion.
+    """
+    index = PairIndex(df, returns, scope, top_k)
+    return index.pairs, index.groups
@@ -0,0 +1,112 @@
+import base64
+import time
+
+import numpy as np
+from flask import g, request
+from flask_compress import Compress
+
+# Response encodings offered to the browser, best first
+COMPRESS_ALGORITHMS = ['br', 'gzip']
+
+# Callback responses smaller than this (uncompressed) are not logged
+LOG_MIN_BYTES = 16 * 1024
+
+# Text columns with at most this share of distinct values are sent dictionary-encoded
+DICTIONARY_MAX_RATIO = 0.5
+
+# numpy dtype -> Plotly typed-array dtype code (base64 arrays need plotly.js >= 2.28)
+TYPED_ARRAY_DTYPES = {'float64': 'f8', 'float32': 'f4', 'int32': 'i4', 'int16': 'i2', 'int8': 'i1',
+                      'uint32': 'u4', 'uint16': 'u2', 'uint8': 'u1'}
+
+
+def columnar(df, columns=None):
+    """
+    Column-oriented table payload {'length', 'columns', 'data'}: each column is
+    a plain value list, or {'categories', 'codes'} for repetitive text columns
+    (code -1 is a missing value). assets/payload.js turns it back into
+    DataTable records in the browser, so row keys are not repeated on the wire.
+    """
+    columns = list(df.columns) if columns is None else [col for col in columns if col in df.columns]
+    data = {}
+    for col in columns:
+        series = df[col]
+        if series.dtype.name == 'category' or (
+                series.dtype == object and series.nunique() <= len(series) * DICTIONARY_MAX_RATIO):
+            codes, categories = series.factorize()
+            data[col] = {'categories': list(categories), 'codes': codes.tolist()}
+        else:
+            data[col] = series.tolist()
+    return {'length': len(df), 'columns': columns, 'data': data}
+
+
+def typed_array(values):
+    """Plotly's base64 typed-array spec for a 1-D or 2-D numeric array, or None when it has none"""
+    array = np.asarray(values)
+    if array.dtype.kind not in 'iuf' or array.ndim not in (1, 2) or array.size == 0:
+        return None
+    if array.dtype.kind in 'iu' and array.dtype.itemsize == 8:
+        # plotly.js has no 64-bit integer arrays
+        in_range = array.min() >= np.iinfo(np.int32).min and array.max() <= np.iinfo(np.int32).max
+        array = array.astype(np.int32 if in_range else np.float64)
+    if array.dtype.name not in TYPED_ARRAY_DTYPES:
+        array = array.astype(np.float64)
+    little_endian = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+    spec = {'dtype': TYPED_ARRAY_DTYPES[array.dtype.name], 'bdata': base64.b64encode(little_endian.tobytes()).decode('ascii')}
+    if array.ndim == 2:
+        spec['shape'] = f"{array.shape[0]},{array.shape[1]}"
+    return spec
+
+
+def _encode_arrays(node):
+    """Replaces numeric ndarrays (the data_array attributes) in a trace dict with typed-array specs"""
+    encoded = {}
+    for key, value in node.items():
+        if isinstance(value, np.ndarray):
+            value = typed_array(value) or value
+        elif isinstance(value, dict):
+            value = _encode_arrays(value)
+        encoded[key] = value
+    return encoded
+
+
+def encode_figure(fig):
+    """Figure dict for dcc.Graph with numeric trace data as base64 typed arrays instead of JSON number lists"""
+    figure = fig.to_plotly_json()
+    figure['data'] = [_encode_arrays(trace) for trace in figure['data']]
+    return figure
+
+
+def enable_compression(server, algorithms=COMPRESS_ALGORITHMS, log_min_bytes=LOG_MIN_BYTES):
+    """
+    Brotli/gzip compression of the Flask server behind a Dash app, plus one
+    log line per large callback response: uncompressed JSON size, bytes on
+    the wire and total time. Call before the server handles its first request.
+    """
+    server.config['COMPRESS_ALGORITHM'] = list(algorithms)
+
+    def start_timer():
+        g.payload_start = time.perf_counter()
+
+    def record_raw_size(response):
+        if request.path.endswith('_dash-update-component') and not response.direct_passthrough:
+            g.payload_raw_bytes = response.calculate_content_length()
+        return response
+
+    def log_payload(response):
+        raw = g.pop('payload_raw_bytes', None)
+        if raw is not None and raw >= log_min_bytes:
+            output = (request.get_json(silent=True) or {}).get('output', '?')
+            wire = response.calculate_content_length() or raw
+            encoding = response.headers.get('Content-Encoding', 'identity')
+            elapsed = (time.perf_counter() - g.pop('payload_start', time.perf_counter())) * 1000
+            print(f"Callback {output[:60]}: {raw / 1024:.0f} kB JSON -> {wire / 1024:.0f} kB {encoding} "
+                  f"({raw / max(wire, 1):.1f}x) in {elapsed:.0f} ms")
+        return response
+
+    # after_request hooks run in reverse registration order: the raw size is
+    # recorded before Compress rewrites the body and logged after it
+    server.before_request(start_timer)
+    server.after_request(log_payload)
+    Compress(server)
+    server.after_request(record_raw_size)
+    return server
@@ -0,0 +1,110 @@
+import pandas as pd
+
+from .buckets import ensure_market_cap_buckets
+from .liquidity import MAX_ADV_PCT, add_liquidity_columns, cap_positions
+
+# Universe: liquid names only (daily share volume), no ETFs
+MIN_VOLUME = 10_000_000
+
+# Book shape and balance constraints
+N_LONGS = 20
+N_SHORTS = 40
+N_CANDIDATES = 50
+MAX_PER_SECTOR = 4
+MAX_PER_INDUSTRY = 2
+
+# Equal dollar weight within each side
+PORTFOLIO_VALUE = 10_000_000
+LONG_ALLOCATION = 0.5
+SHORT_ALLOCATION = 0.5
+
+# Rebalancing triggers shown in the Balance Analysis tab
+LONG_EXIT_P_NN = 0.03
+SHORT_EXIT_P_NN = -0.03
+
+BOOK_COLUMNS = ['TICKER', 'NAME', 'SECTOR', 'INDUSTRY', 'P_NN', 'CLOSE', 'VOLUME', 'MARKET_CAP_BUCKET', 'ADV_DOLLARS',
+                'POSITION_SIZE', 'DAYS_TO_LIQUIDATE', 'POSITION_TYPE']
+
+
+def portfolio_universe(df, min_volume=MIN_VOLUME):
+    """Names eligible for the book: volume floor and no ETFs"""
+    # Size buckets come from the whole snapshot, not from the filtered universe
+    df = ensure_market_cap_buckets(df)
+    return df[
+        (df['VOLUME'] >= min_volume) &
+        (df['INDUSTRY'] != 'ETF')
+    ].copy()
+
+
+def rank_candidates(universe):
+    """
+    Universe names with a P_NN, strongest first; ties keep the snapshot's
+    order. Names without a P_NN are never long or short candidates.
+    """
+    return universe.dropna(subset=['P_NN']).sort_values('P_NN', ascending=False, kind='mergesort')
+
+
+def build_balanced_portfolio(candidates, target_count, max_per_sector=MAX_PER_SECTOR, max_per_industry=MAX_PER_INDUSTRY):
+    """
+    Walks the candidates in order and keeps a name unless its sector or
+    industry is already full, until target_count names are selected
+    """
+    selected = []
+    sector_counts = {}
+    industry_counts = {}
+
+    for _, stock in candidates.iterrows():
+        sector = stock['SECTOR']
+        industry = stock['INDUSTRY']
+
+        # Check constraints
+        if sector_counts.get(sector, 0) >= max_per_sector:
+            continue
+        if industry_counts.get(industry, 0) >= max_per_industry:
+            continue
+
+        # Add to portfolio
+        selected.append(stock)
+        sector_counts[sector] = sector_counts.get(sector, 0) + 1
+        industry_counts[industry] = industry_counts.get(industry, 0) + 1
+
+        if len(selected) >= target_count:
+            break
+
+    return pd.DataFrame(selected)
+
+
+def size_positions(book, notional, position_type):
+    """Equal dollar weight: notional split evenly across the book"""
+    if len(book) > 0:
+        book['POSITION_SIZE'] = notional / len(book)
+        book['POSITION_TYPE'] = position_type
+    return book
+
+
+def build_portfolio(df, portfolio_value=PORTFOLIO_VALUE, n_longs=N_LONGS, n_shorts=N_SHORTS, min_volume=MIN_VOLUME,
+                    max_adv_pct=MAX_ADV_PCT):
+    """
+    Systematic long/short book: top P_NN names long, bottom P_NN names short,
+    each side built from the 50 strongest candidates under the sector and
+    industry caps, sized at equal dollar weight and capped at max_adv_pct of
+    each name's average daily dollar volume.
+
+    Returns (universe, long_portfolio, short_portfolio).
+    """
+    universe = add_liquidity_columns(portfolio_universe(df, min_volume))
+
+    # Sort by P_NN for long/short selection
+    universe_sorted = rank_candidates(universe)
+    long_candidates = universe_sorted.head(N_CANDIDATES)
+    short_candidates = universe_sorted.tail(N_CANDIDATES)
+
+    long_portfolio = build_balanced_portfolio(long_candidates, n_longs)
+    short_portfolio = build_balanced_portfolio(short_candidates, n_shorts)
+
+    long_portfolio = size_positions(long_portfolio, portfolio_value * LONG_ALLOCATION, 'LONG')
+    short_portfolio = size_positions(short_portfolio, portfolio_value * SHORT_ALLOCATION, 'SHORT')
+
+    long_portfolio = cap_positions(long_portfolio, max_adv_pct)
+    short_portfolio = cap_positions(short_portfolio, max_adv_pct)
+    return universe, long_portfolio, short_portfolio
@@ -0,0 +1,68 @@
+# Signal columns that get global, sector and industry percentile ranks at load time
+RANK_COLS = ['P_NN', 'P', 'G', 'D', 'IV']
+
+# Grouping levels: suffix used in the column name -> grouping column (None = whole universe)
+RANK_LEVELS = {'PCTL': None, 'SECTOR_PCTL': 'SECTOR', 'INDUSTRY_PCTL': 'INDUSTRY'}
+
+# Filter scopes: value prefix -> (rank level, label)
+RANK_SCOPES = {'industry': ('INDUSTRY_PCTL', 'in Industry'), 'sector': ('SECTOR_PCTL', 'in Sector'),
+               'global': ('PCTL', 'Overall')}
+
+
+def rank_column(col, level):
+    """Name of the percentile column for a signal column, e.g. P_NN_INDUSTRY_PCTL"""
+    return f"{col}_{level}"
+
+
+def rank_filter_value(col, scope, side):
+    """Filter value for a signal, e.g. 'industry_top' for P_NN (kept from before) or 'g_industry_top'"""
+    prefix = '' if col == 'P_NN' else f"{col.lower()}_"
+    return f"{prefix}{scope}_{side}"
+
+
+# Percentile filter options offered in the dashboards: value -> (rank column, side)
+RANK_FILTERS = {
+    rank_filter_value(col, scope, side): (rank_column(col, level), side)
+    for col in RANK_COLS for scope, (level, _) in RANK_SCOPES.items() for side in ('top', 'bottom')
+}
+
+RANK_FILTER_OPTIONS = [{"label": "Any Percentile", "value": "all"}] + [
+    {"label": f"{col} {side.title()} Decile {label}", "value": rank_filter_value(col, scope, side)}
+    for col in RANK_COLS for scope, (_, label) in RANK_SCOPES.items() for side in ('top', 'bottom')
+]
+
+
+def add_rank_columns(df, cols=RANK_COLS):
+    """
+    Adds exact percentile ranks (0-1, ties averaged) for each signal column
+    across the whole universe, within SECTOR and within INDUSTRY.
+
+    Meant to run once per snapshot at load time so callbacks only read the
+    columns; every level is a single grouped rank over the signal columns.
+    """
+    cols = [col for col in cols if col in df.columns]
+    if len(df) == 0 or not cols:
+        return df
+
+    ranked = {}
+    for level, group_col in RANK_LEVELS.items():
+        if group_col is None:
+            pct = df[cols].rank(pct=True)
+        else:
+            pct = df.groupby(group_col, sort=False, observed=True)[cols].rank(pct=True)
+        for col in cols:
+            ranked[rank_column(col, level)] = pct[col]
+
+    return df.assign(**ranked)
+
+
+def apply_rank_filter(df, rank_filter, decile=0.1):
+    """Keeps rows in the top/bottom decile for the selected percentile filter"""
+    if not rank_filter or rank_filter not in RANK_FILTERS:
+        return df
+    col, side = RANK_FILTERS[rank_filter]
+    if col not in df.columns:
+        return df
+    if side == 'top':
+        return df[df[col] >= 1 - decile]
+    return df[df[col] <= decile]
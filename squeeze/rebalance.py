@@ -0,0 +1,184 @@
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .history import HISTORY_DIR, read_history
+from .liquidity import MAX_ADV_PCT, add_liquidity_columns, cap_positions
+from .portfolio import (BOOK_COLUMNS, LONG_ALLOCATION, LONG_EXIT_P_NN, MIN_VOLUME, N_CANDIDATES, N_LONGS, N_SHORTS,
+                        PORTFOLIO_VALUE, SHORT_ALLOCATION, SHORT_EXIT_P_NN, build_balanced_portfolio,
+                        portfolio_universe, rank_candidates, size_positions)
+
+# Saved books, one parquet file per book date, next to the snapshot history
+BOOKS_DIR = "books"
+
+# Position changes smaller than this are not traded
+MIN_TRADE_DOLLARS = 1.0
+
+REPLAY_COLUMNS = ['DATE', 'TICKER', 'NAME', 'SECTOR', 'INDUSTRY', 'P_NN', 'CLOSE', 'VOLUME', 'ADM21']
+
+
+def books_dir(root=HISTORY_DIR):
+    return os.path.join(root, BOOKS_DIR)
+
+
+def save_book(long_book, short_book, date, root=HISTORY_DIR):
+    """Writes the combined book for `date` atomically as books/book_YYYYMMDD.parquet"""
+    date = pd.Timestamp(date).normalize()
+    book = pd.concat([long_book, short_book], ignore_index=True)
+    book = book[[col for col in BOOK_COLUMNS if col in book.columns]].copy()
+    book['DATE'] = date
+    os.makedirs(books_dir(root), exist_ok=True)
+    path = os.path.join(books_dir(root), f"book_{date:%Y%m%d}.parquet")
+    tmp_path = path + ".tmp"
+    book.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_book(before=None, root=HISTORY_DIR):
+    """Most recent saved book, optionally strictly before `before`; None when there is none"""
+    paths = sorted(glob.glob(os.path.join(books_dir(root), "book_*.parquet")))
+    if before is not None:
+        cutoff = f"book_{pd.Timestamp(before):%Y%m%d}.parquet"
+        paths = [path for path in paths if os.path.basename(path) < cutoff]
+    if not paths:
+        return None
+    return pd.read_parquet(paths[-1])
+
+
+def snapshot_date(df):
+    dates = pd.to_datetime(df['DATE'], errors='coerce') if 'DATE' in df.columns else pd.Series(dtype='datetime64[ns]')
+    return dates.max().normalize() if dates.notna().any() else pd.Timestamp.now().normalize()
+
+
+def rebalance(df, prior_book=None, portfolio_value=PORTFOLIO_VALUE, n_longs=N_LONGS, n_shorts=N_SHORTS,
+              min_volume=MIN_VOLUME, max_adv_pct=MAX_ADV_PCT):
+    """
+    Today's book with hysteresis against the prior one: a held long stays while
+    P_NN >= 0.03 and a held short while P_NN <= -0.03 (and both stay above the
+    volume floor); the remaining slots are filled from the strongest
+    candidates under the usual sector and industry caps.
+
+    Returns (long_portfolio, short_portfolio, trades, stats).
+    """
+    universe = add_liquidity_columns(portfolio_universe(df, min_volume))
+    universe_sorted = rank_candidates(universe)
+
+    held_long, held_short = _held_names(universe, prior_book)
+    long_candidates = pd.concat([held_long.sort_values('P_NN', ascending=False), universe_sorted.head(N_CANDIDATES)])
+    short_candidates = pd.concat([held_short.sort_values('P_NN'), universe_sorted.tail(N_CANDIDATES)])
+
+    long_portfolio = build_balanced_portfolio(long_candidates.drop_duplicates('TICKER'), n_longs)
+    short_portfolio = build_balanced_portfolio(short_candidates.drop_duplicates('TICKER'), n_shorts)
+
+    long_portfolio = cap_positions(size_positions(long_portfolio, portfolio_value * LONG_ALLOCATION, 'LONG'), max_adv_pct)
+    short_portfolio = cap_positions(size_positions(short_portfolio, portfolio_value * SHORT_ALLOCATION, 'SHORT'), max_adv_pct)
+
+    book = pd.concat([long_portfolio, short_portfolio], ignore_index=True)
+    trades = diff_books(prior_book, book)
+    stats = turnover_stats(trades, portfolio_value)
+    stats['DATE'] = snapshot_date(df)
+    return long_portfolio, short_portfolio, trades, stats
+
+
+def _held_names(universe, prior_book):
+    """Prior positions that pass the exit thresholds on today's snapshot"""
+    if prior_book is None or len(prior_book) == 0:
+        return universe.iloc[:0], universe.iloc[:0]
+    prior = prior_book[['TICKER', 'POSITION_TYPE']]
+    held = universe.merge(prior, on='TICKER', how='inner')
+    held_long = held[(held['POSITION_TYPE'] == 'LONG') & (held['P_NN'] >= LONG_EXIT_P_NN)]
+    held_short = held[(held['POSITION_TYPE'] == 'SHORT') & (held['P_NN'] <= SHORT_EXIT_P_NN)]
+    return held_long.drop(columns='POSITION_TYPE'), held_short.drop(columns='POSITION_TYPE')
+
+
+def signed_sizes(book):
+    if book is None or len(book) == 0:
+        return pd.DataFrame(columns=['TICKER', 'SIGNED_SIZE', 'CLOSE'])
+    sign = np.where(book['POSITION_TYPE'] == 'SHORT', -1.0, 1.0)
+    return pd.DataFrame({'TICKER': book['TICKER'].to_numpy(), 'SIGNED_SIZE': sign * book['POSITION_SIZE'].to_numpy(),
+                         'CLOSE': book['CLOSE'].to_numpy()})
+
+
+def diff_books(prior_book, book):
+    """
+    Trade list from the prior book to the new one, joined on TICKER. ACTION is
+    BUY/SELL for new/exited longs, SHORT/COVER for new/exited shorts, and
+    RESIZE for held names whose dollar size changed.
+    """
+    merged = signed_sizes(prior_book).merge(signed_sizes(book), on='TICKER', how='outer', suffixes=('_OLD', '_NEW'))
+    old = merged['SIGNED_SIZE_OLD'].fillna(0).astype(float)
+    new = merged['SIGNED_SIZE_NEW'].fillna(0).astype(float)
+    merged['OLD_SIZE'] = old
+    merged['NEW_SIZE'] = new
+    merged['TRADE_DOLLARS'] = new - old
+    close = merged['CLOSE_NEW'].fillna(merged['CLOSE_OLD']).astype(float)
+    merged['TRADE_SHARES'] = (merged['TRADE_DOLLARS'] / close.where(close > 0)).round()
+
+    conditions = [
+        (old == 0) & (new > 0), (old > 0) & (new == 0),
+        (old == 0) & (new < 0), (old < 0) & (new == 0),
+        np.sign(old) != np.sign(new),
+    ]
+    merged['ACTION'] = np.select(conditions, ['BUY', 'SELL', 'SHORT', 'COVER', 'FLIP'], default='RESIZE')
+
+    trades = merged[merged['TRADE_DOLLARS'].abs() >= MIN_TRADE_DOLLARS]
+    trades = trades[['TICKER', 'ACTION', 'OLD_SIZE', 'NEW_SIZE', 'TRADE_DOLLARS', 'TRADE_SHARES']]
+    return trades.sort_values('TRADE_DOLLARS', key=np.abs, ascending=False).reset_index(drop=True)
+
+
+def turnover_stats(trades, portfolio_value=PORTFOLIO_VALUE):
+    """Counts per ACTION plus traded dollars and one-way turnover (half the traded dollars over portfolio value)"""
+    counts = trades['ACTION'].value_counts()
+    traded = float(trades['TRADE_DOLLARS'].abs().sum())
+    stats = {action: int(counts.get(action, 0)) for action in ['BUY', 'SELL', 'SHORT', 'COVER', 'FLIP', 'RESIZE']}
+    stats['TRADES'] = len(trades)
+    stats['TRADED_DOLLARS'] = traded
+    stats['TURNOVER'] = traded / 2 / portfolio_value
+    return stats
+
+
+def replay_rebalances(history, portfolio_value=PORTFOLIO_VALUE, **kwargs):
+    """
+    Rebalances through every snapshot DATE in order, each day against the
+    previous day's book. Returns one row of turnover stats per date.
+    """
+    rows = []
+    book = None
+    for _, snap in history.groupby('DATE', sort=True):
+        long_portfolio, short_portfolio, trades, stats = rebalance(snap, book, portfolio_value, **kwargs)
+        book = pd.concat([long_portfolio, short_portfolio], ignore_index=True)
+        rows.append(stats)
+    return pd.DataFrame(rows, columns=['DATE', 'TRADES', 'BUY', 'SELL', 'SHORT', 'COVER', 'FLIP', 'RESIZE',
+                                       'TRADED_DOLLARS', 'TURNOVER'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay daily rebalances over the snapshot history store")
+    parser.add_argument("--start", help="First DATE to replay (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last DATE to replay (YYYY-MM-DD)")
+    parser.add_argument("--portfolio-value", type=float, default=PORTFOLIO_VALUE)
+    parser.add_argument("--output", default="rebalance_replay.csv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    history = read_history(columns=REPLAY_COLUMNS, start=args.start, end=args.end)
+    if len(history) == 0:
+        print("No snapshot history found - run `python -m squeeze.backfill` first")
+        return
+
+    # Several pulls on one DATE: the last one is that day's snapshot
+    history = history.drop_duplicates(subset=['DATE', 'TICKER'], keep='last')
+    replay = replay_rebalances(history, args.portfolio_value)
+    replay.to_csv(args.output, index=False)
+    print(f"Replayed {len(replay)} rebalances in {time.perf_counter() - start:.1f}s -> {args.output}")
+    print(f"Average one-way turnover {replay['TURNOVER'].iloc[1:].mean():.1%}, "
+          f"{replay['TRADES'].iloc[1:].mean():.1f} trades per rebalance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+
+from .history import read_history
+from .portfolio import PORTFOLIO_VALUE
+
+TRADING_DAYS = 252
+
+# Daily returns used for the risk model
+LOOKBACK_DAYS = 126
+
+# Annualized volatility target for vol-targeted sizing (fraction of gross notional)
+TARGET_VOL = 0.10
+
+
+def close_returns(history, lookback=LOOKBACK_DAYS):
+    """Dense DATE x TICKER matrix of daily CLOSE returns over the last `lookback` dates"""
+    closes = history.pivot_table(index='DATE', columns='TICKER', values='CLOSE', aggfunc='last').sort_index()
+    closes = closes.where(closes > 0)
+    return closes.pct_change(fill_method=None).iloc[1:].tail(lookback)
+
+
+def masked_moments(x, y):
+    """
+    Column-wise covariance of x and y and variance of y over the dates where
+    both are present (NaN = missing), as plain NumPy arrays.
+    """
+    mask = ~np.isnan(x) & ~np.isnan(y)
+    n = np.maximum(mask.sum(axis=0), 2)
+    xm = np.where(mask, x, 0.0)
+    ym = np.where(mask, y, 0.0)
+    x_mean = xm.sum(axis=0) / n
+    y_mean = ym.sum(axis=0) / n
+    xc = np.where(mask, x - x_mean, 0.0)
+    yc = np.where(mask, y - y_mean, 0.0)
+    cov = (xc * yc).sum(axis=0) / (n - 1)
+    var_y = (yc * yc).sum(axis=0) / (n - 1)
+    return cov, var_y
+
+
+def ledoit_wolf(returns):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity.
+    Missing returns are treated as zero after demeaning.
+    """
+    x = returns - np.nanmean(returns, axis=0)
+    x = np.nan_to_num(x)
+    t, n = x.shape
+    sample = x.T @ x / t
+    mu = np.trace(sample) / n
+    target = mu * np.eye(n)
+    delta = ((sample - target) ** 2).sum() / n
+    beta = (((x ** 2).T @ (x ** 2)) / t - sample ** 2).sum() / (n * t)
+    shrinkage = min(beta, delta) / delta if delta > 0 else 1.0
+    return shrinkage * target + (1 - shrinkage) * sample
+
+
+class RiskModel:
+    """
+    Covariance model over the stored CLOSE history of the whole universe.
+
+    'factor' (default): one factor per SECTOR (equal-weight sector return),
+    name loadings from a masked regression on its sector factor, and a
+    diagonal specific risk. Factor returns, loadings and specific variances
+    are estimated once for the full universe, so the covariance of any book
+    is a small B F B' + D product.
+
+    'shrinkage': Ledoit-Wolf shrunk sample covariance of the book's names.
+    """
+
+    def __init__(self, history, lookback=LOOKBACK_DAYS, group_col='SECTOR'):
+        self.group_col = group_col
+        self.returns = close_returns(history, lookback)
+        latest = history.sort_values('DATE').drop_duplicates('TICKER', keep='last').set_index('TICKER')
+        self.groups = latest[group_col].reindex(self.returns.columns).fillna('Unknown')
+
+        r = self.returns.to_numpy(dtype=float)
+        self.tickers = pd.Index(self.returns.columns)
+
+        # Equal-weight market return, for betas
+        self.market = np.nanmean(r, axis=1) if r.size else np.array([])
+        cov_m, var_m = masked_moments(r, np.repeat(self.market[:, None], r.shape[1], axis=1))
+        self.betas = pd.Series(np.where(var_m > 0, cov_m / var_m, np.nan), index=self.tickers)
+
+        # Sector factor returns (dates x factors) and each name's loading on its own factor
+        self.factors = pd.Index(sorted(self.groups.unique()))
+        codes = self.factors.get_indexer(self.groups)
+        factor_returns = np.column_stack([np.nanmean(r[:, codes == j], axis=1) for j in range(len(self.factors))]) \
+            if r.size else np.empty((0, len(self.factors)))
+        self.factor_returns = factor_returns
+        own_factor = factor_returns[:, codes] if r.size else np.empty_like(r)
+        cov_f, var_f = masked_moments(r, own_factor)
+        self.loadings = np.where(var_f > 0, cov_f / var_f, 1.0)
+        residuals = r - self.loadings * own_factor
+        self.specific_var = pd.Series(np.nanvar(residuals, axis=0), index=self.tickers) if r.size else pd.Series(dtype=float)
+        self.factor_cov = np.cov(np.nan_to_num(factor_returns), rowvar=False).reshape(len(self.factors), len(self.factors)) \
+            if len(factor_returns) > 1 else np.zeros((len(self.factors), len(self.factors)))
+
+        self.vols = pd.Series(np.nanstd(r, axis=0) * np.sqrt(TRADING_DAYS), index=self.tickers) if r.size else pd.Series(dtype=float)
+        print(f"Risk model: {len(self.tickers):,} names, {len(self.returns)} return days, {len(self.factors)} {group_col} factors")
+
+    @classmethod
+    def from_store(cls, lookback=LOOKBACK_DAYS, group_col='SECTOR'):
+        """Builds the model from the columnar history store"""
+        history = read_history(columns=['DATE', 'TICKER', group_col, 'CLOSE'])
+        return cls(history, lookback, group_col)
+
+    def covariance(self, book, method='factor'):
+        """
+        Annualized covariance for the book's TICKERs. Names without history
+        fall back to their SECTOR factor with a loading of 1 and the median
+        specific variance.
+        """
+        tickers = pd.Index(book['TICKER'])
+        pos = self.tickers.get_indexer(tickers)
+        known = pos >= 0
+
+        if method == 'shrinkage':
+            r = np.full((len(self.returns), len(tickers)), np.nan)
+            r[:, known] = self.returns.to_numpy(dtype=float)[:, pos[known]]
+            cov = ledoit_wolf(r)
+            fallback = np.nanmedian(self.specific_var) if len(self.specific_var) else 0.0
+            cov[~known, ~known] = np.where(np.diag(cov)[~known] > 0, np.diag(cov)[~known], fallback)
+            return pd.DataFrame(cov * TRADING_DAYS, index=tickers, columns=tickers)
+
+        groups = np.where(known, self.groups.to_numpy()[np.maximum(pos, 0)], book[self.group_col].to_numpy())
+        factor_pos = self.factors.get_indexer(groups)
+        loadings = np.where(known, self.loadings[np.maximum(pos, 0)], 1.0)
+        specific = np.where(known, self.specific_var.to_numpy()[np.maximum(pos, 0)], np.nanmedian(self.specific_var))
+
+        exposure = np.zeros((len(tickers), len(self.factors)))
+        has_factor = factor_pos >= 0
+        exposure[np.flatnonzero(has_factor), factor_pos[has_factor]] = loadings[has_factor]
+        cov = exposure @ self.factor_cov @ exposure.T + np.diag(np.nan_to_num(specific))
+        return pd.DataFrame(cov * TRADING_DAYS, index=tickers, columns=tickers)
+
+    def book_report(self, long_book, short_book, portfolio_value=PORTFOLIO_VALUE, method='factor'):
+        """
+        Ex-ante risk of the long/short book: annualized volatility (% of
+        portfolio value and dollars), dollar-weighted beta to the equal-weight
+        universe, and net/gross exposure per SECTOR.
+        """
+        book = signed_book(long_book, short_book)
+        if len(book) == 0:
+            return None
+        weights = book['SIGNED_SIZE'].to_numpy() / portfolio_value
+        cov = self.covariance(book, method).to_numpy()
+        vol = float(np.sqrt(max(weights @ cov @ weights, 0.0)))
+        betas = self.betas.reindex(book['TICKER']).fillna(1.0).to_numpy()
+
+        exposure = book.assign(LONG=book['SIGNED_SIZE'].clip(lower=0), SHORT=-book['SIGNED_SIZE'].clip(upper=0))
+        sectors = exposure.groupby('SECTOR', observed=True).agg(LONG=('LONG', 'sum'), SHORT=('SHORT', 'sum'), NET=('SIGNED_SIZE', 'sum'))
+        sectors['GROSS'] = sectors['LONG'] + sectors['SHORT']
+        sectors = sectors.reset_index().sort_values('NET', ascending=False)
+
+        return {
+            'ex_ante_vol': vol,
+            'ex_ante_vol_dollars': vol * portfolio_value,
+            'beta': float(weights @ betas),
+            'net_exposure': float(book['SIGNED_SIZE'].sum()),
+            'gross_exposure': float(book['SIGNED_SIZE'].abs().sum()),
+            'sector_exposure': sectors,
+        }
+
+    def vol_target_sizes(self, long_book, short_book, target_vol=TARGET_VOL, portfolio_value=PORTFOLIO_VALUE, method='factor'):
+        """
+        Inverse-volatility weights within each side (keeping the long/short
+        dollar split), then one scale factor so the book's ex-ante volatility
+        hits target_vol of portfolio value. Returns the book with VOL, BETA and
+        VOL_TARGET_SIZE columns plus the scale factor applied.
+        """
+        book = signed_book(long_book, short_book)
+        if len(book) == 0:
+            return book, 1.0
+        vols = self.vols.reindex(book['TICKER'])
+        vols = vols.fillna(vols.median() if vols.notna().any() else 1.0).replace(0, np.nan).fillna(1.0).to_numpy()
+
+        side = np.sign(book['SIGNED_SIZE'].to_numpy())
+        sized = np.zeros(len(book))
+        for s in (1, -1):
+            on_side = side == s
+            if on_side.any():
+                side_notional = np.abs(book['SIGNED_SIZE'].to_numpy()[on_side]).sum()
+                inv_vol = 1 / vols[on_side]
+                sized[on_side] = s * side_notional * inv_vol / inv_vol.sum()
+
+        cov = self.covariance(book, method).to_numpy()
+        weights = sized / portfolio_value
+        vol = np.sqrt(max(weights @ cov @ weights, 0.0))
+        scale = target_vol / vol if vol > 0 else 1.0
+
+        book['VOL'] = vols
+        book['BETA'] = self.betas.reindex(book['TICKER']).to_numpy()
+        book['VOL_TARGET_SIZE'] = np.abs(sized) * scale
+        return book, scale
+
+
+def signed_book(long_book, short_book):
+    """One frame for both sides with SIGNED_SIZE (+ long, - short)"""
+    frames = []
+    if long_book is not None and len(long_book) > 0:
+        frames.append(long_book.assign(SIGNED_SIZE=long_book['POSITION_SIZE']))
+    if short_book is not None and len(short_book) > 0:
+        frames.append(short_book.assign(SIGNED_SIZE=-short_book['POSITION_SIZE']))
+    if not frames:
+        return pd.DataFrame(columns=['TICKER', 'SECTOR', 'POSITION_SIZE', 'POSITION_TYPE', 'SIGNED_SIZE'])
+    return pd.concat(frames, ignore_index=True)
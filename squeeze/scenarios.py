@@ -0,0 +1,123 @@
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from .filters import apply_etf_filter
+from .portfolio import MAX_PER_INDUSTRY, MAX_PER_SECTOR, MIN_VOLUME, N_CANDIDATES, N_LONGS, N_SHORTS
+
+ETF_MODES = ['include', 'exclude', 'only']
+
+SCENARIO_COLUMNS = ['ETF_FILTER', 'SECTOR', 'INDUSTRY', 'MIN_P_NN', 'UNIVERSE', 'AVG_P_NN', 'POSITIVE', 'POSITIVE_PCT',
+                    'PORTFOLIO_UNIVERSE', 'LONGS', 'SHORTS', 'LONG_AVG_P_NN', 'SHORT_AVG_P_NN', 'BOOK_SECTORS']
+
+
+class _Slice:
+    """
+    Sorted P_NN (ascending) with prefix sums for one (ETF mode, sector,
+    industry) view. Names without a P_NN are only counted: they pass no
+    minimum P_NN and are never book candidates.
+    """
+
+    def __init__(self, view, min_volume):
+        ranked = view['P_NN'].notna()
+        self.pnn = view.loc[ranked, 'P_NN'].to_numpy(dtype=float)
+        self.missing = int((~ranked).sum())
+        self.prefix = np.concatenate([[0.0], np.cumsum(self.pnn)])
+        eligible = (view['VOLUME'] >= min_volume) & (view['INDUSTRY'] != 'ETF')
+        self.eligible_missing = int((eligible & ~ranked).sum())
+        eligible = view[eligible & ranked]
+        self.eligible_pnn = eligible['P_NN'].to_numpy(dtype=float)
+        # Plain lists: the greedy walk indexes them one name at a time
+        self.eligible_sector = eligible['SECTOR'].tolist()
+        self.eligible_industry = eligible['INDUSTRY'].tolist()
+
+
+class ScenarioIndex:
+    """
+    Precomputed per-view P_NN indexes for what-if filter scenarios. The
+    snapshot is sorted by P_NN once; every ETF mode x sector x industry view
+    keeps its own ascending P_NN array, prefix sums and portfolio-eligible
+    names, so a scenario is a couple of searchsorted calls plus the greedy
+    sector/industry selection over at most 50 candidates per side.
+
+    Matches filter_snapshot + build_portfolio except for the records cap and
+    the percentile filter, which are not scenario dimensions.
+    """
+
+    def __init__(self, df, min_volume=MIN_VOLUME):
+        start = time.perf_counter()
+        # Reversed first, so walking down from the top meets tied names in snapshot order like rank_candidates
+        ordered = df.iloc[::-1].sort_values('P_NN', kind='mergesort')
+        self.slices = {}
+        for etf_filter in ETF_MODES:
+            view = apply_etf_filter(ordered, etf_filter)
+            self.slices[(etf_filter, 'All', 'All')] = _Slice(view, min_volume)
+            for sector, group in view.groupby('SECTOR', sort=False, observed=True):
+                self.slices[(etf_filter, sector, 'All')] = _Slice(group, min_volume)
+            for industry, group in view.groupby('INDUSTRY', sort=False, observed=True):
+                self.slices[(etf_filter, 'All', industry)] = _Slice(group, min_volume)
+            for (sector, industry), group in view.groupby(['SECTOR', 'INDUSTRY'], sort=False, observed=True):
+                self.slices[(etf_filter, sector, industry)] = _Slice(group, min_volume)
+        print(f"Scenario index: {len(self.slices)} views in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def evaluate(self, sector="All", industry="All", min_pnn=None, etf_filter="include"):
+        """Universe size, average P_NN, positive count and book composition for one scenario"""
+        row = {'ETF_FILTER': etf_filter, 'SECTOR': sector or "All", 'INDUSTRY': industry or "All", 'MIN_P_NN': min_pnn}
+        view = self.slices.get((etf_filter, row['SECTOR'], row['INDUSTRY']))
+        if view is None:
+            return {**row, 'UNIVERSE': 0, 'POSITIVE': 0, 'PORTFOLIO_UNIVERSE': 0, 'LONGS': 0, 'SHORTS': 0, 'BOOK_SECTORS': 0}
+
+        # filter_snapshot treats 0/None as "no minimum", which keeps names without a P_NN
+        lo = np.searchsorted(view.pnn, min_pnn, side='left') if min_pnn else 0
+        n = len(view.pnn)
+        count = n - lo + (0 if min_pnn else view.missing)
+        first_positive = max(lo, np.searchsorted(view.pnn, 0.0, side='right'))
+        row['UNIVERSE'] = int(count)
+        row['AVG_P_NN'] = (view.prefix[n] - view.prefix[lo]) / (n - lo) if n > lo else np.nan
+        row['POSITIVE'] = int(n - first_positive)
+        row['POSITIVE_PCT'] = row['POSITIVE'] / count if count else np.nan
+
+        # Book: same candidate windows and caps as build_portfolio
+        e_lo = np.searchsorted(view.eligible_pnn, min_pnn, side='left') if min_pnn else 0
+        e_n = len(view.eligible_pnn)
+        row['PORTFOLIO_UNIVERSE'] = int(e_n - e_lo + (0 if min_pnn else view.eligible_missing))
+        long_idx = range(e_n - 1, max(e_lo, e_n - N_CANDIDATES) - 1, -1)
+        short_idx = range(min(e_lo + N_CANDIDATES, e_n) - 1, e_lo - 1, -1)
+        longs = self._select(view, long_idx, N_LONGS)
+        shorts = self._select(view, short_idx, N_SHORTS)
+        row['LONGS'] = len(longs)
+        row['SHORTS'] = len(shorts)
+        row['LONG_AVG_P_NN'] = view.eligible_pnn[longs].mean() if len(longs) else np.nan
+        row['SHORT_AVG_P_NN'] = view.eligible_pnn[shorts].mean() if len(shorts) else np.nan
+        row['BOOK_SECTORS'] = len({view.eligible_sector[i] for i in itertools.chain(longs, shorts)})
+        return row
+
+    @staticmethod
+    def _select(view, candidates, target_count):
+        """build_balanced_portfolio's greedy walk over candidate positions"""
+        selected = []
+        sector_counts = {}
+        industry_counts = {}
+        for i in candidates:
+            sector = view.eligible_sector[i]
+            industry = view.eligible_industry[i]
+            if sector_counts.get(sector, 0) >= MAX_PER_SECTOR or industry_counts.get(industry, 0) >= MAX_PER_INDUSTRY:
+                continue
+            selected.append(i)
+            sector_counts[sector] = sector_counts.get(sector, 0) + 1
+            industry_counts[industry] = industry_counts.get(industry, 0) + 1
+            if len(selected) >= target_count:
+                break
+        return np.array(selected, dtype=int)
+
+    def run(self, scenarios):
+        """Evaluates a list of scenario dicts (evaluate() keyword arguments) into one comparison table"""
+        return pd.DataFrame([self.evaluate(**scenario) for scenario in scenarios], columns=SCENARIO_COLUMNS)
+
+
+def scenario_grid(min_pnns, etf_filters=('exclude',), sector="All", industry="All"):
+    """Every ETF mode x minimum P_NN combination for one sector/industry"""
+    return [{'sector': sector, 'industry': industry, 'min_pnn': min_pnn, 'etf_filter': etf_filter}
+            for etf_filter, min_pnn in itertools.product(etf_filters, min_pnns)]
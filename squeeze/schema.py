@@ -0,0 +1,167 @@
+import hashlib
+from io import BytesIO, StringIO
+
+import numpy as np
+import pandas as pd
+
+# Canonical SqueezeMetrics snapshot layout (23 columns)
+TEXT_COLS = ['TICKER', 'NAME', 'SECTOR', 'INDUSTRY']
+NUMERIC_COLS = ['P', 'P_NN', 'V', 'G', 'D', 'IV', 'CLOSE', 'VOLUME', 'OPEN', 'HIGH', 'LOW', 'P_NORM', 'V_NORM', 'G_NORM', 'D_NORM', 'IV_NORM']
+# Coerced without a zero fill: a missing ADM21 means "no average", not zero liquidity
+EXTRA_NUMERIC_COLS = ['ADM21', 'DAYS']
+CANONICAL_COLUMNS = ['TICKER', 'NAME', 'SECTOR', 'INDUSTRY', 'DATE',
+                     'P', 'P_NORM', 'V', 'V_NORM', 'G', 'G_NORM', 'D', 'D_NORM', 'IV', 'IV_NORM', 'P_NN',
+                     'OPEN', 'HIGH', 'LOW', 'CLOSE', 'VOLUME', 'ADM21', 'DAYS']
+# Few distinct values repeated on every row
+CATEGORY_COLS = ['SECTOR', 'INDUSTRY']
+
+# Explicit CSV dtypes: categories built by the parser, numbers straight to float64. Plain text columns
+# are pinned to str for the C engine only; the pyarrow engine already reads them as strings and would
+# turn gaps into 'None' if asked for str.
+CSV_DTYPES = {**{col: 'category' for col in CATEGORY_COLS},
+              **{col: 'float64' for col in NUMERIC_COLS + EXTRA_NUMERIC_COLS}}
+CSV_TEXT_DTYPES = {col: str for col in TEXT_COLS + ['DATE'] if col not in CATEGORY_COLS}
+
+# Values covered by ROW_HASH: everything about a ticker except the snapshot DATE
+ROW_HASH_COLS = TEXT_COLS + NUMERIC_COLS + EXTRA_NUMERIC_COLS
+
+
+def clean_snapshot(df):
+    """
+    The dashboards' cleaning: drop rows without a ticker, fill gaps with
+    'Unknown' and coerce the signal/price columns back to numbers.
+    """
+    df = df.dropna(subset=['TICKER'])
+    df = df.fillna('Unknown')
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    for col in EXTRA_NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def normalize_snapshot(df):
+    """
+    Canonical stored form of one snapshot: cleaned as above, every canonical
+    column present and in order, DATE parsed, ADM21/DAYS numeric, plus ROW_HASH.
+    """
+    df = clean_snapshot(df)
+    for col in CANONICAL_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.NA
+    df = df[CANONICAL_COLUMNS].copy()
+    for col in TEXT_COLS:
+        df[col] = df[col].astype(str)
+    for col in EXTRA_NUMERIC_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
+    df['ROW_HASH'] = row_hash(df)
+    return df.reset_index(drop=True)
+
+
+def row_hash(df, cols=ROW_HASH_COLS):
+    """
+    One 64-bit hash per row over its text and numeric values, with text as
+    str and numbers as float64 so every source's read of the same values
+    hashes the same. Rows with equal hashes on two dates did not change.
+    """
+    cols = [col for col in cols if col in df.columns]
+    values = df[cols].astype({col: (str if col in TEXT_COLS else 'float64') for col in cols})
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def snapshot_hash(df):
+    """Order-independent hash of a whole snapshot from its ROW_HASH values"""
+    return hashlib.sha256(np.sort(df['ROW_HASH'].to_numpy(dtype='uint64')).tobytes()).hexdigest()
+
+
+def validate_snapshot(raw, normalized=None):
+    """
+    Returns a list of human-readable problems with a raw snapshot:
+    missing or unexpected columns, values that failed numeric coercion,
+    unparseable dates and duplicate tickers.
+    """
+    problems = column_problems(raw.columns)
+
+    for col in NUMERIC_COLS + EXTRA_NUMERIC_COLS:
+        if col in raw.columns:
+            failed = pd.to_numeric(raw[col], errors='coerce').isna() & raw[col].notna()
+            if failed.any():
+                problems.append(f"{col}: {int(failed.sum())} non-numeric values")
+
+    if normalized is not None and normalized['DATE'].isna().all():
+        problems.append("DATE: no parseable dates")
+
+    return problems + duplicate_problems(raw)
+
+
+def column_problems(columns):
+    problems = []
+    missing = [col for col in CANONICAL_COLUMNS if col not in columns]
+    unknown = [col for col in columns if col not in CANONICAL_COLUMNS]
+    if missing:
+        problems.append(f"missing columns: {', '.join(missing)}")
+    if unknown:
+        problems.append(f"unknown columns: {', '.join(map(str, unknown))}")
+    return problems
+
+
+def duplicate_problems(df):
+    if 'TICKER' not in df.columns:
+        return []
+    duplicates = df['TICKER'].dropna().duplicated().sum()
+    return [f"TICKER: {int(duplicates)} duplicate tickers"] if duplicates else []
+
+
+def parse_snapshot_csv(payload, engine='c'):
+    """
+    Schema-driven parse of an API CSV payload (str or bytes) into the cleaned
+    dashboard frame: numbers read straight to float64 (missing signal/price
+    values become 0, ADM21/DAYS stay NaN), text gaps filled with 'Unknown',
+    SECTOR/INDUSTRY categorical and DATE parsed. engine='pyarrow' uses the
+    multithreaded Arrow CSV reader.
+
+    If a numeric column holds non-numeric text the typed read fails, and
+    the payload is re-read as text and coerced so the bad cells can be
+    counted. Returns (df, problems) with problems in validate_snapshot's
+    format.
+    """
+    def read(dtypes):
+        buffer = BytesIO(payload) if isinstance(payload, bytes) else StringIO(payload)
+        if engine != 'pyarrow':
+            dtypes = {**CSV_TEXT_DTYPES, **dtypes}
+        return pd.read_csv(buffer, dtype=dtypes, engine=engine)
+
+    problems = []
+    try:
+        df = read(CSV_DTYPES)
+    except ValueError:
+        df = read({col: ('category' if col in CATEGORY_COLS else object) for col in CSV_DTYPES})
+        for col in NUMERIC_COLS + EXTRA_NUMERIC_COLS:
+            if col in df.columns:
+                values = pd.to_numeric(df[col], errors='coerce').astype('float64')
+                failed = values.isna() & df[col].notna()
+                if failed.any():
+                    problems.append(f"{col}: {int(failed.sum())} non-numeric values")
+                df[col] = values
+
+    problems = column_problems(df.columns) + problems + duplicate_problems(df)
+
+    if 'TICKER' in df.columns and df['TICKER'].isna().any():
+        df = df.dropna(subset=['TICKER']).reset_index(drop=True)
+    for col in TEXT_COLS:
+        if col in df.columns and df[col].isna().any():
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and 'Unknown' not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories('Unknown')
+            df[col] = df[col].fillna('Unknown')
+    numeric = [col for col in NUMERIC_COLS if col in df.columns]
+    gaps = df[numeric].isna().any()
+    if gaps.any():
+        df[gaps.index[gaps]] = df[gaps.index[gaps]].fillna(0)
+    if 'DATE' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['DATE']):
+        df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
+        if len(df) > 0 and df['DATE'].isna().all():
+            problems.append("DATE: no parseable dates")
+    return df, problems
@@ -0,0 +1,129 @@
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# Idle sessions are dropped after this long
+SESSION_TTL_SECONDS = 30 * 60
+
+# Total budget across sessions; least recently used sessions are evicted past it
+MAX_SESSION_BYTES = 256 * 1024 * 1024
+
+
+def value_bytes(value):
+    """Approximate in-memory size of a stored value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class SessionStore:
+    """
+    Server-side per-session state: the browser only holds a short session
+    token and callbacks read their data (e.g. the current book) from here
+    instead of round-tripping it as JSON.
+
+    Sessions expire after ttl_seconds without access and the least recently
+    used ones are evicted when the total size passes max_bytes. Safe to use
+    from concurrent callback threads.
+    """
+
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS, max_bytes=MAX_SESSION_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # session_id -> {'values', 'sizes', 'bytes', 'last_access'}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def new_session(self):
+        session_id = secrets.token_urlsafe(12)
+        with self._lock:
+            self._sessions[session_id] = {'values': {}, 'sizes': {}, 'bytes': 0, 'last_access': time.monotonic()}
+        return session_id
+
+    def put(self, session_id, key, value):
+        size = value_bytes(value)
+        with self._lock:
+            self._evict_expired()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {'values': {}, 'sizes': {}, 'bytes': 0, 'last_access': time.monotonic()}
+                self._sessions[session_id] = session
+            old_size = session['sizes'].get(key, 0)
+            session['values'][key] = value
+            session['sizes'][key] = size
+            session['bytes'] += size - old_size
+            self._bytes += size - old_size
+            self._touch(session_id, session)
+            self._evict_over_budget(keep=session_id)
+
+    def resize(self, session_id, key):
+        """
+        Re-measures a stored value that grew or shrank in place (e.g. a
+        TableView caching a new sorted/filtered view) and evicts other
+        sessions if the total is now over budget.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or key not in session['values']:
+                return
+            size = value_bytes(session['values'][key])
+            old_size = session['sizes'][key]
+            session['sizes'][key] = size
+            session['bytes'] += size - old_size
+            self._bytes += size - old_size
+            self._evict_over_budget(keep=session_id)
+
+    def get(self, session_id, key, default=None):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return default
+            if self._expired(session):
+                self._remove(session_id)
+                return default
+            self._touch(session_id, session)
+            return session['values'].get(key, default)
+
+    def drop(self, session_id):
+        with self._lock:
+            self._remove(session_id)
+
+    def stats(self):
+        with self._lock:
+            self._evict_expired()
+            return {'sessions': len(self._sessions), 'bytes': self._bytes}
+
+    def _touch(self, session_id, session):
+        session['last_access'] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+
+    def _expired(self, session):
+        return time.monotonic() - session['last_access'] > self.ttl_seconds
+
+    def _remove(self, session_id):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._bytes -= session['bytes']
+
+    def _evict_expired(self):
+        # Oldest access first, so stop at the first live session
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if not self._expired(session):
+                break
+            self._remove(session_id)
+
+    def _evict_over_budget(self, keep):
+        for session_id in list(self._sessions):
+            if self._bytes <= self.max_bytes:
+                break
+            if session_id != keep:
+                self._remove(session_id)
@@ -0,0 +1,63 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Normalized positioning profile used for "similar securities" lookups
+NORM_COLS = ['P_NORM', 'V_NORM', 'G_NORM', 'D_NORM', 'IV_NORM']
+
+SCOPES = {'all': None, 'sector': 'SECTOR', 'industry': 'INDUSTRY'}
+
+
+class SimilarityIndex:
+    """
+    KD-tree over the normalized signal vector of one snapshot.
+
+    The universe tree is built up front; SECTOR/INDUSTRY restricted trees are
+    built on first use and cached, so every later lookup is a tree query
+    instead of a distance pass over the full frame.
+    """
+
+    def __init__(self, df, feature_cols=NORM_COLS):
+        self.feature_cols = [col for col in feature_cols if col in df.columns]
+        self.df = df.reset_index(drop=True)
+        self.features = np.nan_to_num(self.df[self.feature_cols].to_numpy(dtype=float))
+        self.tree = cKDTree(self.features) if len(self.df) > 0 else None
+        self._group_trees = {}
+        # First occurrence wins if a ticker shows up twice in a snapshot
+        tickers = self.df['TICKER'].astype(str)
+        self._positions = dict(zip(tickers[~tickers.duplicated()], np.flatnonzero(~tickers.duplicated())))
+
+    def _tree_for(self, scope, value):
+        """Returns (tree, row positions) for the universe or a single sector/industry"""
+        group_col = SCOPES.get(scope)
+        if group_col is None:
+            return self.tree, None
+
+        key = (group_col, value)
+        if key not in self._group_trees:
+            positions = np.flatnonzero(self.df[group_col].to_numpy() == value)
+            self._group_trees[key] = (cKDTree(self.features[positions]), positions)
+        return self._group_trees[key]
+
+    def query(self, ticker, k=10, scope='all'):
+        """
+        Returns the k nearest securities to ticker (excluding itself) with a
+        DISTANCE column, optionally restricted to the ticker's sector or industry.
+        """
+        pos = self._positions.get(ticker)
+        if pos is None or self.tree is None:
+            return self.df.iloc[0:0].assign(DISTANCE=[])
+
+        group_col = SCOPES.get(scope)
+        tree, positions = self._tree_for(scope, self.df.at[pos, group_col] if group_col else None)
+
+        # Ask for one extra neighbor because the ticker itself is always the closest match
+        n = min(k + 1, tree.n)
+        distances, idx = tree.query(self.features[pos], k=n)
+        distances, idx = np.atleast_1d(distances), np.atleast_1d(idx)
+        if positions is not None:
+            idx = positions[idx]
+
+        keep = idx != pos
+        neighbors = self.df.iloc[idx[keep][:k]].copy()
+        neighbors['DISTANCE'] = distances[keep][:k]
+        return neighbors
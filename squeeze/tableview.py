@@ -0,0 +1,135 @@
+import json
+import math
+import re
+
+import pandas as pd
+
+# Rows sent per request: the visible rows plus a scroll buffer
+WINDOW_ROWS = 50
+
+# Tables at least this long are served a window at a time instead of shipped whole
+WINDOWED_MIN_ROWS = 500
+
+# One column filter from DataTable's filter_query, e.g. {P_NN} > 0.1 or {SECTOR} icontains tech.
+# An optional i/s prefix on the operator makes the comparison case-insensitive/-sensitive.
+FILTER_PART = re.compile(
+    r"^\{(?P<col>(?:[^{}\\]|\\.)+)\}\s*"
+    r"(?P<op>(?:(?:i|s)?(?:contains|datestartswith|eq|ne|ge|gt|le|lt)(?=\s|$)|(?:i|s)?(?:>=|<=|!=|=|>|<))|is\s+\w+)"
+    r"\s*(?P<value>.*)$", re.IGNORECASE)
+
+OPERATOR_NAMES = {'eq': '=', 'ne': '!=', 'ge': '>=', 'gt': '>', 'le': '<=', 'lt': '<'}
+
+COMPARISONS = {
+    '=': lambda left, right: left == right,
+    '!=': lambda left, right: left != right,
+    '>=': lambda left, right: left >= right,
+    '>': lambda left, right: left > right,
+    '<=': lambda left, right: left <= right,
+    '<': lambda left, right: left < right,
+}
+
+
+def parse_value(text):
+    """A quoted string (quotes and escapes removed), a number, or bare text"""
+    text = text.strip()
+    if len(text) >= 2 and text[0] in "'\"`" and text[-1] == text[0]:
+        return re.sub(r"\\(.)", r"\1", text[1:-1])
+    try:
+        return float(text)
+    except ValueError:
+        return re.sub(r"\\(.)", r"\1", text)
+
+
+def parse_filter_query(query):
+    """
+    DataTable's filter_query as (column, operator, case_insensitive, value)
+    terms, all of which must hold. Terms it cannot read are skipped.
+    """
+    terms = []
+    for part in re.split(r"\s+&&\s+|\s+and\s+", query or "", flags=re.IGNORECASE):
+        match = FILTER_PART.match(part.strip())
+        if not match:
+            continue
+        column = re.sub(r"\\(.)", r"\1", match['col'])
+        op = match['op'].lower()
+        if op.startswith('is'):
+            terms.append((column, ' '.join(op.split()), False, None))
+            continue
+        insensitive = op[0] == 'i'
+        op = op[1:] if op[0] in 'is' and op[1:] else op
+        terms.append((column, OPERATOR_NAMES.get(op, op), insensitive, parse_value(match['value'])))
+    return terms
+
+
+def term_mask(series, op, insensitive, value):
+    """Boolean mask for one filter term, following DataTable's own rules"""
+    if op in ('is blank', 'is nil'):
+        return series.isna() | (series.astype(str) == '') if op == 'is blank' else series.isna()
+    if op.startswith('is '):
+        return pd.Series(True, index=series.index)
+    numeric = pd.api.types.is_numeric_dtype(series)
+    if op == 'contains':
+        text = series.astype(str)
+        return text.str.contains(str(value), case=not insensitive, regex=False) & series.notna()
+    if op == 'datestartswith':
+        return series.astype(str).str.startswith(str(value)) & series.notna()
+    if numeric and isinstance(value, float):
+        return COMPARISONS[op](series, value).fillna(False)
+    text, value = series.astype(str), str(value if not isinstance(value, float) or not value.is_integer() else int(value))
+    if insensitive:
+        text, value = text.str.upper(), value.upper()
+    return COMPARISONS[op](text, value) & series.notna()
+
+
+def apply_filter_query(df, query):
+    """Rows matching every term of a DataTable filter_query"""
+    mask = pd.Series(True, index=df.index)
+    for column, op, insensitive, value in parse_filter_query(query):
+        if column in df.columns and (op in COMPARISONS or op.startswith('is') or op in ('contains', 'datestartswith')):
+            mask &= term_mask(df[column], op, insensitive, value)
+    return df[mask]
+
+
+def apply_sort(df, sort_by):
+    """DataTable sort_by ([{'column_id', 'direction'}, ...]) as a stable sort, blanks last"""
+    sort_by = [item for item in sort_by or [] if item.get('column_id') in df.columns]
+    if not sort_by:
+        return df
+    return df.sort_values([item['column_id'] for item in sort_by],
+                          ascending=[item.get('direction') != 'desc' for item in sort_by],
+                          kind='stable', na_position='last')
+
+
+class TableView:
+    """
+    One table's rows kept on the server and handed to a DataTable a window
+    at a time (page_action/sort_action/filter_action='custom'). The sorted
+    and filtered view is cached for the current sort_by/filter_query, so
+    moving through windows only slices it and the browser never holds more
+    than one window.
+    """
+
+    def __init__(self, df, columns=None):
+        self.frame = (df[[col for col in columns if col in df.columns]] if columns else df).reset_index(drop=True)
+        self._key = ('[]', '')
+        self._view = self.frame
+
+    @property
+    def nbytes(self):
+        """Memory held, for the session store's budget"""
+        view_bytes = 0 if self._view is self.frame else int(self._view.memory_usage(deep=True).sum())
+        return int(self.frame.memory_usage(deep=True).sum()) + view_bytes
+
+    def view(self, sort_by=None, filter_query=''):
+        key = (json.dumps(sort_by or [], sort_keys=True), filter_query or '')
+        if key != self._key:
+            self._view = apply_sort(apply_filter_query(self.frame, filter_query), sort_by)
+            self._key = key
+        return self._view
+
+    def window(self, page_current=0, page_size=WINDOW_ROWS, sort_by=None, filter_query=''):
+        """(records for one window, number of windows) under the given sort and filter"""
+        view = self.view(sort_by, filter_query)
+        page_count = max(math.ceil(len(view) / page_size), 1)
+        start = min(page_current or 0, page_count - 1) * page_size
+        return view.iloc[start:start + page_size].to_dict('records'), page_count
@@ -0,0 +1,26 @@
+import pytest
+
+from squeeze.config import coerce, settings
+
+
+@pytest.fixture
+def clean_settings(tmp_path, monkeypatch):
+    """No config file and freshly resolved settings, before and after"""
+    monkeypatch.setenv("SQUEEZE_CONFIG", str(tmp_path / "none.json"))
+    settings.cache_clear()
+    yield
+    settings.cache_clear()
+
+
+def test_fractional_timeout_from_the_environment(clean_settings, monkeypatch):
+    monkeypatch.setenv("SQUEEZE_TIMEOUT", "2.5")
+    assert settings().timeout == 2.5
+    assert settings().sources['timeout'] == 'env'
+
+
+def test_numbers_keep_their_default_type():
+    assert coerce('timeout', "45") == 45.0 and isinstance(coerce('timeout', "45"), float)
+    assert coerce('refresh_seconds', "900") == 900 and isinstance(coerce('refresh_seconds', "900"), int)
+    assert coerce('refresh_seconds', "900.0") == 900
+    with pytest.raises(ValueError):
+        coerce('refresh_seconds', "900.5")
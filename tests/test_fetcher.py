@@ -0,0 +1,182 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import pandas as pd
+import pytest
+from aiohttp import web
+
+from squeeze.config import settings
+from squeeze.fetcher import feed_jobs, fetch_feeds, pending_jobs
+from squeeze.history import load_manifest, read_history
+from squeeze.schema import CANONICAL_COLUMNS
+
+API_KEY = "test-key"
+DATES = pd.bdate_range("2024-01-01", "2024-01-12")  # 10 business days
+
+
+def snapshot_csv(day, rows=5):
+    """A small per-ticker payload with every canonical column"""
+    df = pd.DataFrame({col: [float(i + 1) for i in range(rows)] for col in CANONICAL_COLUMNS})
+    df['TICKER'] = [f"T{i}" for i in range(rows)]
+    df['NAME'] = [f"Company {i}" for i in range(rows)]
+    df['SECTOR'] = 'Technology'
+    df['INDUSTRY'] = 'Software'
+    df['DATE'] = day
+    return df.to_csv(index=False).encode()
+
+
+class MockApi:
+    """
+    The SqueezeMetrics endpoints the fetcher uses, served from a background
+    thread on an ephemeral port. `script` maps a date to the statuses its
+    successive requests get (200 once it runs out); every request is logged
+    with its arrival time, and the peak number of requests in flight is kept.
+    """
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.script = {}
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.app = web.Application()
+        self.app.router.add_get('/monitor/api/{date}', self.snapshot)
+        self.app.router.add_get('/monitor/static/DIX.csv', self.dix)
+
+    async def snapshot(self, request):
+        day = request.match_info['date']
+        self.requests.append((day, time.monotonic()))
+        if request.query.get('key') != API_KEY:
+            return web.Response(status=403)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        statuses = self.script.get(day, [])
+        status = statuses.pop(0) if statuses else 200
+        if status == 429:
+            return web.Response(status=429, headers={'Retry-After': '0.3'})
+        if status != 200:
+            return web.Response(status=status)
+        return web.Response(body=snapshot_csv(day), content_type='text/csv')
+
+    async def dix(self, request):
+        self.requests.append(('DIX', time.monotonic()))
+        return web.Response(text="date,price,dix,gex\n2024-01-02,4742.83,0.41,3.1e9\n2024-01-03,4704.81,0.44,2.2e9\n",
+                            content_type='text/csv')
+
+    def requested(self, name):
+        return [at for day, at in self.requests if day == name]
+
+    def start(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        self.loop = asyncio.new_event_loop()
+        self.runner = web.AppRunner(self.app)
+        self.loop.run_until_complete(self.runner.setup())
+        self.loop.run_until_complete(web.SockSite(self.runner, sock).start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """Mock API as the configured base URL; the store and audit log go to a temp directory"""
+    server = MockApi()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SQUEEZE_API_BASE", server.start())
+    monkeypatch.setenv("SQUEEZE_API_KEY", API_KEY)
+    monkeypatch.setenv("SQUEEZE_CONFIG", str(tmp_path / "none.json"))
+    settings.cache_clear()
+    yield server
+    server.stop()
+    settings.cache_clear()
+
+
+def fetch(dates, feeds=('snapshot',), limit_per_host=3, **kwargs):
+    return {result['file']: result for result in
+            fetch_feeds(list(feeds), dates, root="history", limit_per_host=limit_per_host, rate=100, **kwargs)}
+
+
+def test_concurrent_pulls_stay_under_the_per_host_limit(api):
+    start = time.monotonic()
+    results = fetch(DATES, limit_per_host=3)
+    elapsed = time.monotonic() - start
+
+    assert all(result['status'] == 'ok' for result in results.values())
+    assert len(results) == len(DATES)
+    assert 1 < api.max_in_flight <= 3
+    # 10 requests of 0.1 s, three at a time, are well under the 1 s a serial pull would take
+    assert elapsed < len(DATES) * api.delay
+    stored = read_history("history", columns=['DATE', 'TICKER'])
+    assert len(stored) == 5 * len(DATES)
+    assert stored['DATE'].nunique() == len(DATES)
+
+
+def test_429_and_503_are_retried_after_retry_delay(api):
+    api.script = {'2024-01-02': [429], '2024-01-03': [503]}
+    results = fetch(DATES[:3])
+
+    assert all(result['status'] == 'ok' for result in results.values())
+    throttled = api.requested('2024-01-02')
+    unavailable = api.requested('2024-01-03')
+    assert len(throttled) == 2 and len(unavailable) == 2
+    # Retry-After: 0.3 on the 429; no header on the 503, so the first backoff step (0.5 s)
+    assert throttled[1] - throttled[0] >= 0.3 + api.delay
+    assert unavailable[1] - unavailable[0] >= 0.5 + api.delay
+
+
+def test_persistent_server_errors_are_recorded_but_not_stored(api):
+    api.script = {'2024-01-02': [503] * 10}
+    results = fetch(DATES[:2], retries=1)
+
+    assert results['snapshot_20240102']['status'] == 'error'
+    assert results['snapshot_20240102']['error'] == "HTTP 503"
+    assert len(api.requested('2024-01-02')) == 2
+    assert 'snapshot_20240102' not in load_manifest("history")
+
+
+def test_404_is_recorded_as_missing(api):
+    api.script = {'2024-01-05': [404]}
+    results = fetch(DATES[:5])
+
+    assert results['snapshot_20240105']['status'] == 'missing'
+    assert results['snapshot_20240105']['http_status'] == 404
+    assert load_manifest("history")['snapshot_20240105']['status'] == 'missing'
+    assert not os.path.exists(os.path.join("history", "snapshots", "snapshot_20240105.parquet"))
+
+
+def test_dix_series_is_stored(api):
+    results = fetch(None, feeds=['dix'])
+
+    assert results['dix']['status'] == 'ok'
+    series = pd.read_parquet(os.path.join("history", "series", "dix.parquet"))
+    assert list(series.columns) == ['DATE', 'PRICE', 'DIX', 'GEX']
+    assert pd.api.types.is_datetime64_any_dtype(series['DATE'])
+    assert len(series) == 2
+
+
+def test_resume_skips_stored_and_missing_dates(api):
+    api.script = {'2024-01-03': [404], '2024-01-04': [503]}
+    fetch(DATES[:5], feeds=['snapshot', 'dix'], retries=0)
+    api.requests.clear()
+
+    # Stored (ok) and missing dates are skipped, the failed one is retried, undated series always refresh
+    pending = {job['name'] for job in pending_jobs(feed_jobs(['snapshot', 'dix'], DATES[:5]), "history")}
+    assert pending == {'snapshot_20240104', 'dix'}
+    results = fetch(DATES[:5], feeds=['snapshot', 'dix'])
+    assert set(results) == pending
+    assert sorted(day for day, _ in api.requests) == ['2024-01-04', 'DIX']
+    assert results['snapshot_20240104']['status'] == 'ok'
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from squeeze.pairs import TRADING_DAYS, pair_moments
+
+
+def test_pair_moments_use_each_pairs_common_dates():
+    """Hedge ratio and spread vol match a per-pair regression on the shared dates, with gaps on both legs"""
+    rng = np.random.default_rng(3)
+    dates = 120
+    market = rng.normal(0, 0.01, dates)
+    long_returns = market[:, None] * rng.uniform(0.5, 1.5, 4) + rng.normal(0, 0.01, (dates, 4))
+    short_returns = market[:, None] * rng.uniform(0.5, 1.5, 3) + rng.normal(0, 0.01, (dates, 3))
+    # Regime change in the first leg's early history, then that history goes missing for the short legs
+    long_returns[:40, 0] += 0.02
+    short_returns[:40, :] = np.nan
+    long_returns[rng.uniform(size=long_returns.shape) < 0.15] = np.nan
+    short_returns[rng.uniform(size=short_returns.shape) < 0.15] = np.nan
+
+    hedge, vol = pair_moments(long_returns, short_returns)
+
+    for i in range(4):
+        for j in range(3):
+            pair = pd.DataFrame({'long': long_returns[:, i], 'short': short_returns[:, j]}).dropna()
+            cov = pair.cov()
+            beta = cov.loc['long', 'short'] / cov.loc['short', 'short']
+            spread_var = cov.loc['long', 'long'] - beta * cov.loc['long', 'short']
+            assert np.isclose(hedge[i, j], beta)
+            assert np.isclose(vol[i, j], np.sqrt(spread_var * TRADING_DAYS))
+
+
+def test_pair_moments_need_min_obs_shared_dates():
+    """20 and 15 observations, but only 5 on the same dates"""
+    long_returns = np.full((30, 1), np.nan)
+    short_returns = np.full((30, 1), np.nan)
+    long_returns[:15, 0] = np.linspace(-0.01, 0.01, 15)
+    short_returns[10:, 0] = np.linspace(-0.01, 0.01, 20)
+    hedge, vol = pair_moments(long_returns, short_returns, min_obs=6)
+    assert np.isnan(hedge[0, 0]) and np.isnan(vol[0, 0])
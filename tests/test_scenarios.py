@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from squeeze.filters import filter_snapshot
+from squeeze.portfolio import build_portfolio
+from squeeze.scenarios import ScenarioIndex
+
+SECTORS = ['Technology', 'Healthcare', 'Energy', 'Utilities', 'Industrials']
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    """3,000 names with P_NN rounded to two decimals (many ties), 30 missing P_NN and some ETFs"""
+    rng = np.random.default_rng(7)
+    rows = 3000
+    sectors = rng.choice(SECTORS, rows)
+    industries = np.array([f"{sector} {i}" for sector, i in zip(sectors, rng.integers(0, 12, rows))], dtype=object)
+    industries[rng.choice(rows, 150, replace=False)] = 'ETF'
+    pnn = rng.normal(0, 0.05, rows).round(2)
+    pnn[rng.choice(rows, 30, replace=False)] = np.nan
+    return pd.DataFrame({
+        'TICKER': [f"T{i:04d}" for i in range(rows)],
+        'NAME': [f"Company {i}" for i in range(rows)],
+        'SECTOR': sectors,
+        'INDUSTRY': industries,
+        'P_NN': pnn,
+        'CLOSE': rng.lognormal(3.5, 1, rows),
+        'VOLUME': rng.lognormal(16, 1.2, rows),
+        'ADM21': rng.lognormal(16, 1.2, rows),
+    })
+
+
+def expected(df, sector, min_pnn, etf_filter):
+    """What the dashboards show for the same filters: filter_snapshot, then build_portfolio"""
+    filtered = filter_snapshot(df, sector, "All", None, min_pnn, etf_filter)
+    universe, longs, shorts = build_portfolio(filtered)
+    return {
+        'UNIVERSE': len(filtered),
+        'AVG_P_NN': filtered['P_NN'].mean(),
+        'POSITIVE': int((filtered['P_NN'] > 0).sum()),
+        'PORTFOLIO_UNIVERSE': len(universe),
+        'LONGS': len(longs),
+        'SHORTS': len(shorts),
+        'LONG_AVG_P_NN': longs['P_NN'].mean() if len(longs) else np.nan,
+        'SHORT_AVG_P_NN': shorts['P_NN'].mean() if len(shorts) else np.nan,
+        'BOOK_SECTORS': pd.concat([longs, shorts])['SECTOR'].nunique() if len(longs) + len(shorts) else 0,
+    }
+
+
+@pytest.mark.parametrize("etf_filter", ['include', 'exclude', 'only'])
+@pytest.mark.parametrize("sector", ['All', 'Energy'])
+@pytest.mark.parametrize("min_pnn", [None, 0, 0.02, -0.05])
+def test_scenario_matches_filter_and_portfolio(snapshot, sector, min_pnn, etf_filter):
+    row = ScenarioIndex(snapshot).evaluate(sector, "All", min_pnn, etf_filter)
+    for key, value in expected(snapshot, sector, min_pnn, etf_filter).items():
+        assert row[key] == pytest.approx(value, nan_ok=True), key
+
+
+def test_missing_p_nn_never_selected(snapshot):
+    _, longs, shorts = build_portfolio(snapshot)
+    assert longs['P_NN'].notna().all() and shorts['P_NN'].notna().all()
+    row = ScenarioIndex(snapshot).evaluate()
+    assert not np.isnan(row['AVG_P_NN']) and not np.isnan(row['LONG_AVG_P_NN'])